@@ -1,19 +1,51 @@
 import os
+import re
 import mysql.connector
 import json
+import logging
 import base64
+import gzip
+import io
+import mimetypes
 import subprocess
-from flask import Flask, request, render_template, redirect, url_for, session, send_file
-from werkzeug.utils import secure_filename
+import shutil
+import hashlib
+import hmac
+import queue
+import random
+import threading
+import time
+import uuid
+import bisect
+import tempfile
+import jinja2
+import click
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial, wraps
+from flask import Flask, request, render_template, redirect, url_for, session, send_file, send_from_directory, g, has_app_context, has_request_context, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
 
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Optional: without Pillow signatures are validated and stored as uploaded
+    Image = ImageOps = None
+
+try:
+    import brotli
+except ImportError:  # Optional: build-assets then writes only gzip variants
+    brotli = None
+
 app = Flask(__name__)
 app.secret_key = os.getenv("FLASK_SECRET_KEY", "default_secret_key")
 
 UPLOAD_FOLDER = 'static/signatures'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 4 * 1024 * 1024))  # Largest request body Flask will read
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
 
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -22,7 +54,6 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-@app.before_request
 def parse_easy_auth_headers():
     principal_header = request.headers.get('X-MS-CLIENT-PRINCIPAL')
     if principal_header:
@@ -47,6 +78,331 @@ def parse_easy_auth_headers():
     else:
         # If header isn't present, clear user info
         session.pop("user", None)
+    return session.get("user")
+
+# --- Metrics ---
+# A small in-process registry, rendered in the Prometheus text format on /metrics.
+# Recording is one dict update under a per-metric lock. Numbers that other
+# objects already keep (pool sizes, queue depths, cache hits) are read from their
+# stats() only when /metrics is scraped. Every gunicorn worker has its own
+# registry, so a scrape reports the worker that happened to answer it.
+
+HTTP_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+PDF_LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"  # add a Server-Timing header (db/pdf/app) to responses
+OPS_TOKEN = os.getenv("OPS_TOKEN", "")  # bearer token for scrapers and probes on /metrics and /health/*
+
+def format_labels(names, values, extra=""):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    def __init__(self, kind, name, documentation, labels=()):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+                for key, value in sorted(values.items())]
+
+class Counter(Metric):
+    def __init__(self, name, documentation, labels=()):
+        super().__init__("counter", name, documentation, labels)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+class Gauge(Metric):
+    def __init__(self, name, documentation, labels=()):
+        super().__init__("gauge", name, documentation, labels)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+class Histogram(Metric):
+    def __init__(self, name, documentation, labels=(), buckets=HTTP_LATENCY_BUCKETS):
+        super().__init__("histogram", name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        # Per label set: [count per bucket (last one is +Inf), sum]
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class CallbackMetric(Metric):
+    # Values computed at scrape time: fn() returns {label values tuple: value}
+    def __init__(self, kind, name, documentation, fn, labels=()):
+        super().__init__(kind, name, documentation, labels)
+        self.fn = fn
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception as err:
+            app.logger.warning(f"Metric {self.name} unavailable: {err}")
+            return []
+        return [f"{self.name}{format_labels(self.labels, key)} {format_value(value)}"
+                for key, value in sorted(values.items())]
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=HTTP_LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def callback(self, kind, name, documentation, fn, labels=()):
+        return self.register(CallbackMetric(kind, name, documentation, fn, labels))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            samples = metric.samples()
+            if samples:
+                lines.extend(metric.header())
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "Requests handled, by endpoint and status.", ("method", "endpoint", "status"))
+HTTP_LATENCY = metrics.histogram(
+    "http_request_duration_seconds", "Time from before_request to teardown (first byte for streams).",
+    ("method", "endpoint"))
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "Requests currently being handled.")
+HTTP_DB_QUERIES = metrics.histogram(
+    "http_request_db_queries", "SQL statements executed per request.", ("endpoint",), QUERY_COUNT_BUCKETS)
+DB_CONNECTION_CALLS = metrics.counter("db_connection_calls_total", "get_db_connection() calls.")
+DB_READ_ROUTES = metrics.counter(
+    "db_read_routes_total", "Where get_read_connection() sent a request's reads.", ("route",))
+DB_CONNECT_LATENCY = metrics.histogram(
+    "db_connect_duration_seconds", "Time to open a new MySQL connection.", buckets=DB_LATENCY_BUCKETS)
+DB_QUERY_LATENCY = metrics.histogram(
+    "db_query_duration_seconds", "Time spent in cursor.execute/executemany, by statement type.",
+    ("statement",), DB_LATENCY_BUCKETS)
+PDF_COMPILE_LATENCY = metrics.histogram(
+    "pdflatex_duration_seconds", "pdflatex runs, by outcome and whether a preamble format was used.",
+    ("outcome", "format"), PDF_LATENCY_BUCKETS)
+
+metrics.callback("gauge", "db_pool_connections", "Pooled connections by state.",
+                 lambda: {(state,): db_pool.stats()[state] for state in ("checked_out", "idle")}, ("state",))
+metrics.callback("counter", "db_pool_events_total", "Connection pool events.",
+                 lambda: {(event,): db_pool.stats()[event]
+                          for event in ("connects", "checkouts", "timeouts", "ping_failures", "recycled")},
+                 ("event",))
+metrics.callback("gauge", "db_replica_lag_seconds", "Replication lag at the last check, per replica.",
+                 lambda: {(replica.name,): replica.lag for replica in replicas if replica.lag is not None},
+                 ("replica",))
+metrics.callback("gauge", "pdf_jobs", "Background PDF jobs in this worker by state.",
+                 lambda: {(state,): pdf_workers.stats()[state] for state in ("queued", "running")}, ("state",))
+metrics.callback("counter", "pdf_cache_lookups_total", "Compiled-PDF cache lookups.",
+                 lambda: {(result,): pdf_cache.stats()[key] for result, key in (("hit", "hits"), ("miss", "misses"))}
+                 if pdf_cache else {}, ("result",))
+metrics.callback("counter", "user_cache_lookups_total", "Identity cache lookups.",
+                 lambda: {(result,): user_cache.stats()[key] for result, key in (("hit", "hits"), ("miss", "misses"))},
+                 ("result",))
+
+def statement_type(sql):
+    return sql.lstrip(" \n\t(").split(None, 1)[0].lower() if sql.strip() else "empty"
+
+@app.before_request
+def start_request_timer():
+    # Registered ahead of every other hook, so they are part of the measurement
+    g.request_started = time.perf_counter()
+    HTTP_IN_FLIGHT.inc()
+
+@app.after_request
+def record_response_status(response):
+    g.response_status = response.status_code
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing()
+    return response
+
+def server_timing():
+    # Stage breakdown for load tests; see benchmarks/load_test.py
+    queries = g.get("query_log", ())
+    parts = [f'db;dur={sum(query.duration for query in queries) * 1000:.2f};desc="{len(queries)} queries"']
+    if g.get("pdflatex_seconds"):
+        parts.append(f"pdf;dur={g.pdflatex_seconds * 1000:.2f}")
+    started = g.get("request_started")
+    if started is not None:
+        parts.append(f"app;dur={(time.perf_counter() - started) * 1000:.2f}")
+    return ", ".join(parts)
+
+@app.teardown_request
+def record_request_metrics(exc):
+    # Streamed responses run teardown twice; only the first one counts
+    started = g.pop("request_started", None)
+    if started is None:
+        return
+    HTTP_IN_FLIGHT.dec()
+    endpoint = request.endpoint or "unmatched"
+    status = 500 if exc is not None else g.get("response_status", 500)
+    HTTP_LATENCY.observe(time.perf_counter() - started, request.method, endpoint)
+    HTTP_REQUESTS.inc(request.method, endpoint, str(status))
+    queries = g.pop("query_log", ())
+    HTTP_DB_QUERIES.observe(len(queries), endpoint)
+    if queries and app.logger.isEnabledFor(logging.DEBUG):
+        app.logger.debug(f"{request.method} {request.path} ran {len(queries)} queries:\n"
+                         + "\n".join(f"  {query.describe()}" for query in queries))
+
+# Endpoints that show pool, cache, traffic and replica details. Admins can read
+# them; so can scrapers and probes sending "Authorization: Bearer $OPS_TOKEN",
+# and for those resolve_identity() skips the user lookup.
+OPS_ENDPOINTS = set()
+
+def has_ops_token():
+    supplied = request.headers.get("Authorization", "")
+    return bool(OPS_TOKEN) and hmac.compare_digest(supplied.encode(), f"Bearer {OPS_TOKEN}".encode())
+
+def ops_only(view):
+    OPS_ENDPOINTS.add(view.__name__)
+
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        user = current_user()
+        if not has_ops_token() and (not user or user["role_name"] != "admin"):
+            return "You must be admin to view operational data.", 403
+        return view(*args, **kwargs)
+    return wrapped
+
+@app.route("/metrics")
+@ops_only
+def metrics_endpoint():
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+# --- Query log ---
+# MeteredCursor records every statement of a request in g.query_log: the SQL,
+# the shape of its parameters (types only, never values), rows and duration.
+# Statements slower than SLOW_QUERY_MS are logged as they finish. A view can
+# declare how many statements it may run with @query_budget(n). Going over
+# budget is logged, and raises under app.testing or QUERY_BUDGET_STRICT=1, so a
+# test that exercises the view fails on an extra round trip.
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))              # log statements slower than this
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "0") == "1"  # raise on overruns outside tests too
+QUERY_LOG_SQL_CHARS = 300  # SQL text kept per log line
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+class QueryRecord:
+    __slots__ = ("sql", "shape", "duration", "rowcount", "fetched")
+
+    def __init__(self, sql, shape, duration, rowcount):
+        self.sql = sql
+        self.shape = shape
+        self.duration = duration
+        self.rowcount = rowcount  # affected rows, or -1 for an unbuffered SELECT
+        self.fetched = 0
+
+    @property
+    def rows(self):
+        return max(self.rowcount, self.fetched)
+
+    def describe(self):
+        return f"{self.duration * 1000:.1f} ms, {self.rows} row(s), params {self.shape}: {compact_sql(self.sql)}"
+
+def compact_sql(sql):
+    sql = " ".join(str(sql).split())
+    return sql if len(sql) <= QUERY_LOG_SQL_CHARS else sql[:QUERY_LOG_SQL_CHARS] + "..."
+
+def params_shape(params):
+    if not params:
+        return "()"
+    if isinstance(params, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+    if len(params) > 8:
+        return f"({len(params)} params)"
+    return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+
+def record_query(sql, shape, elapsed, rowcount):
+    DB_QUERY_LATENCY.observe(elapsed, statement_type(sql))
+    record = QueryRecord(sql, shape, elapsed, rowcount)
+    if has_app_context():
+        g.setdefault("query_log", []).append(record)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        where = request.endpoint if has_request_context() else "background"
+        app.logger.warning(f"Slow query in {where}: {record.describe()}")
+    return record
+
+def request_queries():
+    return g.get("query_log", []) if has_app_context() else []
+
+def query_budget(limit):
+    # Most statements the view itself may run; before_request hooks are not counted
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            start = len(request_queries())
+            rv = view(*args, **kwargs)
+            queries = request_queries()[start:]
+            if len(queries) > limit:
+                message = (f"{request.endpoint} ran {len(queries)} queries, budget is {limit}:\n"
+                           + "\n".join(f"  {query.describe()}" for query in queries))
+                if app.testing or QUERY_BUDGET_STRICT:
+                    raise QueryBudgetExceeded(message)
+                app.logger.warning(message)
+            return rv
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
 
 DB_HOST = os.getenv("DB_HOST", "moosefactorydb.mysql.database.azure.com")
 DB_PORT = int(os.getenv("DB_PORT", 3306))
@@ -54,14 +410,408 @@ DB_USER = os.getenv("DB_USER", "moose")
 DB_PASS = os.getenv("DB_PASS", "Moosefactory123")
 DB_NAME = os.getenv("DB_NAME", "moosefactory_sql")
 
-def get_db_connection():
+# Connection pool settings (per gunicorn worker)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))                # idle connections kept open
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", 10))  # extra connections allowed under load
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 10))       # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))       # reconnect after this many seconds
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"    # ping idle connections before reuse
+
+def _connect():
     return mysql.connector.connect(
         host=DB_HOST,
         port=DB_PORT,
         user=DB_USER,
         password=DB_PASS,
-        database=DB_NAME
+        database=DB_NAME,
+        # hooks and the route share one connection, so never trip over a half-read result
+        consume_results=True
+    )
+
+class PooledConnection:
+    # Thin wrapper around a mysql connection. Everything is delegated to the real
+    # connection except close(), which hands it back to the pool instead.
+    def __init__(self, pool, raw, created_at, request_scoped=False):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._request_scoped = request_scoped
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return MeteredCursor(self._raw.cursor(*args, **kwargs))
+
+    def commit(self):
+        self._raw.commit()
+        if self._request_scoped:
+            # Reads of this browser now go to the primary for a while (see pin_reads_after_write)
+            g.db_wrote = True
+
+    def close(self):
+        # Request-scoped connections are released in teardown, so handlers
+        # calling conn.close() mid-request keep sharing the same connection.
+        if not self._request_scoped:
+            self.release()
+
+    def release(self):
+        if self._raw is not None:
+            self._pool._release(self._raw, self._created_at)
+            self._raw = None
+
+class MeteredCursor:
+    # Times execute()/executemany() into the query metrics and the request's query
+    # log, and counts fetched rows; everything else is the driver's cursor.
+    def __init__(self, raw):
+        self._raw = raw
+        self._record = None
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._raw.execute(operation, params, *args, **kwargs)
+        finally:
+            self._record = record_query(operation, params_shape(params),
+                                        time.perf_counter() - started, self._raw.rowcount)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        seq_params = list(seq_params)
+        started = time.perf_counter()
+        try:
+            return self._raw.executemany(operation, seq_params, *args, **kwargs)
+        finally:
+            shape = f"{len(seq_params)} x {params_shape(seq_params[0])}" if seq_params else "()"
+            self._record = record_query(operation, shape, time.perf_counter() - started, self._raw.rowcount)
+
+    def _fetched(self, count):
+        if self._record is not None:
+            self._record.fetched += count
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        if row is not None:
+            self._fetched(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._raw.fetchmany(*args, **kwargs)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._raw.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+class ConnectionPool:
+    def __init__(self, connect, size, max_overflow, timeout, recycle, pre_ping):
+        self._connect = connect
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size + max_overflow)
+        self._lock = threading.Lock()
+        self._checked_out = 0
+        self._counters = {
+            "connects": 0,
+            "checkouts": 0,
+            "timeouts": 0,
+            "ping_failures": 0,
+            "recycled": 0,
+            "overflow_closed": 0,
+        }
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._counters[key] += n
+
+    def acquire(self, request_scoped=False):
+        if not self._slots.acquire(timeout=self.timeout):
+            self._count("timeouts")
+            raise mysql.connector.errors.PoolError(
+                f"No database connection available within {self.timeout}s "
+                f"(pool size {self.size}, overflow {self.max_overflow})"
+            )
+        try:
+            raw, created_at = self._checkout_idle()
+            if raw is None:
+                started = time.perf_counter()
+                raw, created_at = self._connect(), time.monotonic()
+                DB_CONNECT_LATENCY.observe(time.perf_counter() - started)
+                self._count("connects")
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._checked_out += 1
+            self._counters["checkouts"] += 1
+        return PooledConnection(self, raw, created_at, request_scoped)
+
+    def _checkout_idle(self):
+        # Reuse the most recently returned connection that is still healthy
+        while True:
+            try:
+                raw, created_at = self._idle.get_nowait()
+            except queue.Empty:
+                return None, None
+
+            if self.recycle and time.monotonic() - created_at > self.recycle:
+                self._count("recycled")
+                self._close_quietly(raw)
+                continue
+
+            if self.pre_ping:
+                try:
+                    raw.ping(reconnect=False)
+                except mysql.connector.Error:
+                    self._count("ping_failures")
+                    self._close_quietly(raw)
+                    continue
+
+            return raw, created_at
+
+    def _release(self, raw, created_at):
+        with self._lock:
+            self._checked_out -= 1
+        try:
+            # End whatever transaction the borrower left open so the next one
+            # does not inherit a stale snapshot or uncommitted writes.
+            raw.rollback()
+            if self._idle.qsize() < self.size:
+                self._idle.put((raw, created_at))
+            else:
+                self._count("overflow_closed")
+                self._close_quietly(raw)
+        except mysql.connector.Error:
+            self._close_quietly(raw)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["checked_out"] = self._checked_out
+        stats["idle"] = self._idle.qsize()
+        stats["size"] = self.size
+        stats["max_overflow"] = self.max_overflow
+        stats["overflow"] = max(0, stats["checked_out"] + stats["idle"] - self.size)
+        return stats
+
+db_pool = ConnectionPool(
+    _connect,
+    size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_MAX_OVERFLOW,
+    timeout=DB_POOL_TIMEOUT,
+    recycle=DB_POOL_RECYCLE,
+    pre_ping=DB_POOL_PRE_PING,
+)
+
+def get_db_connection():
+    # Inside a request every hook and the route share one pooled connection,
+    # which goes back to the pool in release_db_connection().
+    DB_CONNECTION_CALLS.inc()
+    if has_app_context():
+        conn = g.get("db_conn")
+        if conn is None:
+            conn = g.db_conn = db_pool.acquire(request_scoped=True)
+        return conn
+    return db_pool.acquire()
+
+def detach_db_connection(conn):
+    # For streamed responses: Flask tears the app context down as soon as the view
+    # returns, while the body is still being read from this connection. The caller
+    # takes ownership and must release() it (usually via response.call_on_close).
+    for key in ("db_conn", "db_read_conn"):
+        if g.get(key) is conn:
+            g.pop(key)
+    return conn
+
+@app.teardown_appcontext
+def release_db_connection(exc):
+    # db_read_conn may be the primary connection itself; release() is idempotent
+    for key in ("db_read_conn", "db_conn"):
+        conn = g.pop(key, None)
+        if conn is not None:
+            conn.release()
+
+# --- Read replicas ---
+# Views that only read call get_read_connection() instead of get_db_connection().
+# With DB_REPLICA_HOSTS set, that is a connection to a replica whose replication
+# lag was within DB_REPLICA_MAX_LAG at its last check. A replica that is down or
+# too far behind is skipped and the reads go to the primary. Once a browser has
+# committed a write it reads from the primary for DB_READ_YOUR_WRITES seconds, so
+# it always sees its own changes. The identity cache keeps reading the primary,
+# since its version stamps only make sense against the primary.
+
+DB_REPLICA_HOSTS = [h.strip() for h in os.getenv("DB_REPLICA_HOSTS", "").split(",") if h.strip()]  # host[:port],...
+DB_REPLICA_USER = os.getenv("DB_REPLICA_USER", DB_USER)
+DB_REPLICA_PASS = os.getenv("DB_REPLICA_PASS", DB_PASS)
+DB_REPLICA_POOL_SIZE = int(os.getenv("DB_REPLICA_POOL_SIZE", DB_POOL_SIZE))         # idle connections per replica
+DB_REPLICA_CONNECT_TIMEOUT = int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", 2))        # seconds before a replica counts as down
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", 5))                      # staleness tolerance, seconds
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", 5))        # how often to re-read the lag
+DB_REPLICA_RETRY_INTERVAL = float(os.getenv("DB_REPLICA_RETRY_INTERVAL", 30))       # how long a down replica is skipped
+DB_READ_YOUR_WRITES = float(os.getenv("DB_READ_YOUR_WRITES",
+                                      DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL))  # seconds a writer stays on the primary
+
+def _connect_replica(host, port):
+    raw = mysql.connector.connect(
+        host=host,
+        port=port,
+        user=DB_REPLICA_USER,
+        password=DB_REPLICA_PASS,
+        database=DB_NAME,
+        connection_timeout=DB_REPLICA_CONNECT_TIMEOUT,
+        consume_results=True
     )
+    # A write routed here by mistake fails loudly instead of diverging the replica
+    cursor = raw.cursor()
+    cursor.execute("SET SESSION TRANSACTION READ ONLY")
+    cursor.close()
+    return raw
+
+def replication_lag(raw):
+    # Seconds behind the primary; None when replication is stopped or unreadable
+    cursor = raw.cursor(dictionary=True)
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.ProgrammingError:
+            # MySQL before 8.0.22 and MariaDB before 10.5 only know the old name
+            cursor.execute("SHOW SLAVE STATUS")
+        status = cursor.fetchone()
+    finally:
+        cursor.close()
+    if status is None:
+        # Not replicating at all, e.g. DB_REPLICA_HOSTS pointing at the primary
+        return 0.0
+    lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+    return float(lag) if lag is not None else None
+
+class Replica:
+    def __init__(self, address):
+        host, _, port = address.partition(":")
+        self.name = address
+        self.pool = ConnectionPool(
+            partial(_connect_replica, host, int(port or DB_PORT)),
+            size=DB_REPLICA_POOL_SIZE,
+            max_overflow=DB_POOL_MAX_OVERFLOW,
+            timeout=DB_POOL_TIMEOUT,
+            recycle=DB_POOL_RECYCLE,
+            pre_ping=DB_POOL_PRE_PING,
+        )
+        self._lock = threading.Lock()
+        self.lag = None        # seconds behind at the last check, None until known
+        self.checked_at = 0.0  # monotonic time of the last lag check
+        self.down_until = 0.0  # skipped until then after a connection failure
+
+    def _claim_check(self):
+        # Exactly one request per interval re-reads the lag; the rest use the last value
+        with self._lock:
+            now = time.monotonic()
+            if now - self.checked_at < DB_REPLICA_CHECK_INTERVAL:
+                return False
+            self.checked_at = now
+            return True
+
+    def _mark_down(self, err):
+        app.logger.warning(f"Read replica {self.name} unavailable, reading from the primary: {err}")
+        with self._lock:
+            self.down_until = time.monotonic() + DB_REPLICA_RETRY_INTERVAL
+            self.checked_at = 0.0
+            self.lag = None
+
+    def usable(self):
+        return self.down_until <= time.monotonic()
+
+    def acquire(self):
+        # A request-scoped connection if this replica is fresh enough, else None
+        check = self._claim_check()
+        if not check and (self.lag is None or self.lag > DB_REPLICA_MAX_LAG):
+            return None
+        try:
+            conn = self.pool.acquire(request_scoped=True)
+        except mysql.connector.errors.PoolError:
+            return None  # busy, not broken
+        except mysql.connector.Error as err:
+            self._mark_down(err)
+            return None
+        if check:
+            try:
+                self.lag = replication_lag(conn._raw)
+            except mysql.connector.Error as err:
+                conn.release()
+                self._mark_down(err)
+                return None
+        if self.lag is None or self.lag > DB_REPLICA_MAX_LAG:
+            conn.release()
+            return None
+        return conn
+
+    def stats(self):
+        stats = self.pool.stats()
+        stats["lag"] = self.lag
+        stats["down"] = not self.usable()
+        return stats
+
+replicas = [Replica(address) for address in DB_REPLICA_HOSTS]
+
+def reads_pinned_to_primary():
+    if g.get("db_wrote"):
+        return True
+    return has_request_context() and session.get("read_primary_until", 0) > time.time()
+
+def get_read_connection():
+    # Like get_db_connection(), for views that never write
+    if not replicas or not has_app_context():
+        return get_db_connection()
+    conn = g.get("db_read_conn")
+    if conn is not None:
+        return conn
+
+    route = "pinned"
+    if not reads_pinned_to_primary():
+        route = "fallback"
+        for replica in random.sample(replicas, len(replicas)):
+            conn = replica.acquire() if replica.usable() else None
+            if conn is not None:
+                route = "replica"
+                break
+    DB_READ_ROUTES.inc(route)
+    conn = g.db_read_conn = conn or get_db_connection()
+    return conn
+
+@app.after_request
+def pin_reads_after_write(response):
+    if replicas and g.get("db_wrote"):
+        session["read_primary_until"] = time.time() + DB_READ_YOUR_WRITES
+    return response
+
+@app.route("/health/db-pool")
+@ops_only
+def db_pool_health():
+    stats = db_pool.stats()
+    if replicas:
+        stats["replicas"] = {replica.name: replica.stats() for replica in replicas}
+    return stats
 
 def execute_sql_file(cursor, filename):
     with open(filename, "r") as f:
@@ -76,44 +826,221 @@ def execute_sql_file(cursor, filename):
             if statement.lower().startswith("select"):
                 cursor.fetchall()
 
+# Endpoints that never need to know who the user is
+IDENTITY_EXEMPT_ENDPOINTS = {"static"}
+
+USER_IDENTITY_QUERY = """
+    SELECT u.user_id, u.email, u.name, u.role_id, r.role_name,
+           u.status, u.cougar_id, u.signature_path
+    FROM users u
+    LEFT JOIN roles r ON u.role_id = r.role_id
+    WHERE u.email = %s
+"""
+
+def load_user_identity(conn, cursor, email, name=None):
+    # One SELECT for returning users; first-time users get an insert and a re-read on top.
+    cursor.execute(USER_IDENTITY_QUERY, (email,))
+    user = cursor.fetchone()
+    if user or not name:
+        return user
+
+    cursor.execute(
+        "INSERT IGNORE INTO users (email, name, signature_path) VALUES (%s, %s, NULL)",
+        (email, name)
+    )
+    conn.commit()
+    # Read the row back (ours, or one a concurrent request created first) so role
+    # and status come from the column defaults and roles table, not from here
+    cursor.execute(USER_IDENTITY_QUERY, (email,))
+    return cursor.fetchone()
+
+def current_user():
+    return g.get("user")
+
+# User identity cache (per gunicorn worker)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 2048))           # max cached users
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 30))              # upper bound on staleness, seconds
+USER_CACHE_SYNC_INTERVAL = float(os.getenv("USER_CACHE_SYNC_INTERVAL", 5))  # how often to check the version stamp
+
+class VersionStamp:
+    # A named row in cache_versions. Workers poll it to notice writes made
+    # elsewhere; a writer bumps it before commit so the new version lands in
+    # the same transaction as the write it announces.
+    def __init__(self, name, poll_interval):
+        self.name = name
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._last_poll = 0.0
+
+    def claim_poll(self):
+        # True for exactly one caller once per poll_interval
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_poll < self.poll_interval:
+                return False
+            self._last_poll = now
+            return True
+
+    def bump(self, cursor):
+        cursor.execute("UPDATE cache_versions SET version = version + 1 WHERE name = %s", (self.name,))
+
+class UserCache:
+    # Bounded TTL + LRU cache of user identity rows keyed by email. Writes in any
+    # worker bump cache_versions.users; every worker polls that stamp at most once
+    # per sync_interval and drops everything when it moves. Keys are lowercased:
+    # MySQL matches emails case-insensitively, so Foo@ and foo@ are one user.
+    def __init__(self, max_size, ttl, sync_interval):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stamp = VersionStamp("users", sync_interval)
+        self._entries = OrderedDict()  # email -> (expires_at, user)
+        self._lock = threading.Lock()
+        self._version = None
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "version_resets": 0,
+        }
+
+    def get(self, email):
+        email = email.lower()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(email)
+                    self._counters["hits"] += 1
+                    return dict(entry[1])
+                del self._entries[email]
+                self._counters["expired"] += 1
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, email, user):
+        email = email.lower()
+        with self._lock:
+            self._entries[email] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def invalidate(self, email):
+        email = email.lower()
+        with self._lock:
+            if self._entries.pop(email, None) is not None:
+                self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def apply_version(self, version):
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self._counters["version_resets"] += 1
+                self._entries.clear()
+                self._version = version
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["size"] = len(self._entries)
+            stats["version"] = self._version
+        stats["max_size"] = self.max_size
+        stats["ttl"] = self.ttl
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL, USER_CACHE_SYNC_INTERVAL)
+
+def sync_user_cache():
+    if not user_cache.stamp.claim_poll():
+        return
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM cache_versions WHERE name = 'users'")
+        row = cursor.fetchone()
+        cursor.close()
+        user_cache.apply_version(row[0] if row else None)
+    except mysql.connector.Error as err:
+        # Without the stamp we still never serve anything older than the TTL
+        app.logger.warning(f"User cache version check failed: {err}")
+
+def lookup_user(email, name=None):
+    sync_user_cache()
+    user = user_cache.get(email)
+    if user is None:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        user = load_user_identity(conn, cursor, email, name)
+        cursor.close()
+        if user:
+            user_cache.put(email, user)
+    return user
+
+def get_role_name(email):
+    user = lookup_user(email) if email else None
+    return user["role_name"] if user else None
+
+def invalidate_user(cursor, *emails):
+    for email in emails:
+        user_cache.invalidate(email)
+    try:
+        user_cache.stamp.bump(cursor)
+    except mysql.connector.Error as err:
+        app.logger.warning(f"Could not bump user cache version: {err}")
+
+@app.route("/health/user-cache")
+@ops_only
+def user_cache_health():
+    return user_cache.stats()
+
 @app.before_request
-def add_user_to_db():
-    # First, parse the Easy Auth header.
-    parse_easy_auth_headers()
+def resolve_identity():
+    # Replaces the old add_user_to_db / reset_and_check_cougar_id / check_user_status
+    # hooks: decode the Easy Auth header once, load the user row once, keep it on g.
+    g.user = None
+    if request.endpoint in IDENTITY_EXEMPT_ENDPOINTS:
+        return
+    if request.endpoint in OPS_ENDPOINTS and has_ops_token():
+        return
 
-    # Now see if session["user"] is set.
-    user_info = session.get("user")
-    if user_info:
-        email = user_info.get("email")
-        name = user_info.get("name")
+    # Always clear Cougar ID verification
+    session.pop("cougar_verified", None)
 
-        if email and name:
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("SELECT email FROM users WHERE email = %s", (email,))
-                existing_user = cursor.fetchone()
-
-                if not existing_user:
-                    # Modified to include signature_path as NULL initially
-                    cursor.execute(
-                        "INSERT INTO users (email, name, signature_path) VALUES (%s, %s, NULL)", 
-                        (email, name)
-                    )
-                    conn.commit()
-                else:
-                    # checks for current cougar id
-                    cursor.execute("SELECT cougar_id FROM users WHERE email = %s", (email,))
-                    result = cursor.fetchone()
-                    if result and not result[0] and request.endpoint not in ("set_cougar_id", "static"):
-                        return redirect(url_for("set_cougar_id"))
+    user_info = parse_easy_auth_headers()
+    if not user_info or not user_info.get("email"):
+        return
 
-            except mysql.connector.Error as err:
-                app.logger.error(f"Database error: {err}")
-                conn.rollback()
-            finally:
-                cursor.close()
-                conn.close()
+    try:
+        g.user = lookup_user(user_info["email"], user_info.get("name"))
+    except mysql.connector.Error as err:
+        # Leave g.user unset, the connection is rolled back in teardown
+        app.logger.error(f"Database error: {err}")
+        return
+
+    user = g.user
+    if not user:
+        return
+
+    # If status is inactive show them the disabled page
+    # skips endpoints to avoid infinite loop
+    if user["status"] == "inactive":
+        if request.endpoint not in ("disabled_access", "some_logout_route"):
+            return redirect(url_for('disabled_access'))
+        return
+
+    # checks for current cougar id
+    if not user["cougar_id"] and request.endpoint != "set_cougar_id":
+        return redirect(url_for("set_cougar_id"))
 
 #Initializes database connection
 @app.route("/init-db")
@@ -128,120 +1055,619 @@ def init_db():
 
         conn.commit()
         cursor.close()
+
+        # Bring the fresh baseline schema up to the latest migration
+        applied = run_migrations(conn)
         conn.close()
-        return "Database initialized successfully!"
+        return f"Database initialized successfully! Applied migrations: {', '.join(applied) or 'none'}"
+    except mysql.connector.Error as err:
+        return f"SQL Execution Error: {err}", 500
+
+# --- Static assets ---
+# `flask build-assets` copies every file under static/ (user uploads aside) to
+# static/dist/ under a content-hashed name, precompresses text assets to .gz/.br
+# siblings and writes static/dist/manifest.json. url_for('static', ...) then
+# links the hashed copy, which can be cached for a year. Without a manifest, as
+# in local development, static files are served as they always were.
+
+ASSET_DIST_DIR = "dist"
+ASSET_SKIP_DIRS = {"signatures", ASSET_DIST_DIR}  # uploads are named by their own content hash
+ASSET_COMPRESS_EXTENSIONS = {".js", ".css", ".svg", ".json", ".txt", ".html", ".map"}
+ASSET_MIN_COMPRESS_BYTES = 512  # smaller files are not worth a second request path
+ASSET_MAX_AGE = int(os.getenv("ASSET_MAX_AGE", 31536000))  # seconds, for hashed names only
+ASSET_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # preferred first
+
+asset_manifest = {}   # logical name -> hashed name, both relative to static/
+asset_encodings = {}  # hashed name -> precompressed encodings on disk
+
+def asset_manifest_path():
+    return os.path.join(app.static_folder, ASSET_DIST_DIR, "manifest.json")
+
+def load_asset_manifest():
+    try:
+        with open(asset_manifest_path()) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    asset_manifest.clear()
+    asset_manifest.update(manifest)
+    # Probe for variants once here rather than on every request
+    asset_encodings.clear()
+    for hashed in manifest.values():
+        path = os.path.join(app.static_folder, hashed)
+        asset_encodings[hashed] = {encoding for encoding, suffix in ASSET_ENCODINGS
+                                   if os.path.exists(path + suffix)}
+
+def write_file_atomic(path, data):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def build_assets():
+    static_dir = app.static_folder
+    manifest = {}
+    for root, dirs, files in os.walk(static_dir):
+        if root == static_dir:
+            dirs[:] = [d for d in dirs if d not in ASSET_SKIP_DIRS]
+        for name in files:
+            if name.startswith("."):
+                continue
+            src = os.path.join(root, name)
+            logical = os.path.relpath(src, static_dir).replace(os.sep, "/")
+            with open(src, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(logical)
+            hashed = f"{ASSET_DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            manifest[logical] = hashed
+
+            dest = os.path.join(static_dir, hashed)
+            if os.path.exists(dest):
+                continue
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            if ext.lower() in ASSET_COMPRESS_EXTENSIONS and len(data) >= ASSET_MIN_COMPRESS_BYTES:
+                # Highest levels: this runs once per deploy, not per response
+                variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    variants[".br"] = brotli.compress(data, quality=11)
+                for suffix, compressed in variants.items():
+                    if len(compressed) < len(data):
+                        write_file_atomic(dest + suffix, compressed)
+            # The plain file goes last, so a hashed name never exists without its variants
+            write_file_atomic(dest, data)
+
+    write_file_atomic(asset_manifest_path(), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    load_asset_manifest()
+    return manifest
+
+load_asset_manifest()
+
+@app.url_defaults
+def hashed_static_url(endpoint, values):
+    if endpoint == "static" and asset_manifest:
+        hashed = asset_manifest.get(values.get("filename"))
+        if hashed:
+            values["filename"] = hashed
+
+def serve_static(filename):
+    # Replaces Flask's static view. "static" is in IDENTITY_EXEMPT_ENDPOINTS, so
+    # none of this touches the session or the database.
+    encodings = asset_encodings.get(filename)
+    if encodings is None:
+        return app.send_static_file(filename)
+
+    rv = None
+    for encoding, suffix in ASSET_ENCODINGS:
+        if encoding in encodings and request.accept_encodings.quality(encoding) > 0:
+            rv = send_from_directory(app.static_folder, filename + suffix,
+                                     mimetype=mimetypes.guess_type(filename)[0])
+            rv.headers["Content-Encoding"] = encoding
+            break
+    if rv is None:
+        rv = app.send_static_file(filename)
+    if encodings:
+        rv.vary.add("Accept-Encoding")
+    rv.cache_control.public = True
+    rv.cache_control.max_age = ASSET_MAX_AGE
+    rv.cache_control.immutable = True
+    rv.cache_control.no_cache = None
+    rv.headers.pop("Expires", None)
+    return rv
+
+app.view_functions["static"] = serve_static
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Write content-hashed, precompressed copies of static/ and their manifest."""
+    manifest = build_assets()
+    click.echo(f"{len(manifest)} asset(s) in {asset_manifest_path()}")
+
+# --- Schema migrations ---
+# database_template.sql is the baseline; every later schema change is a numbered
+# file in migrations/ (NNNN_description.sql) applied once and recorded in schema_migrations.
+
+MIGRATIONS_DIR = os.path.join(app.root_path, "migrations")
+
+def list_migrations():
+    migrations = []
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.match(r"(\d+)_(\w+)\.sql$", filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return migrations
+
+def run_migrations(conn):
+    cursor = conn.cursor(buffered=True)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(256) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    applied_versions = {row[0] for row in cursor.fetchall()}
+
+    applied = []
+    for version, name, path in list_migrations():
+        if version in applied_versions:
+            continue
+        app.logger.info(f"Applying migration {version:04d}_{name}")
+        # DDL commits implicitly, so record each migration as soon as it has run
+        execute_sql_file(cursor, path)
+        cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+        applied.append(f"{version:04d}_{name}")
+    cursor.close()
+    return applied
+
+# Hot queries and the index each one should be driven by. check_query_indexes()
+# runs EXPLAIN on each and reports which access path the optimizer picked.
+HOT_QUERIES = [
+    {
+        "name": "lookup_reports",
+        "sql": """SELECT r.report_id FROM reports r
+                  WHERE r.reporter_cougar_id = %s ORDER BY r.created_at DESC""",
+        "params": ("0000000",),
+        "table": "r",
+        "indexes": {"idx_reports_cougar_created"},
+    },
+    {
+        "name": "admin_reports_page",
+        "sql": """SELECT r.report_id FROM reports r
+                  ORDER BY r.created_at DESC, r.report_id DESC LIMIT 26""",
+        "params": (),
+        "table": "r",
+        "indexes": {"idx_reports_created"},
+    },
+    {
+        "name": "admin_petitions_page",
+        "sql": """SELECT req.request_id FROM requests req WHERE req.form_type = %s
+                  ORDER BY req.submitted_at DESC, req.request_id DESC LIMIT 26""",
+        "params": ("petition",),
+        "table": "req",
+        "indexes": {"idx_requests_form_submitted"},
+    },
+    {
+        "name": "documents_by_request",
+        "sql": "SELECT d.document_path FROM documents d WHERE d.request_id = %s",
+        "params": (0,),
+        "table": "d",
+        "indexes": {"request_id"},  # InnoDB's foreign key index
+    },
+    {
+        "name": "user_search_email",
+        "sql": """SELECT u.email, u.name FROM users u
+                  WHERE u.status = 'active' AND u.email LIKE %s ORDER BY u.email LIMIT 10""",
+        "params": ("a%",),
+        "table": "u",
+        "indexes": {"idx_users_status_email"},
+    },
+    {
+        "name": "user_search_name",
+        "sql": """SELECT u.email, u.name FROM users u
+                  WHERE u.status = 'active' AND u.name LIKE %s ORDER BY u.name LIMIT 10""",
+        "params": ("a%",),
+        "table": "u",
+        "indexes": {"idx_users_status_name"},
+    },
+    {
+        "name": "inbox_page",
+        "sql": """SELECT i.inbox_id FROM approval_inbox i WHERE i.user_id = %s
+                  ORDER BY i.created_at, i.inbox_id LIMIT 26""",
+        "params": (0,),
+        "table": "i",
+        "indexes": {"idx_approval_inbox_user_created"},
+    },
+    {
+        "name": "user_identity",
+        "sql": "SELECT u.user_id FROM users u WHERE u.email = %s",
+        "params": ("nobody@example.com",),
+        "table": "u",
+        "indexes": {"email"},
+    },
+]
+
+def check_query_indexes(conn):
+    # "ok": the expected index is used. "small_table": it is possible but the optimizer
+    # preferred a scan (normal on near-empty tables). "missing": no usable index at all.
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    results = []
+    for query in HOT_QUERIES:
+        cursor.execute("EXPLAIN " + query["sql"], query["params"])
+        plan = [row for row in cursor.fetchall() if row["table"] == query["table"]]
+        row = plan[0] if plan else {}
+        key = row.get("key")
+        possible = set((row.get("possible_keys") or "").split(","))
+        if key in query["indexes"]:
+            status = "ok"
+        elif query["indexes"] & possible or row.get("type") == "index":
+            status = "small_table"
+        else:
+            status = "missing"
+        results.append({
+            "query": query["name"],
+            "status": status,
+            "key": key,
+            "type": row.get("type"),
+            "rows": row.get("rows"),
+            "expected": sorted(query["indexes"]),
+        })
+    cursor.close()
+    return results
+
+@app.cli.command("migrate")
+def migrate_command():
+    """Apply pending migrations from migrations/."""
+    conn = get_db_connection()
+    applied = run_migrations(conn)
+    click.echo(f"Applied: {', '.join(applied)}" if applied else "Schema is up to date.")
+
+@app.cli.command("check-indexes")
+def check_indexes_command():
+    """EXPLAIN the hot queries and fail if one cannot use its index."""
+    conn = get_db_connection()
+    results = check_query_indexes(conn)
+    for result in results:
+        click.echo(f"{result['status']:12} {result['query']:22} key={result['key']} "
+                   f"type={result['type']} rows={result['rows']}")
+    if any(result["status"] == "missing" for result in results):
+        raise SystemExit(1)
+
+@app.route("/migrate-db", methods=["POST"])
+def migrate_db():
+    user = current_user()
+    if not user or user["role_name"] != "admin":
+        return "You must be admin to run migrations.", 403
+    try:
+        conn = get_db_connection()
+        applied = run_migrations(conn)
+        return {"applied": applied, "index_checks": check_query_indexes(conn)}
     except mysql.connector.Error as err:
         return f"SQL Execution Error: {err}", 500
 
 @app.route("/", methods=["GET"])
 def home():
     return render_template("index.html")
-@app.route("/adminpanel.html", methods=["GET"])
-def admin_panel():
+# --- Admin panel pagination ---
+
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", 25))          # rows per section by default
+ADMIN_PAGE_SIZE_MAX = int(os.getenv("ADMIN_PAGE_SIZE_MAX", 200))  # hard cap on ?page_size=
+
+USER_STATUSES = ("active", "inactive")
+REQUEST_STATUSES = ("draft", "submitted", "returned", "approved", "pending")
+REPORT_STATUSES = ("submitted", "under_review", "approved_by_moderator",
+                   "dismissed_by_moderator", "resolved", "dismissed")
+
+class InvalidCursor(ValueError):
+    pass
+
+def cursor_signature(payload):
+    digest = hmac.new(app.secret_key.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:12]).decode("ascii")
+
+def encode_cursor(*values):
+    # Signed, so a cursor only ever carries sort keys this app handed out
+    raw = json.dumps(values, default=str).encode("utf-8")
+    payload = base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+    return f"{payload}.{cursor_signature(payload)}"
+
+def decode_cursor(token, size):
+    # No cursor means the first page; a cursor we did not issue is a 400
+    if not token:
+        return None
+    payload, _, signature = token.partition(".")
+    if not token.isascii() or not hmac.compare_digest(signature, cursor_signature(payload)):
+        raise InvalidCursor(token)
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        values = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(values, list) or len(values) != size \
+            or not all(isinstance(value, (str, int, float)) for value in values):
+        raise InvalidCursor(token)
+    return values
+
+@app.errorhandler(InvalidCursor)
+def invalid_cursor(err):
+    return {"error": "Invalid page cursor, start again from the first page"}, 400
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+    except ValueError:
+        return None
 
-        # Load users with access level info (now includes moderator)
-        cursor.execute("""
-            SELECT 
-                u.email AS username, 
-                CASE 
-                    WHEN r.role_name = 'admin' THEN 'administrator'
-                    WHEN r.role_name = 'moderator' THEN 'moderator'
-                    ELSE 'basic'
-                END AS access_level,
-                u.status,
-                u.signature_path
-            FROM users u
-            JOIN roles r ON u.role_id = r.role_id
-            ORDER BY u.email
-        """)
-        users = cursor.fetchall()
+def admin_page_size(args):
+    try:
+        size = int(args.get("page_size", ADMIN_PAGE_SIZE))
+    except ValueError:
+        size = ADMIN_PAGE_SIZE
+    return max(1, min(size, ADMIN_PAGE_SIZE_MAX))
+
+def admin_filters(args):
+    category = args.get("reports_category", "")
+    return {
+        "users_status": args.get("users_status") if args.get("users_status") in USER_STATUSES else None,
+        "users_q": args.get("users_q", "").strip() or None,
+        "petitions_form_type": args.get("petitions_form_type", "petition").strip() or None,
+        "petitions_status": args.get("petitions_status") if args.get("petitions_status") in REQUEST_STATUSES else None,
+        "reports_status": args.get("reports_status") if args.get("reports_status") in REPORT_STATUSES else None,
+        "reports_category": int(category) if category.isdigit() else None,
+        "date_from": parse_date(args.get("date_from")),
+        "date_to": parse_date(args.get("date_to")),
+    }
 
-        # Load petitions
-        cursor.execute("""
-            SELECT
-                req.request_id,
-                req.status AS req_status,
-                req.form_type,
-                req.submitted_at,
-                u.email,
-                u.user_id,
-                d.document_path
-            FROM requests req
-            JOIN users u ON req.user_id = u.user_id
-            LEFT JOIN documents d ON req.request_id = d.request_id
-            WHERE req.form_type = 'petition'
-            ORDER BY req.submitted_at DESC
-        """)
-        petitions = cursor.fetchall()
+def like_prefix(value):
+    # LIKE pattern matching values that start with `value` literally
+    return value.replace("\\", "\\\\").replace("%", r"\%").replace("_", r"\_") + "%"
+
+def fetch_page(cursor, sql, where, params, order_by, limit):
+    # Runs a keyset-paginated query: one extra row tells us whether there is a next page
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_by} LIMIT %s"
+    cursor.execute(sql, (*params, limit + 1))
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    return rows[:limit], has_more
+
+def fetch_admin_users(cursor, filters, after, limit):
+    where, params = [], []
+    if filters["users_status"]:
+        where.append("u.status = %s")
+        params.append(filters["users_status"])
+    if filters["users_q"]:
+        where.append("u.email LIKE %s")
+        params.append(like_prefix(filters["users_q"]))
+    after = decode_cursor(after, 1)
+    if after:
+        where.append("u.email > %s")
+        params.append(after[0])
+
+    # Load users with access level info (now includes moderator)
+    rows, has_more = fetch_page(cursor, """
+        SELECT
+            u.email AS username,
+            CASE
+                WHEN r.role_name = 'admin' THEN 'administrator'
+                WHEN r.role_name = 'moderator' THEN 'moderator'
+                ELSE 'basic'
+            END AS access_level,
+            u.status,
+            u.signature_path
+        FROM users u
+        JOIN roles r ON u.role_id = r.role_id
+    """, where, params, "u.email", limit)
+    next_cursor = encode_cursor(rows[-1]["username"]) if has_more else None
+    return rows, next_cursor
+
+def fetch_admin_petitions(cursor, filters, after, limit):
+    where, params = [], []
+    if filters["petitions_form_type"]:
+        where.append("req.form_type = %s")
+        params.append(filters["petitions_form_type"])
+    if filters["petitions_status"]:
+        where.append("req.status = %s")
+        params.append(filters["petitions_status"])
+    if filters["date_from"]:
+        where.append("req.submitted_at >= %s")
+        params.append(filters["date_from"])
+    if filters["date_to"]:
+        where.append("req.submitted_at < %s + INTERVAL 1 DAY")
+        params.append(filters["date_to"])
+    after = decode_cursor(after, 2)
+    if after:
+        where.append("(req.submitted_at < %s OR (req.submitted_at = %s AND req.request_id < %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    # Latest document per request, so a request never spans two rows (or two pages)
+    rows, has_more = fetch_page(cursor, """
+        SELECT
+            req.request_id,
+            req.status AS req_status,
+            req.form_type,
+            req.submitted_at,
+            u.email,
+            u.user_id,
+            d.document_path
+        FROM requests req
+        JOIN users u ON req.user_id = u.user_id
+        LEFT JOIN documents d ON d.document_id = (
+            SELECT MAX(d2.document_id) FROM documents d2 WHERE d2.request_id = req.request_id
+        )
+    """, where, params, "req.submitted_at DESC, req.request_id DESC", limit)
+    next_cursor = encode_cursor(rows[-1]["submitted_at"], rows[-1]["request_id"]) if has_more else None
+    return rows, next_cursor
+
+def fetch_admin_reports(cursor, filters, after, limit):
+    where, params = [], []
+    if filters["reports_status"]:
+        where.append("r.status = %s")
+        params.append(filters["reports_status"])
+    if filters["reports_category"]:
+        where.append("r.category_id = %s")
+        params.append(filters["reports_category"])
+    if filters["date_from"]:
+        where.append("r.created_at >= %s")
+        params.append(filters["date_from"])
+    if filters["date_to"]:
+        where.append("r.created_at < %s + INTERVAL 1 DAY")
+        params.append(filters["date_to"])
+    after = decode_cursor(after, 2)
+    if after:
+        where.append("(r.created_at < %s OR (r.created_at = %s AND r.report_id < %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    rows, has_more = fetch_page(cursor, """
+        SELECT r.report_id,
+               reporter.email  AS reporter_email,
+               reported.email  AS reported_email,
+               rc.category_name,
+               r.description,
+               r.status,
+               r.created_at,
+               r.moderator_comments,
+               r.admin_comments
+        FROM   reports           r
+        JOIN   users   reporter  ON reporter.user_id = r.reporter_id
+        JOIN   users   reported  ON reported.user_id = r.reported_user_id
+        JOIN   report_categories rc ON rc.category_id = r.category_id
+    """, where, params, "r.created_at DESC, r.report_id DESC", limit)
+    next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["report_id"]) if has_more else None
+    return rows, next_cursor
+
+def fetch_mod_reports(cursor, filters, after, limit):
+    where, params = [], []
+    if filters["reports_status"]:
+        where.append("r.status = %s")
+        params.append(filters["reports_status"])
+    after = decode_cursor(after, 2)
+    if after:
+        where.append("(r.created_at < %s OR (r.created_at = %s AND r.report_id < %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    rows, has_more = fetch_page(cursor, """
+        SELECT r.report_id,
+               reporter.email AS reporter_email,
+               r.reporter_cougar_id,
+               r.reported_user_id,
+               rc.category_name,
+               r.description,
+               r.status,
+               r.moderator_comments,
+               r.created_at
+        FROM reports r
+        JOIN users reporter ON reporter.user_id = r.reporter_id
+        JOIN report_categories rc ON rc.category_id = r.category_id
+    """, where, params, "r.created_at DESC, r.report_id DESC", limit)
+    next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["report_id"]) if has_more else None
+    return rows, next_cursor
 
-        # Load reports
-        cursor.execute("""
-            SELECT r.report_id,
-                   reporter.email  AS reporter_email,
-                   reported.email  AS reported_email,
-                   rc.category_name,
-                   r.description,
-                   r.status,
-                   r.created_at,
-                   r.moderator_comments,
-                   r.admin_comments
-            FROM   reports           r
-            JOIN   users   reporter  ON reporter.user_id = r.reporter_id
-            JOIN   users   reported  ON reported.user_id = r.reported_user_id
-            JOIN   report_categories rc ON rc.category_id = r.category_id
-            ORDER  BY r.created_at DESC
-        """)
-        reports = cursor.fetchall()
+@app.route("/adminpanel.html", methods=["GET"])
+def admin_panel():
+    # Only the page shell: each section loads itself from the JSON API below
+    filters = admin_filters(request.args)
+    limit = admin_page_size(request.args)
 
+    try:
+        conn = get_read_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT category_id, category_name FROM report_categories ORDER BY category_name")
+        categories = cursor.fetchall()
         cursor.close()
         conn.close()
 
-        return render_template("adminpanel.html", users=users, petitions=petitions, reports=reports)
+        return render_template("adminpanel.html", categories=categories, filters=filters, page_size=limit,
+                               user_statuses=USER_STATUSES, request_statuses=REQUEST_STATUSES,
+                               report_statuses=REPORT_STATUSES)
 
     except Exception as e:
         return f"Error fetching users: {str(e)}", 500
 
-@app.before_request
-def reset_and_check_cougar_id():
-    # Always clear Cougar ID verification
-    session.pop("cougar_verified", None)
-
-    parse_easy_auth_headers()
-
-    user_info = session.get("user")
-    if user_info:
-        email = user_info.get("email")
-        name = user_info.get("name")
-
-        if email and name:
-            try:
-                conn = get_db_connection()
-                cursor = conn.cursor()
-
-                cursor.execute("SELECT email FROM users WHERE email = %s", (email,))
-                existing_user = cursor.fetchone()
+# --- Panel data API ---
+
+# section -> (fetch function, roles allowed, fields a client may ask for)
+PANEL_SECTIONS = {
+    "users": (fetch_admin_users, ("admin",),
+              ("username", "access_level", "status", "signature_path", "signature_url")),
+    "petitions": (fetch_admin_petitions, ("admin",),
+                  ("request_id", "req_status", "form_type", "submitted_at", "email", "user_id",
+                   "document_path", "pdf_url")),
+    "reports": (fetch_admin_reports, ("admin",),
+                ("report_id", "reporter_email", "reported_email", "category_name", "description",
+                 "status", "created_at", "moderator_comments", "admin_comments")),
+    "moderator_reports": (fetch_mod_reports, ("admin", "moderator"),
+                          ("report_id", "reporter_email", "reporter_cougar_id", "reported_user_id",
+                           "category_name", "description", "status", "moderator_comments", "created_at")),
+}
+
+def panel_item(section, row, fields):
+    # Derived URLs are only built when asked for
+    if section == "users" and "signature_url" in fields:
+        row["signature_url"] = url_for("static", filename=row["signature_path"]) if row["signature_path"] else None
+    if section == "petitions" and "pdf_url" in fields:
+        row["pdf_url"] = url_for("download_pdf", request_id=row["request_id"]) if row["document_path"] else None
+    item = {}
+    for field in fields:
+        value = row.get(field)
+        item[field] = value.isoformat() if hasattr(value, "isoformat") else value
+    return item
+
+def panel_json_response(body):
+    # Clients revalidate every time; an unchanged section costs a 304 and no body
+    rv = app.json.response(body)
+    rv.add_etag()
+    rv.cache_control.private = True
+    rv.cache_control.no_cache = True
+    return rv.make_conditional(request)
+
+def panel_section_response(section):
+    fetch, roles, allowed_fields = PANEL_SECTIONS[section]
+
+    user = current_user()
+    if not user or user["role_name"] not in roles:
+        return {"error": "You do not have access to this section."}, 403
+
+    fields = allowed_fields
+    if request.args.get("fields"):
+        fields = tuple(f.strip() for f in request.args["fields"].split(",") if f.strip())
+        unknown = [f for f in fields if f not in allowed_fields]
+        if unknown:
+            return {"error": f"Unknown fields: {', '.join(unknown)}", "allowed": list(allowed_fields)}, 400
+
+    filters = admin_filters(request.args)
+    limit = admin_page_size(request.args)
+    try:
+        conn = get_read_connection()
+        cursor = conn.cursor(dictionary=True)
+        rows, next_cursor = fetch(cursor, filters, request.args.get("after"), limit)
+        body = {
+            "section": section,
+            "items": [panel_item(section, row, fields) for row in rows],
+            "next_cursor": next_cursor,
+        }
+        if section == "moderator_reports" and not request.args.get("after"):
+            # Queue totals for the moderator panel header, on the first page only
+            cursor.execute("SELECT status, COUNT(*) AS n FROM reports GROUP BY status")
+            body["counts"] = {row["status"]: row["n"] for row in cursor.fetchall()}
+        cursor.close()
+    except mysql.connector.Error as err:
+        return {"error": f"Database error: {err}"}, 500
 
-                if not existing_user:
-                    cursor.execute(
-                        "INSERT INTO users (email, name, signature_path) VALUES (%s, %s, NULL)", 
-                        (email, name)
-                    )
-                    conn.commit()
+    return panel_json_response(body)
 
-                cursor.execute("SELECT cougar_id FROM users WHERE email = %s", (email,))
-                result = cursor.fetchone()
-                if result and not result[0] and request.endpoint not in ("set_cougar_id", "static"):
-                    return redirect(url_for("set_cougar_id"))
+@app.route("/api/admin/<section>")
+@query_budget(2)
+def admin_panel_api(section):
+    if section not in ("users", "petitions", "reports"):
+        return {"error": f"Unknown section: {section}"}, 404
+    return panel_section_response(section)
 
-            except mysql.connector.Error as err:
-                app.logger.error(f"Database error: {err}")
-                conn.rollback()
-            finally:
-                cursor.close()
-                conn.close()
+@app.route("/api/moderator/reports")
+@query_budget(2)
+def mod_panel_api():
+    return panel_section_response("moderator_reports")
 
 @app.route("/update-report", methods=["POST"])
 def update_report():
@@ -263,14 +1689,7 @@ def update_report():
         cursor = conn.cursor(dictionary=True)
 
         # Check if admin
-        cursor.execute("""
-            SELECT r.role_name
-            FROM users u
-            JOIN roles r ON u.role_id = r.role_id
-            WHERE u.email = %s
-        """, (admin_email,))
-        role_row = cursor.fetchone()
-        if not role_row or role_row["role_name"] != "admin":
+        if get_role_name(admin_email) != "admin":
             return "You must be admin to update reports.", 403
 
         # Update report with status and comments
@@ -327,21 +1746,12 @@ def toggle_status():
         cursor = conn.cursor(dictionary=True)
 
         # Checks if current user is admin
-        cursor.execute("""
-            SELECT r.role_name
-            FROM users u
-            JOIN roles r ON u.role_id = r.role_id
-            WHERE u.email = %s
-        """, (current_user_email,))
-        current_user = cursor.fetchone()
-
-        if not current_user or current_user["role_name"] != "admin":
+        if get_role_name(current_user_email) != "admin":
             cursor.close()
             conn.close()
             return "You do not have permission to toggle user status.", 403
 
-        cursor.execute("SELECT status FROM users WHERE email = %s", (user_email_to_toggle,))
-        row = cursor.fetchone()
+        row = lookup_user(user_email_to_toggle)
         if not row:
             cursor.close()
             conn.close()
@@ -359,6 +1769,7 @@ def toggle_status():
             SET status = %s
             WHERE email = %s
         """, (new_status, user_email_to_toggle))
+        invalidate_user(cursor, user_email_to_toggle)
         conn.commit()
 
         cursor.close()
@@ -369,36 +1780,12 @@ def toggle_status():
 
     return redirect(url_for("admin_panel"))
 
-@app.before_request
-def check_user_status():
-    # Makes it so if a user is detected as disabled they see a different page
-    # skips endpoints to avoid infinite loop
-    if request.endpoint in ("disabled_access", "static", "some_logout_route"):
-        return
-        
-    # Checks if user is logged in
-    user_info = session.get("user")
-    if not user_info:
-        return
-        
-    # Get status of user in database
-    email = user_info.get("email")
-    if not email:
-        return
-
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT status FROM users WHERE email = %s", (email,))
-        row = cursor.fetchone()
-        cursor.close()
-        conn.close()
-
-        # If status is inactive show them the disabled page lol
-        if row and row["status"] == "inactive":
-            return redirect(url_for('disabled_access'))
-    except Exception:
-        pass
+# Map access level strings to integer role IDs
+ACCESS_LEVEL_ROLE_IDS = {
+    "basic": 2,          # matches 'basicuser'
+    "moderator": 3,      # new role
+    "administrator": 1   # matches 'admin'
+}
 
 @app.route("/disabled")
 def disabled_access():
@@ -410,20 +1797,14 @@ def update_user():
     username = request.form.get("username")
     new_access_level = request.form.get("access_level")
 
-    # Map access level strings to integer role IDs
-    role_map = {
-        "basic": 2,          # matches 'basicuser'
-        "moderator": 3,      # new role
-        "administrator": 1   # matches 'admin'
-    }
-
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
         # Update the user's role
         update_query = "UPDATE users SET role_id = %s WHERE email = %s"
-        cursor.execute(update_query, (role_map[new_access_level], username))
+        cursor.execute(update_query, (ACCESS_LEVEL_ROLE_IDS[new_access_level], username))
+        invalidate_user(cursor, username)
         conn.commit()
 
         # Re-fetch all users with role information
@@ -446,6 +1827,213 @@ def update_user():
         return f"Error updating user: {str(e)}", 500
 
 
+# --- Bulk admin actions ---
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 500))  # targets accepted per bulk request
+
+REQUEST_BULK_ACTIONS = {"approve": "approved", "return": "returned"}
+REPORT_CLOSED_STATUSES = ("resolved", "dismissed")
+
+def bulk_param(name):
+    # Bulk endpoints take a JSON body or an ordinary form post
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        return data.get(name)
+    return request.form.get(name)
+
+def bulk_targets(name, cast=str):
+    # Returns (targets, rejected): targets de-duplicated in request order,
+    # rejected being values that could not be cast
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        values = data.get(name) or []
+        if not isinstance(values, list):
+            values = [values]
+    else:
+        values = request.form.getlist(name)
+
+    targets, rejected = [], []
+    for value in values:
+        value = str(value).strip()
+        if not value:
+            continue
+        try:
+            targets.append(cast(value))
+        except ValueError:
+            rejected.append(value)
+    return list(dict.fromkeys(targets)), rejected
+
+def lock_bulk_targets(cursor, table, key, column, targets):
+    # One round trip for the current state of every target, locked until commit
+    # so the per-item summary matches what the UPDATEs actually did
+    placeholders = ", ".join(["%s"] * len(targets))
+    cursor.execute(f"""
+        SELECT {key} AS target, {column} AS current
+        FROM {table}
+        WHERE {key} IN ({placeholders})
+        FOR UPDATE
+    """, tuple(targets))
+    return {str(row["target"]).lower(): row["current"] for row in cursor.fetchall()}
+
+def bulk_response(action, key, results):
+    summary = {}
+    for item in results:
+        summary[item["result"]] = summary.get(item["result"], 0) + 1
+    body = {"action": action, "summary": summary, "results": results}
+    if request.is_json or wants_json():
+        return body
+    return render_template("bulk_result.html", key=key, **body)
+
+def check_bulk_size(targets, rejected, name):
+    if not targets and not rejected:
+        return f"No {name} provided", 400
+    if len(targets) + len(rejected) > BULK_MAX_ITEMS:
+        return f"Too many {name}: at most {BULK_MAX_ITEMS} per request", 413
+    return None
+
+@app.route("/admin/bulk/users", methods=["POST"])
+def bulk_update_users():
+    admin = current_user()
+    if not admin or admin["role_name"] != "admin":
+        return "You must be admin to update users.", 403
+
+    emails, _ = bulk_targets("emails")
+    error = check_bulk_size(emails, [], "emails")
+    if error:
+        return error
+
+    action = bulk_param("action")  # 'enable', 'disable' or 'set_role'
+    if action in ("enable", "disable"):
+        column, value = "status", "active" if action == "enable" else "inactive"
+    elif action == "set_role":
+        access_level = bulk_param("access_level")
+        if access_level not in ACCESS_LEVEL_ROLE_IDS:
+            return "Invalid access level", 400
+        column, value = "role_id", ACCESS_LEVEL_ROLE_IDS[access_level]
+    else:
+        return "Invalid action", 400
+
+    results, changed = [], []
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        current = lock_bulk_targets(cursor, "users", "email", column, emails)
+
+        for email in emails:
+            if email.lower() not in current:
+                results.append({"email": email, "result": "not_found"})
+            elif email.lower() == admin["email"].lower() and action != "enable":
+                # An admin demoting or disabling themselves locks everyone out of this page
+                results.append({"email": email, "result": "skipped", "reason": "cannot change your own account"})
+            elif current[email.lower()] == value:
+                results.append({"email": email, "result": "unchanged"})
+            else:
+                changed.append(email)
+                results.append({"email": email, "result": "updated"})
+
+        if changed:
+            cursor.executemany(f"UPDATE users SET {column} = %s WHERE email = %s",
+                               [(value, email) for email in changed])
+            invalidate_user(cursor, *changed)
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+
+    return bulk_response(action, "email", results)
+
+@app.route("/admin/bulk/requests", methods=["POST"])
+def bulk_update_requests():
+    admin = current_user()
+    if not admin or admin["role_name"] != "admin":
+        return "You must be admin to approve requests.", 403
+
+    request_ids, rejected = bulk_targets("request_ids", int)
+    error = check_bulk_size(request_ids, rejected, "request_ids")
+    if error:
+        return error
+
+    action = bulk_param("action") or "approve"
+    if action not in REQUEST_BULK_ACTIONS:
+        return "Invalid action", 400
+    new_status = REQUEST_BULK_ACTIONS[action]
+
+    results = [{"request_id": value, "result": "invalid"} for value in rejected]
+    changed = []
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        if request_ids:
+            current = lock_bulk_targets(cursor, "requests", "request_id", "status", request_ids)
+        for request_id in request_ids:
+            status = current.get(str(request_id))
+            if status is None:
+                results.append({"request_id": request_id, "result": "not_found"})
+            elif status == new_status:
+                results.append({"request_id": request_id, "result": "unchanged"})
+            else:
+                changed.append(request_id)
+                results.append({"request_id": request_id, "result": "updated"})
+
+        if changed:
+            cursor.executemany("UPDATE requests SET status = %s WHERE request_id = %s",
+                               [(new_status, request_id) for request_id in changed])
+            close_request_workflow(cursor, changed)
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+
+    return bulk_response(action, "request_id", results)
+
+@app.route("/admin/bulk/reports", methods=["POST"])
+def bulk_update_reports():
+    admin = current_user()
+    if not admin or admin["role_name"] != "admin":
+        return "You must be admin to update reports.", 403
+
+    report_ids, rejected = bulk_targets("report_ids", int)
+    error = check_bulk_size(report_ids, rejected, "report_ids")
+    if error:
+        return error
+
+    action = bulk_param("action")  # 'resolved' or 'dismissed'
+    if action not in REPORT_CLOSED_STATUSES:
+        return "Invalid action", 400
+    admin_comments = bulk_param("admin_comments") or None
+
+    results = [{"report_id": value, "result": "invalid"} for value in rejected]
+    changed = []
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        if report_ids:
+            current = lock_bulk_targets(cursor, "reports", "report_id", "status", report_ids)
+        for report_id in report_ids:
+            status = current.get(str(report_id))
+            if status is None:
+                results.append({"report_id": report_id, "result": "not_found"})
+            elif status in REPORT_CLOSED_STATUSES:
+                results.append({"report_id": report_id, "result": "skipped", "reason": f"already {status}"})
+            else:
+                changed.append(report_id)
+                results.append({"report_id": report_id, "result": "updated"})
+
+        if changed:
+            cursor.executemany("""
+                UPDATE reports
+                SET status = %s,
+                    resolved_by = %s,
+                    admin_comments = COALESCE(%s, admin_comments)
+                WHERE report_id = %s
+            """, [(action, admin["user_id"], admin_comments, report_id) for report_id in changed])
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+
+    return bulk_response(action, "report_id", results)
+
 # Processes the form submission from the landing page
 @app.route("/apply", methods=["POST"])
 def apply():
@@ -469,6 +2057,7 @@ def apply():
         return f"Database Error: {err}", 500
 
 @app.route("/report-user", methods=["POST"])
+@query_budget(3)
 def report_user():
     # Get form data
     reporter_email = session.get("user", {}).get("email")
@@ -495,15 +2084,11 @@ def report_user():
         if reporter_email == reported_email:
             return "You cannot report yourself", 400
                
-        cursor.execute("SELECT user_id FROM users WHERE email = %s", (reporter_email,))
-        reporter = cursor.fetchone()
+        # Reporter row (with Cougar ID) was already loaded by resolve_identity
+        reporter = current_user()
         if not reporter:
             return "Reporter not found", 404
-
-        # Get Cougar ID
-        cursor.execute("SELECT cougar_id FROM users WHERE email = %s", (reporter_email,))
-        cougar_id_row = cursor.fetchone()
-        cougar_id = cougar_id_row["cougar_id"] if cougar_id_row else None
+        cougar_id = reporter["cougar_id"]
 
         # Insert report
         cursor.execute("""
@@ -524,8 +2109,7 @@ def report_user():
         ))
 
         # Get the reporter's name for confirmation message
-        cursor.execute("SELECT name FROM users WHERE email = %s", (reporter_email,))
-        reporter_name = cursor.fetchone()['name']
+        reporter_name = reporter['name']
         
         conn.commit()
         cursor.close()
@@ -542,25 +2126,213 @@ def report_user():
         return f"Unexpected error: {str(e)}", 500
     
 @app.route("/report")
+@query_budget(1)
 def report_form():
-    conn   = get_db_connection()
+    conn   = get_read_connection()
     cursor = conn.cursor(dictionary=True)
 
-    # Get active categories
+    # Get active categories; users are looked up as the reporter types (search_users)
     cursor.execute("SELECT category_id, category_name FROM report_categories WHERE is_active")
     categories = cursor.fetchall()
 
-    # Get active users
-    cursor.execute("SELECT user_id, name, email FROM users WHERE status = 'active'")
-    users = cursor.fetchall()
-
     cursor.close()
     conn.close()
 
-    return render_template("report.html", categories=categories, users=users)
+    return render_template("report.html", categories=categories)
+
+# Typeahead for the report form
+USER_SEARCH_LIMIT = int(os.getenv("USER_SEARCH_LIMIT", 10))  # matches returned per query
+USER_SEARCH_MIN_CHARS = 2
+
+@app.route("/users/search")
+@query_budget(1)
+def search_users():
+    user = current_user()
+    if not user:
+        return {"error": "You must be logged in"}, 403
 
+    q = request.args.get("q", "").strip()
+    try:
+        limit = max(1, min(int(request.args.get("limit", USER_SEARCH_LIMIT)), USER_SEARCH_LIMIT))
+    except ValueError:
+        limit = USER_SEARCH_LIMIT
+    if len(q) < USER_SEARCH_MIN_CHARS:
+        return {"users": []}
+
+    # Two prefix range scans, on (status, email) and (status, name), each
+    # stopping after `limit` rows; the union is at most 2 * limit rows
+    pattern = like_prefix(q)
+    try:
+        cursor = get_read_connection().cursor(dictionary=True)
+        cursor.execute("""
+            (SELECT email, name FROM users
+             WHERE status = 'active' AND email LIKE %s ORDER BY email LIMIT %s)
+            UNION
+            (SELECT email, name FROM users
+             WHERE status = 'active' AND name LIKE %s ORDER BY name LIMIT %s)
+            ORDER BY email
+            LIMIT %s
+        """, (pattern, limit + 1, pattern, limit + 1, limit + 1))
+        rows = cursor.fetchall()
+        cursor.close()
+    except mysql.connector.Error as err:
+        return {"error": f"Database error: {err}"}, 500
+
+    # You cannot report yourself, so never suggest it
+    users = [row for row in rows if row["email"].lower() != user["email"].lower()][:limit]
+    rv = app.json.response({"users": users})
+    # Repeated keystrokes over the same prefix come from the browser cache
+    rv.cache_control.private = True
+    rv.cache_control.max_age = 60
+    return rv
+
+# --- Signature uploads ---
+# Uploads are streamed to a temp file, normalized to a small metadata-free PNG
+# (when Pillow is installed) and stored under the hash of their final bytes, so
+# identical signatures share one file. A file is deleted once no user points at it.
+
+SIGNATURE_DIR = os.path.join(app.root_path, "static", "signatures")
+SIGNATURE_MAX_SIZE = (int(os.getenv("SIGNATURE_MAX_WIDTH", 600)),
+                      int(os.getenv("SIGNATURE_MAX_HEIGHT", 200)))  # box signatures are downscaled into
+SIGNATURE_MAX_PIXELS = int(os.getenv("SIGNATURE_MAX_PIXELS", 25_000_000))  # refuse to decode anything larger
+SIGNATURE_GC_GRACE = int(os.getenv("SIGNATURE_GC_GRACE", 300))  # seconds a fresh file is safe from the sweep
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+SIGNATURE_MAGIC = {b"\x89PNG\r\n\x1a\n": "png", b"\xff\xd8\xff": "jpg"}
+
+def sniff_image_type(head):
+    # Trust the leading bytes, not the client's filename
+    for magic, kind in SIGNATURE_MAGIC.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+def spool_upload(file, dest_dir):
+    # Copy the upload to a temp file in dest_dir chunk by chunk; returns (path, type, sha256)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, suffix=".part")
+    digest = hashlib.sha256()
+    head = b""
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                if len(head) < 8:
+                    head += chunk[:8 - len(head)]
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, sniff_image_type(head), digest.hexdigest()
+
+def normalize_signature(path):
+    # Downscaled PNG bytes with EXIF, ICC profiles and text chunks dropped
+    try:
+        with Image.open(path) as img:
+            if img.width * img.height > SIGNATURE_MAX_PIXELS:
+                raise ValueError("Image dimensions are too large")
+            if img.format == "JPEG":
+                # Let the JPEG decoder scale down while decoding instead of after
+                img.draft("RGB", (max(SIGNATURE_MAX_SIZE),) * 2)
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(SIGNATURE_MAX_SIZE)
+            has_alpha = "A" in img.getbands() or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+    except (OSError, Image.DecompressionBombError) as err:
+        raise ValueError(f"Could not read image: {err}")
+    img.info = {}
+    buf = io.BytesIO()
+    img.save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+def store_signature(file):
+    # Returns the static-relative path of the stored signature; ValueError for bad images
+    os.makedirs(SIGNATURE_DIR, exist_ok=True)
+    tmp_path, kind, digest = spool_upload(file, SIGNATURE_DIR)
+    try:
+        if kind is None:
+            raise ValueError("File is not a PNG or JPEG image")
+        if Image is not None:
+            data = normalize_signature(tmp_path)
+            digest, kind = hashlib.sha256(data).hexdigest(), "png"
+            with open(tmp_path, "wb") as out:
+                out.write(data)
+        filename = f"{digest[:32]}.{kind}"
+        dest = os.path.join(SIGNATURE_DIR, filename)
+        if os.path.exists(dest):
+            # Already stored for someone; refresh mtime so the sweep leaves it alone
+            os.utime(dest)
+        else:
+            os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return f"signatures/{filename}"
+
+def signature_file(path):
+    # Absolute path for a users.signature_path value, or None if it is not ours
+    if not path or not path.startswith("signatures/"):
+        return None
+    name = path[len("signatures/"):]
+    if not name or name != os.path.basename(name):
+        return None
+    return os.path.join(SIGNATURE_DIR, name)
+
+def collect_signature(cursor, path):
+    # Delete a superseded signature unless another user still points at it
+    full_path = signature_file(path)
+    if not full_path:
+        return False
+    cursor.execute("SELECT 1 FROM users WHERE signature_path = %s LIMIT 1", (path,))
+    if cursor.fetchone():
+        return False
+    try:
+        if time.time() - os.path.getmtime(full_path) < SIGNATURE_GC_GRACE:
+            # May have just been deduped into by an upload that has not committed yet
+            return False
+        os.remove(full_path)
+    except FileNotFoundError:
+        return False
+    return True
+
+def remove_unreferenced(directory, keep, cutoff):
+    removed = 0
+    os.makedirs(directory, exist_ok=True)
+    for entry in os.scandir(directory):
+        if entry.name.startswith(".") or not entry.is_file() or entry.name in keep:
+            continue
+        if entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+def sweep_signatures(cursor):
+    # Remove files no user references: leftovers from the grace window,
+    # pre-hash timestamped uploads, .part files from interrupted writes and
+    # pdflatex assets of signatures that have been replaced
+    cursor.execute("SELECT DISTINCT signature_path FROM users WHERE signature_path IS NOT NULL")
+    referenced = {row[0] for row in cursor.fetchall()}
+    assets = set()
+    for path in referenced:
+        try:
+            assets.add(signature_asset_name(path))
+        except OSError:
+            continue
+    cutoff = time.time() - SIGNATURE_GC_GRACE
+    removed = remove_unreferenced(SIGNATURE_DIR, {os.path.basename(path) for path in referenced}, cutoff)
+    return removed + remove_unreferenced(SIGNATURE_ASSET_DIR, assets, cutoff)
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(err):
+    limit_mb = MAX_UPLOAD_BYTES / (1024 * 1024)
+    if request.endpoint == "upload_signature":
+        return redirect(url_for('profile', error=f'File is too large (limit {limit_mb:g} MB)'))
+    return f"Request body is too large (limit {limit_mb:g} MB)", 413
 
 @app.route('/upload-signature', methods=['POST'])
+@query_budget(3)
 def upload_signature():
     if 'signature' not in request.files:
         return redirect(url_for('profile', error='No file selected'))
@@ -569,62 +2341,75 @@ def upload_signature():
     if file.filename == '':
         return redirect(url_for('profile', error='No selected file'))
 
-    if file and allowed_file(file.filename):
-        try:
-            # Create unique filename using timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = secure_filename(f"{timestamp}_{file.filename}")
-            
-            # Ensure the signatures directory exists in static folder
-            signatures_dir = os.path.join('static', 'signatures')
-            os.makedirs(signatures_dir, exist_ok=True)
-            
-            # Save file in static/signatures
-            filepath = os.path.join(signatures_dir, filename)
-            file.save(filepath)
-            
-            # Log the file save
-            app.logger.info(f"Saved signature file to: {filepath}")
-            
-            # Update database with signature path
-            user_info = session.get("user")
-            if user_info and user_info.get("email"):
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                
-                # Store path relative to static directory
-                relative_path = f"signatures/{filename}"  # Use forward slash for web paths
-                cursor.execute(
-                    "UPDATE users SET signature_path = %s WHERE email = %s",
-                    (relative_path, user_info["email"])
-                )
-                
-                conn.commit()
-                cursor.close()
-                conn.close()
-                
-                app.logger.info(f"Updated database with signature path: {relative_path}")
-                return render_template('upload_success.html')
-            else:
-                return redirect(url_for('profile', error='User not authenticated'))
-                
-        except Exception as e:
-            app.logger.error(f"Error uploading file: {str(e)}")
-            return redirect(url_for('profile', error=f'Error uploading file: {str(e)}'))
-            
-    return redirect(url_for('profile', error='Invalid file type'))
+    if not allowed_file(file.filename):
+        return redirect(url_for('profile', error='Invalid file type'))
+
+    user = current_user()
+    if not user:
+        return redirect(url_for('profile', error='User not authenticated'))
 
-@app.route("/profile", methods=["GET"])
-def profile():
-    user_info = session.get("user")
-    if not user_info:
-        return redirect(url_for('home'))
-    
+    try:
+        relative_path = store_signature(file)
+    except ValueError as e:
+        return redirect(url_for('profile', error=str(e)))
+    except OSError as e:
+        app.logger.error(f"Error saving signature: {e}")
+        return redirect(url_for('profile', error=f'Error uploading file: {e}'))
+    app.logger.info(f"Stored signature file: {relative_path}")
+
+    previous_path = user.get("signature_path")
     try:
         conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT name, email, signature_path 
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE users SET signature_path = %s WHERE user_id = %s",
+            (relative_path, user["user_id"])
+        )
+        invalidate_user(cursor, user["email"])
+        conn.commit()
+
+        # Convert for pdflatex now, so no form submission ever has to
+        try:
+            signature_asset(relative_path)
+        except (OSError, ValueError) as e:
+            app.logger.warning(f"Could not build signature asset for {relative_path}: {e}")
+
+        if previous_path and previous_path != relative_path:
+            try:
+                if collect_signature(cursor, previous_path):
+                    app.logger.info(f"Removed superseded signature file: {previous_path}")
+            except (OSError, mysql.connector.Error) as e:
+                # Left for the gc-signatures sweep
+                app.logger.warning(f"Could not remove {previous_path}: {e}")
+        cursor.close()
+        conn.close()
+    except mysql.connector.Error as e:
+        app.logger.error(f"Error uploading file: {e}")
+        return redirect(url_for('profile', error=f'Error uploading file: {e}'))
+
+    app.logger.info(f"Updated database with signature path: {relative_path}")
+    return render_template('upload_success.html')
+
+@app.cli.command("gc-signatures")
+def gc_signatures_command():
+    """Delete signature files that no user references."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    removed = sweep_signatures(cursor)
+    cursor.close()
+    click.echo(f"Removed {removed} unreferenced signature file(s)")
+
+@app.route("/profile", methods=["GET"])
+def profile():
+    user_info = session.get("user")
+    if not user_info:
+        return redirect(url_for('home'))
+    
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT name, email, signature_path 
             FROM users 
             WHERE email = %s
         """, (user_info["email"],))
@@ -660,6 +2445,7 @@ def set_cougar_id():
             conn = get_db_connection()
             cursor = conn.cursor()
             cursor.execute("UPDATE users SET cougar_id = %s WHERE email = %s", (id1, email))
+            invalidate_user(cursor, email)
             conn.commit()
             cursor.close()
             conn.close()
@@ -695,134 +2481,1997 @@ def verify_cougar_id():
             return f"Error verifying Cougar ID: {str(e)}", 500
 
     return render_template("verify_cougar_id.html")
-   
-petitionTemplate = r"""
-\documentclass{{article}}
-\begin{{document}}
-\section*{{Petition Form}}
-
-\textbf{{Name:}} {lname}, {fname} {mname} \\
-\textbf{{Contact Phone Number:}} {phone} \\
-\textbf{{myUH ID:}} {myUH} \\
-\textbf{{UH Email:}} {uhEmail} \\
-\textbf{{Program:}} {program} \\
-\textbf{{Alias:}} {alias} \\
-\textbf{{Purpose of Petition:}} {purpose_of_petition} \\
-\textbf{{Institution Name:}} {institution_name} \\
-\textbf{{City/State/Zip:}} {city_state_zip} \\
-\textbf{{Courses Approved for Transfer:}} {courses_transfer} \\
-\textbf{{Hours Previously Transferred:}} {hours_transferred} \\
-\textbf{{Transfer Credits on this Request:}} {transfer_credits} \\
-\textbf{{Explanation of Request:}} \\
-{explanation}
-
-\end{{document}}
+
+# --- Approval routing ---
+# A submitted request is matched to the most specific active workflow for its form
+# type, and every step of that workflow gets its approvers resolved up front into
+# `approvals` rows. Unit hierarchy questions are answered by org_unit_closure.
+
+def insert_org_unit(cursor, parent_id, unit_name, unit_code, description=None):
+    cursor.execute("""
+        INSERT INTO organizational_units (parent_id, unit_name, unit_code, description)
+        VALUES (%s, %s, %s, %s)
+    """, (parent_id, unit_name, unit_code, description))
+    unit_id = cursor.lastrowid
+    # The new unit inherits every ancestor path of its parent, plus itself at depth 0
+    cursor.execute("""
+        INSERT INTO org_unit_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, %s, depth + 1 FROM org_unit_closure WHERE descendant_id = %s
+        UNION ALL
+        SELECT %s, %s, 0
+    """, (unit_id, parent_id, unit_id, unit_id))
+    return unit_id
+
+def move_org_unit(cursor, unit_id, new_parent_id):
+    if new_parent_id is not None:
+        cursor.execute("""
+            SELECT 1 FROM org_unit_closure WHERE ancestor_id = %s AND descendant_id = %s
+        """, (unit_id, new_parent_id))
+        if cursor.fetchall():
+            raise ValueError("A unit cannot be moved under itself or one of its descendants")
+
+    cursor.execute("UPDATE organizational_units SET parent_id = %s WHERE unit_id = %s",
+                   (new_parent_id, unit_id))
+    # Drop the paths from outside the subtree into it, then graft it under the new parent
+    cursor.execute("""
+        DELETE c FROM org_unit_closure c
+        JOIN org_unit_closure sub ON sub.descendant_id = c.descendant_id AND sub.ancestor_id = %s
+        LEFT JOIN org_unit_closure inside ON inside.ancestor_id = %s AND inside.descendant_id = c.ancestor_id
+        WHERE inside.ancestor_id IS NULL
+    """, (unit_id, unit_id))
+    if new_parent_id is not None:
+        cursor.execute("""
+            INSERT INTO org_unit_closure (ancestor_id, descendant_id, depth)
+            SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+            FROM org_unit_closure sup
+            JOIN org_unit_closure sub ON sub.ancestor_id = %s
+            WHERE sup.descendant_id = %s
+        """, (unit_id, new_parent_id))
+
+def rebuild_unit_closure(cursor):
+    # For units loaded straight into the database (seed scripts, manual fixes)
+    cursor.execute("DELETE FROM org_unit_closure")
+    cursor.execute("""
+        INSERT INTO org_unit_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE paths AS (
+            SELECT unit_id AS ancestor_id, unit_id AS descendant_id, 0 AS depth
+            FROM organizational_units
+            UNION ALL
+            SELECT p.ancestor_id, u.unit_id, p.depth + 1
+            FROM paths p
+            JOIN organizational_units u ON u.parent_id = p.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM paths
+    """)
+    return cursor.rowcount
+
+def primary_unit_for(cursor, user_id):
+    cursor.execute("""
+        SELECT unit_id FROM user_organizational_units
+        WHERE user_id = %s
+        ORDER BY is_primary DESC, user_ou_id
+        LIMIT 1
+    """, (user_id,))
+    row = cursor.fetchone()
+    return row["unit_id"] if row else None
+
+def select_workflow(cursor, form_type, unit_id):
+    # Nearest workflow wins: the requester's own unit, then each ancestor, then
+    # organization-wide (unit_id IS NULL) workflows; newest version first
+    cursor.execute("""
+        SELECT w.workflow_id
+        FROM workflows w
+        LEFT JOIN org_unit_closure c ON c.ancestor_id = w.unit_id AND c.descendant_id = %s
+        WHERE w.request_type = %s
+          AND w.is_active
+          AND (w.unit_id IS NULL OR c.ancestor_id IS NOT NULL)
+        ORDER BY w.unit_id IS NULL, c.depth, w.version DESC, w.workflow_id DESC
+        LIMIT 1
+    """, (unit_id, form_type))
+    row = cursor.fetchone()
+    return row["workflow_id"] if row else None
+
+def resolve_step_approvers(cursor, step, requester_unit_id):
+    # Returns the user_ids that may approve one workflow step
+    if step["approval_type"] == "user":
+        return [step["user_id"]] if step["user_id"] else []
+
+    if step["approval_type"] == "role":
+        cursor.execute("SELECT user_id FROM users WHERE role_id = %s AND status = 'active'",
+                       (step["role_id"],))
+        return [row["user_id"] for row in cursor.fetchall()]
+
+    # 'unit': approvers of the step's unit, or of the requester's own unit when the
+    # step names none. If that unit has no approvers the nearest ancestor that
+    # does is used, falling back to organization-level approvers (unit_id IS NULL).
+    unit_id = step["unit_id"] or requester_unit_id
+    cursor.execute("""
+        SELECT a.user_id, c.depth
+        FROM org_unit_closure c
+        JOIN approvers a ON a.unit_id = c.ancestor_id
+        WHERE c.descendant_id = %s
+        UNION ALL
+        SELECT a.user_id, 2147483647 AS depth
+        FROM approvers a
+        WHERE a.unit_id IS NULL
+        ORDER BY depth
+    """, (unit_id,))
+    rows = cursor.fetchall()
+    if not rows:
+        return []
+    nearest = rows[0]["depth"]
+    return [row["user_id"] for row in rows if row["depth"] == nearest]
+
+def route_request(cursor, request_id):
+    # Writes one pending approvals row per (step, approver). Returns the number of
+    # rows written, or None when no workflow applies to this form type.
+    cursor.execute("SELECT user_id, form_type FROM requests WHERE request_id = %s", (request_id,))
+    req = cursor.fetchone()
+    if not req:
+        return None
+
+    unit_id = primary_unit_for(cursor, req["user_id"])
+    workflow_id = select_workflow(cursor, req["form_type"], unit_id)
+    if workflow_id is None:
+        return None
+
+    cursor.execute("""
+        SELECT step_id, step_order, approval_type, unit_id, role_id, user_id, is_required
+        FROM workflow_steps
+        WHERE workflow_id = %s
+        ORDER BY step_order
+    """, (workflow_id,))
+    steps = cursor.fetchall()
+
+    rows = []
+    for step in steps:
+        # Nobody approves their own request
+        approvers = [user_id for user_id in dict.fromkeys(resolve_step_approvers(cursor, step, unit_id))
+                     if user_id != req["user_id"]]
+        if not approvers and step["is_required"]:
+            app.logger.warning(f"Request {request_id}: required step {step['step_id']} "
+                               f"of workflow {workflow_id} has no approvers")
+        scope_unit_id = step["unit_id"] or unit_id
+        rows.extend((request_id, approver_id, step["step_id"], scope_unit_id) for approver_id in approvers)
+
+    if rows:
+        cursor.executemany("""
+            INSERT INTO approvals (request_id, approver_id, step_id, unit_id, status)
+            VALUES (%s, %s, %s, %s, 'pending')
+        """, rows)
+        refresh_request_inbox(cursor, request_id)
+    return len(rows)
+
+@app.route("/requests/<int:request_id>/approvals")
+def request_approvals(request_id):
+    # Routing result for the requester and admins
+    user = current_user()
+    if not user:
+        return {"error": "You must be logged in"}, 403
+
+    try:
+        cursor = get_read_connection().cursor(dictionary=True)
+        cursor.execute("SELECT user_id, status FROM requests WHERE request_id = %s", (request_id,))
+        req = cursor.fetchone()
+        if not req or (req["user_id"] != user["user_id"] and user["role_name"] != "admin"):
+            return {"error": "Request not found"}, 404
+        cursor.execute("""
+            SELECT a.approval_id, a.step_id, s.step_order, s.approval_type, u.email AS approver_email,
+                   a.status, a.comments, a.approved_at
+            FROM approvals a
+            JOIN users u ON u.user_id = a.approver_id
+            LEFT JOIN workflow_steps s ON s.step_id = a.step_id
+            WHERE a.request_id = %s
+            ORDER BY s.step_order, a.approval_id
+        """, (request_id,))
+        approvals = cursor.fetchall()
+        cursor.close()
+    except mysql.connector.Error as err:
+        return {"error": f"Database error: {err}"}, 500
+
+    return {"request_id": request_id, "status": req["status"], "approvals": approvals}
+
+@app.cli.command("rebuild-unit-closure")
+def rebuild_unit_closure_command():
+    """Recompute org_unit_closure from organizational_units.parent_id."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    count = rebuild_unit_closure(cursor)
+    conn.commit()
+    cursor.close()
+    click.echo(f"org_unit_closure: {count} paths")
+
+@app.cli.command("add-org-unit")
+@click.argument("unit_name")
+@click.argument("unit_code")
+@click.option("--parent", "parent_id", type=int, help="unit_id of the parent unit (omit for a top-level unit).")
+@click.option("--description")
+def add_org_unit_command(unit_name, unit_code, parent_id, description):
+    """Create an organizational unit and its org_unit_closure paths."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    unit_id = insert_org_unit(cursor, parent_id, unit_name, unit_code, description)
+    conn.commit()
+    cursor.close()
+    click.echo(f"Created unit {unit_id}")
+
+@app.cli.command("move-org-unit")
+@click.argument("unit_id", type=int)
+@click.option("--parent", "new_parent_id", type=int, help="unit_id of the new parent (omit to make it top-level).")
+def move_org_unit_command(unit_id, new_parent_id):
+    """Move an organizational unit, with its subtree, under a new parent."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT unit_id FROM organizational_units WHERE unit_id IN (%s, %s)",
+                   (unit_id, new_parent_id))
+    found = {row[0] for row in cursor.fetchall()}
+    missing = {unit_id, new_parent_id} - found - {None}
+    if missing:
+        raise click.ClickException(f"No organizational unit with unit_id={min(missing)}")
+    try:
+        move_org_unit(cursor, unit_id, new_parent_id)
+    except ValueError as err:
+        conn.rollback()
+        raise click.ClickException(str(err))
+    conn.commit()
+    cursor.close()
+    click.echo(f"Moved unit {unit_id}")
+
+# --- Delegations ---
+# "Who is acting for approver X in unit Y right now" is answered from memory.
+# Writes in any worker bump cache_versions.delegates; the other workers then
+# re-read only the delegates rows changed since their last sync.
+
+DELEGATION_SYNC_INTERVAL = float(os.getenv("DELEGATION_SYNC_INTERVAL", 5))         # how often to check the version stamp
+DELEGATION_REBUILD_INTERVAL = float(os.getenv("DELEGATION_REBUILD_INTERVAL", 3600))  # full reload (catches cascaded deletes)
+DELEGATION_SWEEP_INTERVAL = float(os.getenv("DELEGATION_SWEEP_INTERVAL", 300))      # seconds between expiry sweeps
+DELEGATION_SYNC_MARGIN = 60  # seconds of overlap between delta syncs, for transactions in flight
+
+DELEGATION_COLUMNS = """
+    delegation_id, parent_approver_id, delegate_user_id, unit_id, start_date, end_date, status
 """
-@app.route('/petition')
-def petition():
-    return render_template('petition.html')
 
-@app.route('/PetitionSubmit', methods=['POST'])
-def submit():
-    user_info = session.get("user")
-    if not user_info:
+class DelegationIndex:
+    # Active delegations keyed by (approver_id, unit_id). Each key holds its windows
+    # sorted by start_date, so a lookup is a bisect for the latest window that has
+    # started. Expired windows are swept out, so that is almost always the answer.
+    def __init__(self, sync_interval, rebuild_interval):
+        self.stamp = VersionStamp("delegates", sync_interval)
+        self.rebuild_interval = rebuild_interval
+        self._starts = {}   # key -> [start_date, ...]
+        self._windows = {}  # key -> [(start_date, end_date, delegation_id, delegate_user_id), ...]
+        self._keys = {}     # delegation_id -> key
+        self._lock = threading.Lock()
+        self._version = None
+        self._watermark = None
+        self._last_rebuild = None
+        self._counters = {"lookups": 0, "hits": 0, "upserts": 0, "rebuilds": 0, "delta_syncs": 0}
+
+    def _remove(self, delegation_id):
+        key = self._keys.pop(delegation_id, None)
+        if key is None:
+            return
+        windows = self._windows[key]
+        i = next(i for i, window in enumerate(windows) if window[2] == delegation_id)
+        del windows[i]
+        del self._starts[key][i]
+        if not windows:
+            del self._windows[key]
+            del self._starts[key]
+
+    def _add(self, row):
+        if row["status"] != "active":
+            return
+        key = (row["parent_approver_id"], row["unit_id"])
+        window = (row["start_date"], row["end_date"], row["delegation_id"], row["delegate_user_id"])
+        windows = self._windows.setdefault(key, [])
+        i = bisect.bisect_right(windows, window)
+        windows.insert(i, window)
+        self._starts.setdefault(key, []).insert(i, window[0])
+        self._keys[row["delegation_id"]] = key
+
+    def apply(self, rows):
+        # Incremental update with freshly read delegates rows
+        with self._lock:
+            for row in rows:
+                self._remove(row["delegation_id"])
+                self._add(row)
+                self._counters["upserts"] += 1
+
+    def replace_all(self, rows, version, watermark):
+        with self._lock:
+            self._starts.clear()
+            self._windows.clear()
+            self._keys.clear()
+            for row in rows:
+                self._add(row)
+            self._version = version
+            self._watermark = watermark
+            self._last_rebuild = time.monotonic()
+            self._counters["rebuilds"] += 1
+
+    def advance(self, version, watermark):
+        with self._lock:
+            self._version = version
+            self._watermark = watermark
+            self._counters["delta_syncs"] += 1
+
+    def sync_plan(self, version):
+        # "rebuild", "delta" or None, given the current version stamp
+        with self._lock:
+            if self._last_rebuild is None or time.monotonic() - self._last_rebuild > self.rebuild_interval:
+                return "rebuild"
+            if version != self._version:
+                return "delta"
+            return None
+
+    @property
+    def watermark(self):
+        return self._watermark
+
+    def acting_for(self, approver_id, unit_id, at):
+        with self._lock:
+            self._counters["lookups"] += 1
+            key = (approver_id, unit_id)
+            starts = self._starts.get(key)
+            if not starts:
+                return None
+            windows = self._windows[key]
+            i = bisect.bisect_right(starts, at)
+            # Latest window that has started wins; older ones only if it already ended
+            while i > 0:
+                i -= 1
+                start_date, end_date, delegation_id, delegate_user_id = windows[i]
+                if end_date >= at:
+                    self._counters["hits"] += 1
+                    return {"delegation_id": delegation_id, "delegate_user_id": delegate_user_id,
+                            "start_date": start_date, "end_date": end_date}
+            return None
+
+    def upcoming(self, approver_id, unit_id, at):
+        # Every window that has not ended yet, current or future
+        with self._lock:
+            return [window for window in self._windows.get((approver_id, unit_id), ()) if window[1] >= at]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["keys"] = len(self._windows)
+            stats["delegations"] = len(self._keys)
+            stats["version"] = self._version
+        stats["sync_interval"] = self.stamp.poll_interval
+        stats["rebuild_interval"] = self.rebuild_interval
+        return stats
+
+delegation_index = DelegationIndex(DELEGATION_SYNC_INTERVAL, DELEGATION_REBUILD_INTERVAL)
+
+def sync_delegations():
+    if not delegation_index.stamp.claim_poll():
+        return
+    start_sweeper("delegation-sweeper", DELEGATION_SWEEP_INTERVAL, expire_delegations_periodically)
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT (SELECT version FROM cache_versions WHERE name = 'delegates') AS version,
+                   CURRENT_TIMESTAMP AS now
+        """)
+        stamp = cursor.fetchone()
+        plan = delegation_index.sync_plan(stamp["version"])
+        if plan == "rebuild":
+            cursor.execute(f"SELECT {DELEGATION_COLUMNS} FROM delegates WHERE status = 'active'")
+            delegation_index.replace_all(cursor.fetchall(), stamp["version"], stamp["now"])
+        elif plan == "delta":
+            cursor.execute(f"""
+                SELECT {DELEGATION_COLUMNS} FROM delegates
+                WHERE updated_at >= %s - INTERVAL {DELEGATION_SYNC_MARGIN} SECOND
+            """, (delegation_index.watermark,))
+            delegation_index.apply(cursor.fetchall())
+            delegation_index.advance(stamp["version"], stamp["now"])
+        cursor.close()
+        conn.close()
+    except mysql.connector.Error as err:
+        app.logger.warning(f"Delegation index sync failed: {err}")
+
+def acting_delegate(approver_id, unit_id, at=None):
+    # The delegation currently standing in for an approvers row in a unit, if any
+    sync_delegations()
+    return delegation_index.acting_for(approver_id, unit_id, at or datetime.now())
+
+def refresh_delegations(cursor, delegation_ids):
+    # After a local write: re-read just those rows into this worker's index
+    if not delegation_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(delegation_ids))
+    cursor.execute(f"SELECT {DELEGATION_COLUMNS} FROM delegates WHERE delegation_id IN ({placeholders})",
+                   tuple(delegation_ids))
+    delegation_index.apply(cursor.fetchall())
+
+def sweep_expired_delegations():
+    # One statement marks every lapsed delegation; workers pick it up via the version stamp
+    now = datetime.now()
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE delegates SET status = 'expired'
+            WHERE status = 'active' AND end_date < %s
+        """, (now,))
+        expired = cursor.rowcount
+        if expired:
+            delegation_index.stamp.bump(cursor)
+        # Reads already ignore lapsed rows, this only keeps the table small
+        cursor.execute("DELETE FROM approval_inbox WHERE active_until < %s", (now,))
+        conn.commit()
+        cursor.close()
+        return expired
+    finally:
+        conn.close()
+
+_sweepers_started = set()
+_sweepers_lock = threading.Lock()
+
+def start_sweeper(name, interval, sweep):
+    # One daemon thread per sweep and worker, started on first use
+    if interval <= 0:
+        return
+    with _sweepers_lock:
+        if name in _sweepers_started:
+            return
+        _sweepers_started.add(name)
+
+    def sweep_forever():
+        while True:
+            time.sleep(interval)
+            try:
+                sweep()
+            except Exception:
+                app.logger.exception(f"{name} failed")
+
+    threading.Thread(target=sweep_forever, name=name, daemon=True).start()
+
+def expire_delegations_periodically():
+    expired = sweep_expired_delegations()
+    if expired:
+        app.logger.info(f"Expired {expired} delegation(s)")
+
+def parse_delegation_time(value):
+    # Accepts the date and datetime-local formats HTML inputs produce
+    for fmt in ("%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+@app.route("/delegations", methods=["POST"])
+def create_delegation():
+    user = current_user()
+    if not user:
         return "You must be logged in", 403
 
-    # Gather form data
-    form_data = {
-        'fname': request.form.get('fname', ''),
-        'mname': request.form.get('mname', ''),
-        'lname': request.form.get('lname', ''),
-        'phone': request.form.get('phone', ''),
-        'myUH': request.form.get('myUH', ''),
-        'uhEmail': request.form.get('uhEmail', ''),
-        'program': request.form.get('program', ''),
-        'alias': request.form.get('alias', ''),
-        'purpose_of_petition': request.form.get('purpose_of_petition', ''),
-        'institution_name': request.form.get('institution_name', ''),
-        'city_state_zip': request.form.get('city_state_zip', ''),
-        'courses_transfer': request.form.get('courses_transfer', ''),
-        'hours_transferred': request.form.get('hours_transferred', ''),
-        'transfer_credits': request.form.get('transfer_credits', ''),
-        'explanation': request.form.get('explanation', '')
-    }
+    data = request.get_json(silent=True) or request.form
+    start_date = parse_delegation_time(data.get("start_date"))
+    end_date = parse_delegation_time(data.get("end_date"))
+    if not start_date or not end_date or end_date <= start_date:
+        return "A start and a later end date are required", 400
+    if not data.get("approver_id") or not data.get("delegate_email"):
+        return "approver_id and delegate_email are required", 400
 
-    latex_content = petitionTemplate.format(**form_data)
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT approver_id, user_id, unit_id, can_delegate FROM approvers WHERE approver_id = %s",
+                       (data.get("approver_id"),))
+        approver = cursor.fetchone()
+        if not approver or approver["user_id"] != user["user_id"]:
+            return "You can only delegate your own approvals", 403
+        if not approver["can_delegate"]:
+            return "This approval may not be delegated", 403
+
+        unit_id = data.get("unit_id") or approver["unit_id"]
+        if not unit_id:
+            return "unit_id is required for organization-level approvers", 400
+        if approver["unit_id"]:
+            # A unit approver can hand on their own unit or part of its subtree, nothing else
+            cursor.execute("SELECT 1 FROM org_unit_closure WHERE ancestor_id = %s AND descendant_id = %s",
+                           (approver["unit_id"], unit_id))
+            if not cursor.fetchone():
+                return "unit_id must be your approval unit or one of its sub-units", 403
+
+        delegate = lookup_user(data.get("delegate_email"))
+        if not delegate or delegate["status"] != "active":
+            return "Delegate not found", 404
+        if delegate["user_id"] == user["user_id"]:
+            return "You cannot delegate to yourself", 400
 
-    # Generate a unique ID for the file
-    unique_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        cursor.execute("""
+            INSERT INTO delegates (parent_approver_id, delegate_user_id, unit_id, start_date, end_date, status)
+            VALUES (%s, %s, %s, %s, %s, 'active')
+        """, (approver["approver_id"], delegate["user_id"], unit_id, start_date, end_date))
+        delegation_id = cursor.lastrowid
+        # The delegate sees the approver's current items in the delegated unit and below
+        cursor.execute("""
+            INSERT IGNORE INTO approval_inbox
+                (user_id, approval_id, request_id, reason, delegation_id, active_from, active_until)
+            SELECT %s, i.approval_id, i.request_id, 'delegated', %s, %s, %s
+            FROM approval_inbox i
+            JOIN approvals a ON a.approval_id = i.approval_id
+            JOIN org_unit_closure c ON c.ancestor_id = %s AND c.descendant_id = a.unit_id
+            WHERE i.user_id = %s AND i.reason = 'assigned'
+        """, (delegate["user_id"], delegation_id, start_date, end_date, unit_id, user["user_id"]))
+        delegation_index.stamp.bump(cursor)
+        conn.commit()
+        refresh_delegations(cursor, [delegation_id])
+        cursor.close()
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+
+    return {"delegation_id": delegation_id, "status": "active"}, 201
+
+@app.route("/delegations/<int:delegation_id>/revoke", methods=["POST"])
+def revoke_delegation(delegation_id):
+    user = current_user()
+    if not user:
+        return "You must be logged in", 403
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT d.status, a.user_id
+            FROM delegates d
+            JOIN approvers a ON a.approver_id = d.parent_approver_id
+            WHERE d.delegation_id = %s
+        """, (delegation_id,))
+        row = cursor.fetchone()
+        if not row or (row["user_id"] != user["user_id"] and user["role_name"] != "admin"):
+            return "Delegation not found", 404
+        if row["status"] != "active":
+            return {"delegation_id": delegation_id, "status": row["status"]}
+
+        cursor.execute("UPDATE delegates SET status = 'revoked' WHERE delegation_id = %s", (delegation_id,))
+        cursor.execute("DELETE FROM approval_inbox WHERE delegation_id = %s", (delegation_id,))
+        delegation_index.stamp.bump(cursor)
+        conn.commit()
+        refresh_delegations(cursor, [delegation_id])
+        cursor.close()
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+
+    return {"delegation_id": delegation_id, "status": "revoked"}
+
+@app.route("/health/delegations")
+@ops_only
+def delegation_index_health():
+    return delegation_index.stats()
+
+@app.cli.command("sweep-delegations")
+def sweep_delegations_command():
+    """Mark delegations whose end date has passed as expired."""
+    click.echo(f"Expired {sweep_expired_delegations()} delegation(s)")
+
+# --- Approver inbox ---
+# approval_inbox holds, for every user, the approvals they can act on right now:
+# the pending approvals of each request's current step, for the assigned approver
+# and for whoever that approver has delegated to. refresh_request_inbox() rewrites
+# one request's rows in the caller's transaction whenever its approvals change.
+
+# Delegation windows are written from Python datetimes, so they are compared
+# with the app's clock too (pass datetime.now() twice), never the database's
+INBOX_ACTIVE = """
+    (i.active_from IS NULL OR i.active_from <= %s)
+    AND (i.active_until IS NULL OR i.active_until > %s)
+"""
+
+def request_progress(cursor, request_id):
+    # ("returned" | "approved" | "pending", pending approvals of the current step).
+    # Steps run in step_order; optional steps never hold a request up.
+    cursor.execute("""
+        SELECT a.approval_id, a.request_id, a.approver_id, a.unit_id, a.status, a.step_id,
+               s.step_order, s.min_approvals, s.is_required
+        FROM approvals a
+        LEFT JOIN workflow_steps s ON s.step_id = a.step_id
+        WHERE a.request_id = %s
+        ORDER BY s.step_order, a.approval_id
+    """, (request_id,))
+    steps = OrderedDict()
+    for row in cursor.fetchall():
+        steps.setdefault(row["step_id"], []).append(row)
+
+    if any(row["status"] == "returned" for rows in steps.values() for row in rows):
+        return "returned", []
+    for rows in steps.values():
+        if rows[0]["is_required"] == 0:
+            continue
+        approved = sum(1 for row in rows if row["status"] == "approved")
+        if approved < min(max(rows[0]["min_approvals"] or 1, 1), len(rows)):
+            return "pending", [row for row in rows if row["status"] == "pending"]
+    return "approved", []
+
+def inbox_rows_for(cursor, approvals):
+    # Inbox rows for a set of approvals: the approver, plus every delegate whose
+    # delegation covers the approval's unit (or an ancestor of it) now or later
+    rows = [(a["approver_id"], a["approval_id"], a["request_id"], "assigned", None, None, None)
+            for a in approvals]
+
+    user_ids = sorted({a["approver_id"] for a in approvals})
+    unit_ids = sorted({a["unit_id"] for a in approvals if a["unit_id"]})
+    if not unit_ids:
+        return rows
+
+    cursor.execute(f"""
+        SELECT approver_id, user_id FROM approvers
+        WHERE can_delegate AND user_id IN ({", ".join(["%s"] * len(user_ids))})
+    """, tuple(user_ids))
+    approver_rows = {}
+    for row in cursor.fetchall():
+        approver_rows.setdefault(row["user_id"], []).append(row["approver_id"])
+    if not approver_rows:
+        return rows
+
+    cursor.execute(f"""
+        SELECT ancestor_id, descendant_id FROM org_unit_closure
+        WHERE descendant_id IN ({", ".join(["%s"] * len(unit_ids))})
+    """, tuple(unit_ids))
+    ancestors = {}
+    for row in cursor.fetchall():
+        ancestors.setdefault(row["descendant_id"], []).append(row["ancestor_id"])
+
+    sync_delegations()
+    now = datetime.now()
+    for a in approvals:
+        for approver_id in approver_rows.get(a["approver_id"], ()):
+            for unit_id in ancestors.get(a["unit_id"], ()):
+                for start_date, end_date, delegation_id, delegate_user_id in \
+                        delegation_index.upcoming(approver_id, unit_id, now):
+                    rows.append((delegate_user_id, a["approval_id"], a["request_id"], "delegated",
+                                 delegation_id, start_date, end_date))
+    return rows
+
+def refresh_request_inbox(cursor, request_id):
+    # Makes approval_inbox match the request's current step. Returns its state.
+    state, pending = request_progress(cursor, request_id)
+    keep = [a["approval_id"] for a in pending]
+    if keep:
+        cursor.execute(f"""
+            DELETE FROM approval_inbox
+            WHERE request_id = %s AND approval_id NOT IN ({", ".join(["%s"] * len(keep))})
+        """, (request_id, *keep))
+        cursor.executemany("""
+            INSERT IGNORE INTO approval_inbox
+                (user_id, approval_id, request_id, reason, delegation_id, active_from, active_until)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, inbox_rows_for(cursor, pending))
+    else:
+        cursor.execute("DELETE FROM approval_inbox WHERE request_id = %s", (request_id,))
+    return state
+
+def close_request_workflow(cursor, request_ids):
+    # For decisions made outside the workflow (admin approve/return): the pending
+    # approvals are superseded and leave every inbox, in the caller's transaction
+    if request_ids:
+        placeholders = ", ".join(["%s"] * len(request_ids))
+        cursor.execute(f"""
+            UPDATE approvals SET status = 'superseded'
+            WHERE request_id IN ({placeholders}) AND status = 'pending'
+        """, tuple(request_ids))
+        cursor.execute(f"DELETE FROM approval_inbox WHERE request_id IN ({placeholders})", tuple(request_ids))
+
+def fetch_inbox(cursor, user_id, after, limit):
+    now = datetime.now()
+    where, params = ["i.user_id = %s", INBOX_ACTIVE], [user_id, now, now]
+    after = decode_cursor(after, 2)
+    if after:
+        where.append("(i.created_at > %s OR (i.created_at = %s AND i.inbox_id > %s))")
+        params.extend([after[0], after[0], after[1]])
+
+    # Oldest first; every join is a primary key lookup, so a page costs O(page size)
+    rows, has_more = fetch_page(cursor, """
+        SELECT i.inbox_id, i.approval_id, i.request_id, i.reason, i.created_at, i.active_until,
+               req.form_type, req.submitted_at, submitter.email AS submitted_by,
+               s.step_order, owner.email AS on_behalf_of
+        FROM approval_inbox i
+        JOIN approvals a ON a.approval_id = i.approval_id
+        JOIN requests req ON req.request_id = i.request_id
+        JOIN users submitter ON submitter.user_id = req.user_id
+        JOIN users owner ON owner.user_id = a.approver_id
+        LEFT JOIN workflow_steps s ON s.step_id = a.step_id
+    """, where, params, "i.created_at, i.inbox_id", limit)
+    next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["inbox_id"]) if has_more else None
+    return rows, next_cursor
+
+@app.route("/inbox")
+def inbox():
+    if not current_user():
+        return redirect(url_for("home"))
+    return render_template("inbox.html")
+
+@app.route("/api/inbox")
+@query_budget(1)
+def inbox_api():
+    user = current_user()
+    if not user:
+        return {"error": "You must be logged in"}, 403
+
+    try:
+        cursor = get_read_connection().cursor(dictionary=True)
+        rows, next_cursor = fetch_inbox(cursor, user["user_id"], request.args.get("after"),
+                                        admin_page_size(request.args))
+        cursor.close()
+    except mysql.connector.Error as err:
+        return {"error": f"Database error: {err}"}, 500
+
+    items = []
+    for row in rows:
+        item = {key: value.isoformat() if hasattr(value, "isoformat") else value for key, value in row.items()}
+        if row["reason"] != "delegated":
+            item["on_behalf_of"] = None
+        item["pdf_url"] = url_for("download_pdf", request_id=row["request_id"])
+        item["decide_url"] = url_for("decide_approval", approval_id=row["approval_id"])
+        items.append(item)
+    return panel_json_response({"items": items, "next_cursor": next_cursor})
+
+@app.route("/api/inbox/count")
+@query_budget(1)
+def inbox_count():
+    # Navbar badge: a count over this user's slice of the inbox index
+    user = current_user()
+    if not user:
+        return {"pending": 0}
+
+    try:
+        now = datetime.now()
+        cursor = get_read_connection().cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM approval_inbox i WHERE i.user_id = %s AND {INBOX_ACTIVE}",
+                       (user["user_id"], now, now))
+        pending = cursor.fetchone()[0]
+        cursor.close()
+    except mysql.connector.Error as err:
+        return {"error": f"Database error: {err}"}, 500
+
+    rv = app.json.response({"pending": pending})
+    rv.cache_control.private = True
+    rv.cache_control.max_age = 30
+    return rv
+
+@app.route("/approvals/<int:approval_id>/decide", methods=["POST"])
+def decide_approval(approval_id):
+    user = current_user()
+    if not user:
+        return "You must be logged in", 403
 
-    # Use a persistent folder in /home (which Azure preserves)
-    output_dir = os.path.join(os.environ.get("HOME", "/home"), "output")
+    data = request.get_json(silent=True) or request.form
+    action = data.get("action")  # 'approve' or 'return'
+    comments = (data.get("comments") or "").strip() or None
+    if action not in ("approve", "return"):
+        return "Invalid action", 400
+    if action == "return" and not comments:
+        return "Please say why the request is being returned", 400
+
+    try:
+        now = datetime.now()
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        # Having the item in your inbox (as approver or active delegate) is the permission
+        cursor.execute(f"""
+            SELECT a.approval_id, a.request_id, a.status
+            FROM approval_inbox i
+            JOIN approvals a ON a.approval_id = i.approval_id
+            WHERE i.approval_id = %s AND i.user_id = %s AND {INBOX_ACTIVE}
+            FOR UPDATE
+        """, (approval_id, user["user_id"], now, now))
+        approval = cursor.fetchone()
+        if not approval:
+            return "This approval is not in your inbox", 404
+        if approval["status"] != "pending":
+            return f"This approval was already {approval['status']}", 409
+
+        cursor.execute("""
+            UPDATE approvals
+            SET status = %s,
+                comments = %s,
+                decided_by = %s,
+                approved_at = IF(%s = 'approved', CURRENT_TIMESTAMP, approved_at)
+            WHERE approval_id = %s
+        """, ("approved" if action == "approve" else "returned", comments, user["user_id"],
+              "approved" if action == "approve" else "returned", approval_id))
+
+        state = refresh_request_inbox(cursor, approval["request_id"])
+        if state in ("approved", "returned"):
+            cursor.execute("UPDATE requests SET status = %s WHERE request_id = %s",
+                           (state, approval["request_id"]))
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+
+    if request.is_json or wants_json():
+        return {"approval_id": approval_id, "request_id": approval["request_id"], "request_status": state}
+    return redirect(url_for("inbox"))
+
+# --- PDF generation ---
+
+# Use a persistent folder in /home (which Azure preserves)
+PDF_OUTPUT_DIR = os.path.join(os.environ.get("HOME", "/home"), "output")
+PDF_COMPILE_TIMEOUT = int(os.getenv("PDF_COMPILE_TIMEOUT", 60))  # seconds per pdflatex run
+
+# Compiled PDFs reused for byte-identical LaTeX sources
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "1") == "1"
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(PDF_OUTPUT_DIR, "pdf-cache"))
+PDF_CACHE_MAX_MB = int(os.getenv("PDF_CACHE_MAX_MB", 512))
+
+# Precompiled preamble formats (see LatexFormats)
+PDF_FORMATS_ENABLED = os.getenv("PDF_FORMATS_ENABLED", "1") == "1"
+PDF_FORMAT_DIR = os.getenv("PDF_FORMAT_DIR", os.path.join(PDF_OUTPUT_DIR, "formats"))
+
+# Background compilation (per gunicorn worker)
+PDF_ASYNC = os.getenv("PDF_ASYNC", "0") == "1"       # opt-in: compile every submission in the background (?async=1 per request)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", 2))        # concurrent pdflatex processes
+PDF_QUEUE_MAX = int(os.getenv("PDF_QUEUE_MAX", 20))   # queued + running jobs before we answer 503
+PDF_JOB_STALE_AFTER = int(os.getenv("PDF_JOB_STALE_AFTER", 1800))          # seconds before an unfinished job is abandoned
+PDF_JOB_SWEEP_INTERVAL = float(os.getenv("PDF_JOB_SWEEP_INTERVAL", 300))   # seconds between stale-job sweeps
+
+# Delivery of generated PDFs (see send_document)
+PDF_MAX_AGE = int(os.getenv("PDF_MAX_AGE", 31536000))            # seconds a browser may reuse a PDF
+PDF_PATH_CACHE_SIZE = int(os.getenv("PDF_PATH_CACHE_SIZE", 4096))  # request_id -> path entries per worker
+PDF_SENDFILE = os.getenv("PDF_SENDFILE", "").lower()             # "", "x-sendfile" (Apache) or "x-accel" (nginx)
+PDF_ACCEL_PREFIX = os.getenv("PDF_ACCEL_PREFIX", "/_protected")   # internal nginx location aliased to /
+
+class PdfCompileError(Exception):
+    pass
+
+# LaTeX templates use \VAR{...} / \BLOCK{...} instead of {{ }} / {% %}, because
+# "{%" and "{#" are everyday LaTeX ("\IfFileExists{...}{%", "{#1}").
+LATEX_TEMPLATE_DIR = os.path.join(app.root_path, "templates", "LatexTemplates")
+
+LATEX_SPECIAL_CHARS = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '<': r'\textless{}',
+    '>': r'\textgreater{}',
+}
+LATEX_SPECIAL_RE = re.compile('|'.join(re.escape(c) for c in LATEX_SPECIAL_CHARS))
+
+class LatexSafe(str):
+    # Already-escaped (or deliberately raw) LaTeX, left alone by latex_finalize
+    pass
+
+def latex_escape(value):
+    if isinstance(value, LatexSafe):
+        return value
+    return LatexSafe(LATEX_SPECIAL_RE.sub(lambda m: LATEX_SPECIAL_CHARS[m.group()], str(value)))
+
+def latex_finalize(value):
+    # Every \VAR{} is escaped, so form input can never inject LaTeX commands
+    if value is None:
+        return ""
+    return latex_escape(value)
+
+latex_env = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(LATEX_TEMPLATE_DIR),
+    block_start_string=r'\BLOCK{',
+    block_end_string='}',
+    variable_start_string=r'\VAR{',
+    variable_end_string='}',
+    comment_start_string=r'\#{',
+    comment_end_string='}',
+    line_statement_prefix='%%',
+    line_comment_prefix='%#',
+    trim_blocks=True,
+    autoescape=False,
+    finalize=latex_finalize,
+    # Compiled templates stay in memory; the loader only re-reads a file when its mtime changes
+    auto_reload=True,
+    cache_size=50,
+)
+latex_env.filters["latex"] = latex_escape
+latex_env.filters["raw"] = LatexSafe
+
+def preload_latex_templates():
+    for name in latex_env.list_templates(extensions=["tex"]):
+        try:
+            latex_env.get_template(name)
+        except jinja2.TemplateError as err:
+            app.logger.error(f"Could not compile LaTeX template {name}: {err}")
+
+preload_latex_templates()
+
+def render_latex(template_name, **context):
+    return latex_env.get_template(template_name).render(**context)
+
+class PdfCache:
+    # Content-addressed store of compiled PDFs keyed by the SHA-256 of the LaTeX
+    # source. Entries are copied in and out, never hard-linked: an entry's mtime
+    # is its LRU clock, and must not be shared with a document that was handed out.
+    # Every worker writes to the same directory, so the size is re-read from disk
+    # before evicting; this worker's running total only says when to look.
+    RESCAN_INTERVAL = 60  # seconds between size checks while under the limit
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = [threading.Lock() for _ in range(64)]
+        self._total_bytes = None
+        self._scanned_at = 0.0
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def key_for(latex_content):
+        # \today changes the output every day, so those documents are keyed per day too
+        source = latex_content
+        if "\\today" in latex_content:
+            source += "\n%" + datetime.now().strftime("%Y-%m-%d")
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def lock_for(self, key):
+        # Serialises identical compiles (double-clicks) inside this worker
+        return self._key_locks[int(key[:8], 16) % len(self._key_locks)]
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def fetch(self, key, dest):
+        path = self._path(key)
+        try:
+            shutil.copyfile(path, dest)
+            os.utime(path)  # mtime doubles as the LRU clock
+        except OSError:
+            with self._lock:
+                self._counters["misses"] += 1
+            return False
+        with self._lock:
+            self._counters["hits"] += 1
+        return True
+
+    def store(self, key, src):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            shutil.copyfile(src, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as err:
+            app.logger.warning(f"Could not cache PDF {key}: {err}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        size = os.path.getsize(path)
+        with self._lock:
+            self._counters["stores"] += 1
+            if self._total_bytes is not None:
+                self._total_bytes += size
+        self._evict()
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        with self._lock:
+            stale = time.monotonic() - self._scanned_at > self.RESCAN_INTERVAL
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes and not stale:
+                return
+            # Other workers' entries count too, so decide on what is actually on disk
+            entries = self._scan()
+            self._scanned_at = time.monotonic()
+            self._total_bytes = sum(size for _, size, _ in entries)
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Drop least recently used entries until we are back under the limit
+            for _, size, path in sorted(entries):
+                if self._total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    self._counters["evictions"] += 1
+                except FileNotFoundError:
+                    pass  # another worker evicted it first
+                except OSError:
+                    continue
+                self._total_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["bytes"] = self._total_bytes
+        stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+def link_or_copy(src, dest):
+    try:
+        os.link(src, dest)
+    except OSError as err:
+        if not os.path.exists(src):
+            raise
+        # Different filesystem (or links unsupported), fall back to a copy
+        app.logger.debug(f"Hard link failed ({err}), copying {src}")
+        shutil.copyfile(src, dest)
+
+pdf_cache = PdfCache(PDF_CACHE_DIR, PDF_CACHE_MAX_MB * 1024 * 1024) if PDF_CACHE_ENABLED else None
+
+def compile_latex(latex_content, output_dir, basename):
     os.makedirs(output_dir, exist_ok=True)
-    
-    tex_filename = os.path.join(output_dir, f"petition_{unique_id}.tex")
-    pdf_filename = os.path.join(output_dir, f"petition_{unique_id}.pdf")
+    if pdf_cache is None:
+        return run_pdflatex(latex_content, output_dir, basename)
+
+    key = pdf_cache.key_for(latex_content)
+    pdf_filename = os.path.join(output_dir, f"{basename}.pdf")
+    with pdf_cache.lock_for(key):
+        if pdf_cache.fetch(key, pdf_filename):
+            return pdf_filename
+        run_pdflatex(latex_content, output_dir, basename)
+        pdf_cache.store(key, pdf_filename)
+    return pdf_filename
+
+class LatexFormats:
+    # Precompiled pdflatex formats, one per template preamble. Loading packages
+    # is most of a pdflatex run, so the preamble is compiled once with \dump and
+    # documents are then compiled as body-only files against that format.
+    RETRY_FAILED_AFTER = 600  # seconds before retrying a preamble that failed to build
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._template_preambles = {}  # template name -> (mtime, preamble hash or None)
+        self._failed = {}              # format name -> time of last failed build
+        self._counters = {"builds": 0, "build_failures": 0, "format_compiles": 0, "fallbacks": 0}
+
+    @staticmethod
+    def split_preamble(latex_content):
+        idx = latex_content.find("\\begin{document}")
+        if idx < 0:
+            return None, latex_content
+        return latex_content[:idx], latex_content[idx:]
+
+    @staticmethod
+    def name_for(preamble):
+        return "fmt_" + hashlib.sha256(preamble.encode("utf-8")).hexdigest()[:20]
+
+    def _known_formats(self):
+        # Only template preambles get a format; a preamble that contains form input
+        # would otherwise build a new format per submission. Re-read on mtime change.
+        with self._lock:
+            for name in latex_env.list_templates(extensions=["tex"]):
+                path = os.path.join(LATEX_TEMPLATE_DIR, name)
+                mtime = os.path.getmtime(path)
+                cached = self._template_preambles.get(name)
+                if cached and cached[0] == mtime:
+                    continue
+                with open(path, "r") as f:
+                    preamble, _ = self.split_preamble(f.read())
+                fmt_name = None
+                if preamble and "\\VAR{" not in preamble and "\\BLOCK{" not in preamble:
+                    fmt_name = self.name_for(preamble)
+                self._template_preambles[name] = (mtime, fmt_name)
+            return {fmt_name for _, fmt_name in self._template_preambles.values() if fmt_name}
+
+    def _fmt_path(self, fmt_name):
+        return os.path.join(self.directory, f"{fmt_name}.fmt")
+
+    def format_for(self, latex_content):
+        # Returns (format name, document body) or (None, None) for the plain path
+        preamble, body = self.split_preamble(latex_content)
+        if not preamble:
+            return None, None
+        fmt_name = self.name_for(preamble)
+        if os.path.exists(self._fmt_path(fmt_name)):
+            return fmt_name, body
+        if fmt_name not in self._known_formats():
+            return None, None
+        if self.build(fmt_name, preamble):
+            return fmt_name, body
+        return None, None
+
+    def build(self, fmt_name, preamble):
+        with self._lock:
+            if os.path.exists(self._fmt_path(fmt_name)):
+                return True
+            failed_at = self._failed.get(fmt_name)
+            if failed_at and time.monotonic() - failed_at < self.RETRY_FAILED_AFTER:
+                return False
+
+            os.makedirs(self.directory, exist_ok=True)
+            # Build under a private job name, then rename, so concurrent workers never see half a file
+            job_name = f"{fmt_name}_{os.getpid()}"
+            ini_file = os.path.join(self.directory, f"{job_name}.tex")
+            with open(ini_file, "w") as f:
+                f.write(preamble)
+                f.write("\n\\dump\n")
+            try:
+                subprocess.run(
+                    ['pdflatex', '-ini', '-interaction=nonstopmode', f'-jobname={job_name}',
+                     '-output-directory', self.directory, '&pdflatex', ini_file],
+                    check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                    timeout=PDF_COMPILE_TIMEOUT
+                )
+                os.replace(os.path.join(self.directory, f"{job_name}.fmt"), self._fmt_path(fmt_name))
+            except (subprocess.SubprocessError, OSError) as err:
+                app.logger.warning(f"Could not build LaTeX format {fmt_name}: {err}")
+                self._failed[fmt_name] = time.monotonic()
+                self._counters["build_failures"] += 1
+                return False
+            finally:
+                for ext in (".tex", ".log"):
+                    try:
+                        os.remove(os.path.join(self.directory, job_name + ext))
+                    except OSError:
+                        pass
+
+            self._counters["builds"] += 1
+            return True
+
+    def discard(self, fmt_name):
+        # A format that stops working (e.g. after a TeX Live upgrade) is rebuilt on next use
+        try:
+            os.remove(self._fmt_path(fmt_name))
+        except OSError:
+            pass
+
+    def count(self, key):
+        with self._lock:
+            self._counters[key] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+latex_formats = LatexFormats(PDF_FORMAT_DIR) if PDF_FORMATS_ENABLED else None
+
+def format_load_failed(output_dir, basename):
+    # pdflatex gives up on an unusable format before it opens the .log, or says so
+    # at the top of it; errors in the document itself always come later in the log
+    try:
+        with open(os.path.join(output_dir, f"{basename}.log"), errors="replace") as f:
+            return "format file" in f.read(8192).lower()
+    except FileNotFoundError:
+        return True
+
+def run_pdflatex(latex_content, output_dir, basename):
+    fmt_name, body = latex_formats.format_for(latex_content) if latex_formats else (None, None)
+    if not fmt_name:
+        return run_pdflatex_once(latex_content, output_dir, basename)
+    try:
+        pdf_filename = run_pdflatex_once(body, output_dir, basename, fmt_name)
+        latex_formats.count("format_compiles")
+        return pdf_filename
+    except PdfCompileError as e:
+        # A broken submission must not cost every worker its format, nor a second run
+        if not format_load_failed(output_dir, basename):
+            raise
+        app.logger.warning(f"Could not load format {fmt_name} ({e}), retrying without it")
+        latex_formats.count("fallbacks")
+    pdf_filename = run_pdflatex_once(latex_content, output_dir, basename)
+    # Compiled fine without it, so the format was at fault: rebuild it on next use
+    latex_formats.discard(fmt_name)
+    return pdf_filename
+
+def run_pdflatex_once(latex_content, output_dir, basename, fmt_name=None):
+    tex_filename = os.path.join(output_dir, f"{basename}.tex")
+    pdf_filename = os.path.join(output_dir, f"{basename}.pdf")
 
     with open(tex_filename, 'w') as f:
         f.write(latex_content)
 
+    cmd = ['pdflatex', '-interaction=nonstopmode', '-output-directory', output_dir]
+    # Signature assets are included by bare name; the trailing separator keeps the default search path
+    env = dict(os.environ, TEXINPUTS=f"{SIGNATURE_ASSET_DIR}{os.pathsep}{os.environ.get('TEXINPUTS', '')}")
+    if fmt_name:
+        cmd.append(f'-fmt={fmt_name}')
+        # Let kpathsea find our formats first, then the system ones
+        env["TEXFORMATS"] = f"{latex_formats.directory}{os.pathsep}"
+    cmd.append(tex_filename)
+
+    started = time.perf_counter()
+    outcome = "failed"
     try:
-        subprocess.run(['pdflatex', '-output-directory', output_dir, tex_filename], check=True)
+        # nonstopmode + no stdin so a broken document fails instead of waiting for input
+        subprocess.run(
+            cmd, check=True, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            timeout=PDF_COMPILE_TIMEOUT, env=env
+        )
+        outcome = "ok"
     except subprocess.CalledProcessError as e:
-        return f"An error occurred during PDF generation: {e}"
+        raise PdfCompileError(f"pdflatex exited with status {e.returncode}") from e
+    except subprocess.TimeoutExpired as e:
+        outcome = "timeout"
+        raise PdfCompileError(f"pdflatex timed out after {PDF_COMPILE_TIMEOUT}s") from e
+    except OSError as e:
+        raise PdfCompileError(f"could not run pdflatex: {e}") from e
+    finally:
+        elapsed = time.perf_counter() - started
+        PDF_COMPILE_LATENCY.observe(elapsed, outcome, "yes" if fmt_name else "no")
+        if has_app_context():
+            g.pdflatex_seconds = g.get("pdflatex_seconds", 0) + elapsed
 
     # Verify PDF was created
     if not os.path.exists(pdf_filename):
-        return f"PDF generation failed: {pdf_filename} not found", 500
+        raise PdfCompileError(f"{pdf_filename} not found")
+    return pdf_filename
+
+# Signature assets: every uploaded signature is converted once into an image
+# pdflatex can embed without decoding it. Assets are named after the signature's
+# content hash and found through TEXINPUTS, so the LaTeX source only carries a
+# bare "sig-<hash>.png" and the PDF cache key changes whenever the signature does.
+SIGNATURE_ASSET_DIR = os.getenv("SIGNATURE_ASSET_DIR", os.path.join(PDF_OUTPUT_DIR, "signature-assets"))
+HASHED_SIGNATURE_RE = re.compile(r"[0-9a-f]{32}")
+
+@lru_cache(maxsize=1024)
+def hash_signature_file(full_path, mtime_ns):
+    digest = hashlib.sha256()
+    with open(full_path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def signature_asset_name(signature_path):
+    # "sig-<content hash>.<ext>" for a users.signature_path value, or None
+    full_path = signature_file(signature_path)
+    if not full_path:
+        return None
+    stem, ext = os.path.splitext(os.path.basename(full_path))
+    if not HASHED_SIGNATURE_RE.fullmatch(stem):
+        # Uploaded before names were content hashes, hash once per file version
+        stem = hash_signature_file(full_path, os.stat(full_path).st_mtime_ns)[:32]
+    ext = ".png" if Image is not None else ext.lower()
+    return f"sig-{stem}{ext}"
+
+def build_signature_asset(src, dest):
+    tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        if Image is None:
+            # pdflatex embeds JPEG data as-is, and PNGs were validated on upload
+            shutil.copyfile(src, tmp_path)
+        else:
+            with Image.open(src) as img:
+                img.load()
+            # pdflatex copies opaque, non-interlaced 8-bit PNG data straight into the
+            # PDF, while an alpha channel makes it decode and re-encode every pixel
+            if "A" in img.getbands() or "transparency" in img.info:
+                img = img.convert("RGBA")
+                flat = Image.new("RGB", img.size, "white")
+                flat.paste(img, mask=img.getchannel("A"))
+                img = flat
+            else:
+                img = img.convert("RGB")
+            img.info = {}
+            img.save(tmp_path, "PNG", optimize=True)
+        os.replace(tmp_path, dest)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def signature_asset(signature_path):
+    # Asset name for \includegraphics, built the first time a signature is seen
+    name = signature_asset_name(signature_path)
+    if not name:
+        return None
+    dest = os.path.join(SIGNATURE_ASSET_DIR, name)
+    if not os.path.exists(dest):
+        os.makedirs(SIGNATURE_ASSET_DIR, exist_ok=True)
+        build_signature_asset(signature_file(signature_path), dest)
+    return LatexSafe(name)
+
+def user_signature_asset():
+    # For the submit handlers; upload_signature has normally built the asset already
+    user = current_user()
+    if not user or not user.get("signature_path"):
+        return None
+    try:
+        return signature_asset(user["signature_path"])
+    except (OSError, ValueError) as err:
+        app.logger.warning(f"No signature asset for {user['email']}: {err}")
+        return None
+
+# --- Document store ---
+# Generated PDFs are stored under the SHA-256 of their bytes, in directories
+# sharded on the first two byte pairs of the hash. documents.document_path holds
+# the storage key ("docs/ab/cd/<hash>.pdf"), never a filesystem path, so the
+# store can move or change backend without touching rows. pdflatex runs in a
+# private scratch directory per job that is removed once the PDF is stored.
+# Rows written before the store keep their old absolute or app-relative paths
+# until migrate-documents moves them in. gc-documents deletes what nothing references.
+
+DOCUMENT_STORE = os.getenv("DOCUMENT_STORE", "local")  # backend, see DOCUMENT_STORES
+DOCUMENT_STORE_DIR = os.getenv("DOCUMENT_STORE_DIR", os.path.join(PDF_OUTPUT_DIR, "documents"))
+DOCUMENT_GC_GRACE = int(os.getenv("DOCUMENT_GC_GRACE", 86400))  # seconds unreferenced files are kept
+# Local disk by default: pdflatex writes several small files per run, which is slow on the /home share
+PDF_SCRATCH_DIR = os.getenv("PDF_SCRATCH_DIR") or tempfile.gettempdir()
+PDF_SCRATCH_PREFIX = "pdfjob-"
+DOCUMENT_KEY_RE = re.compile(r"docs/([0-9a-f]{2})/([0-9a-f]{2})/([0-9a-f]{64})\.pdf")
+LATEX_INTERMEDIATE_EXTS = (".tex", ".aux", ".log", ".out")
+
+def is_document_key(document_path):
+    return bool(document_path) and DOCUMENT_KEY_RE.fullmatch(document_path) is not None
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class LocalDocumentStore:
+    # A backend needs put(), path(), delete(), keys() and prune(); path() must
+    # return a local file, since downloads are served with send_file or X-Sendfile.
+    # Stored files are never touched after they are written: their mtime feeds
+    # Last-Modified. When put() is the last reference so far, it is recorded in
+    # a separate marker file under .puts/, which keeps the file safe from the sweep.
+    def __init__(self, root):
+        self.root = root
+        self.puts_dir = os.path.join(root, ".puts")
+
+    @staticmethod
+    def key_for(digest):
+        return f"docs/{digest[:2]}/{digest[2:4]}/{digest}.pdf"
+
+    def path(self, key):
+        match = DOCUMENT_KEY_RE.fullmatch(key)
+        if not match:
+            raise ValueError(f"Not a document key: {key}")
+        return os.path.join(self.root, *match.groups()[:2], match.group(3) + ".pdf")
+
+    def put(self, src):
+        # Returns the key; a PDF that is already stored is shared, not copied again
+        digest = hash_file(src)
+        key = self.key_for(digest)
+        dest = self.path(key)
+        # Marked before the file appears, so the sweep never sees it unmarked
+        self._mark_put(digest)
+        if os.path.exists(dest):
+            return key
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+        try:
+            link_or_copy(src, tmp_path)
+            os.replace(tmp_path, dest)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return key
+
+    def _mark_put(self, digest):
+        os.makedirs(self.puts_dir, exist_ok=True)
+        marker = os.path.join(self.puts_dir, digest)
+        with open(marker, "a"):
+            pass
+        os.utime(marker)
 
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
+    def _last_put(self, name, mtime):
+        try:
+            return max(mtime, os.stat(os.path.join(self.puts_dir, name[:-len(".pdf")])).st_mtime)
+        except OSError:
+            return mtime
 
-    cursor.execute("SELECT user_id FROM users WHERE email=%s", (user_info["email"],))
-    user_row = cursor.fetchone()
-    if not user_row:
-        cursor.close()
-        conn.close()
-        return "User not found in DB", 404
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
 
-    user_id = user_row["user_id"]
+    def prune(self, cutoff):
+        # Drop put markers older than cutoff; by then their rows have committed or never will
+        if not os.path.isdir(self.puts_dir):
+            return
+        for entry in os.scandir(self.puts_dir):
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+
+    def keys(self):
+        # (key, last put, path) of every stored document, plus (None, mtime, path)
+        # for half-written .tmp files; one shard directory is listed at a time
+        if not os.path.isdir(self.root):
+            return
+        for outer in os.scandir(self.root):
+            if not outer.is_dir() or len(outer.name) != 2:
+                continue
+            for inner in os.scandir(outer.path):
+                if not inner.is_dir():
+                    continue
+                for entry in os.scandir(inner.path):
+                    key = f"docs/{outer.name}/{inner.name}/{entry.name}"
+                    if is_document_key(key):
+                        yield key, self._last_put(entry.name, entry.stat().st_mtime), entry.path
+                    else:
+                        yield None, entry.stat().st_mtime, entry.path
+
+DOCUMENT_STORES = {"local": LocalDocumentStore}
+
+document_store = DOCUMENT_STORES[DOCUMENT_STORE](DOCUMENT_STORE_DIR)
+
+def build_document(latex_content, basename):
+    # Compile (or fetch from the PDF cache) in a scratch directory of its own and
+    # hand the PDF to the store; the .tex, .aux and .log go with the directory
+    os.makedirs(PDF_SCRATCH_DIR, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix=PDF_SCRATCH_PREFIX, dir=PDF_SCRATCH_DIR) as scratch:
+        pdf_filename = compile_latex(latex_content, scratch, basename)
+        try:
+            return document_store.put(pdf_filename)
+        except OSError as e:
+            raise PdfCompileError(f"could not store the PDF: {e}") from e
+
+def legacy_document_file(document_path):
+    # Filesystem path of a row written before the document store
+    if os.path.isabs(document_path):
+        return document_path
+    return os.path.join(app.root_path, document_path)
+
+def remove_latex_leftovers(directory, cutoff):
+    # Intermediate files pdflatex left next to PDFs before scratch directories
+    removed = 0
+    if not os.path.isdir(directory):
+        return removed
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(LATEX_INTERMEDIATE_EXTS) and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+def sweep_documents(cursor, grace=DOCUMENT_GC_GRACE):
+    # Returns counts per kind of file removed. Anything younger than `grace` is
+    # kept: a stored PDF may belong to a documents row that has not committed yet.
+    cutoff = time.time() - grace
+    removed = {"documents": 0, "partial": 0, "scratch": 0, "intermediate": 0}
+
+    cursor.execute("SELECT DISTINCT document_path FROM documents WHERE document_path LIKE %s", ("docs/%",))
+    referenced = {row[0] for row in cursor.fetchall()}
+    for key, mtime, path in document_store.keys():
+        if mtime >= cutoff or key in referenced:
+            continue
+        os.remove(path)
+        removed["documents" if key else "partial"] += 1
+    document_store.prune(cutoff)
+
+    # Scratch directories of jobs whose worker died mid-compile
+    if os.path.isdir(PDF_SCRATCH_DIR):
+        for entry in os.scandir(PDF_SCRATCH_DIR):
+            if entry.name.startswith(PDF_SCRATCH_PREFIX) and entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed["scratch"] += 1
+
+    for directory in (PDF_OUTPUT_DIR, os.path.join(app.root_path, "static", "pdfs")):
+        removed["intermediate"] += remove_latex_leftovers(directory, cutoff)
+    return removed
+
+@app.cli.command("gc-documents")
+@click.option("--grace", type=int, default=DOCUMENT_GC_GRACE, show_default=True,
+              help="Keep unreferenced files younger than this many seconds.")
+def gc_documents_command(grace):
+    """Delete stored PDFs no document references, and stale pdflatex scratch files."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    removed = sweep_documents(cursor, grace)
+    cursor.close()
+    click.echo(", ".join(f"{count} {kind}" for kind, count in removed.items()) + " file(s) removed")
 
+@app.cli.command("migrate-documents")
+@click.option("--batch-size", type=int, default=500, show_default=True)
+def migrate_documents_command(batch_size):
+    """Move PDFs stored under their old paths into the document store."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    moved = missing = 0
+    last_id = 0
+    while True:
+        cursor.execute("""
+            SELECT document_id, document_path FROM documents
+            WHERE document_id > %s AND document_path NOT LIKE %s
+            ORDER BY document_id
+            LIMIT %s
+        """, (last_id, "docs/%", batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        last_id = rows[-1]["document_id"]
+
+        superseded = []
+        for row in rows:
+            old_file = legacy_document_file(row["document_path"])
+            if not os.path.exists(old_file):
+                missing += 1
+                click.echo(f"missing: document {row['document_id']} at {row['document_path']}", err=True)
+                continue
+            key = document_store.put(old_file)
+            cursor.execute("UPDATE documents SET document_path = %s WHERE document_id = %s",
+                           (key, row["document_id"]))
+            superseded.append(old_file)
+        conn.commit()
+        moved += len(superseded)
+
+        # Only once the rows point at the store; download_pdf never caches old paths
+        for old_file in superseded:
+            stem = os.path.splitext(old_file)[0]
+            for path in (old_file, *(stem + ext for ext in LATEX_INTERMEDIATE_EXTS)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+    cursor.close()
+    click.echo(f"Moved {moved} document(s) into the store, {missing} missing on disk")
+
+class PdfWorkerPool:
+    # Bounded thread pool for pdflatex. submit() refuses work instead of queueing
+    # without limit, so a deadline rush degrades to 503s rather than a dead site.
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdflatex")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def reserve(self):
+        # Claims a queue slot up front, so a full queue is refused before anything is written
+        with self._lock:
+            if self._queued + self._running >= self.max_pending:
+                self._counters["rejected"] += 1
+                return False
+            self._queued += 1
+            self._counters["submitted"] += 1
+            return True
+
+    def cancel(self):
+        # Gives back a reserved slot that will not be used
+        with self._lock:
+            self._queued -= 1
+            self._counters["submitted"] -= 1
+
+    def start(self, fn, *args):
+        # Runs fn in a slot taken with reserve()
+        self._executor.submit(self._run, fn, *args)
+
+    def submit(self, fn, *args):
+        if not self.reserve():
+            return False
+        self.start(fn, *args)
+        return True
+
+    def _run(self, fn, *args):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        ok = False
+        try:
+            ok = fn(*args)
+        except Exception:
+            app.logger.exception("PDF job crashed")
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._counters["completed" if ok else "failed"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["queued"] = self._queued
+            stats["running"] = self._running
+        stats["workers"] = self.workers
+        stats["max_pending"] = self.max_pending
+        return stats
+
+pdf_workers = PdfWorkerPool(PDF_WORKERS, PDF_QUEUE_MAX)
+
+def wants_async_pdf():
+    if "async" in request.values:
+        return request.values.get("async") == "1"
+    return PDF_ASYNC
+
+def wants_json():
+    # Browsers rank text/html first; fetch()/curl callers get JSON
+    return request.accept_mimetypes.best_match(["application/json", "text/html"]) == "application/json"
+
+def insert_request(cursor, user_id, form_type, status):
     cursor.execute("""
         INSERT INTO requests (user_id, form_type, status)
         VALUES (%s, %s, %s)
-    """, (user_id, 'petition', 'submitted'))
-    request_id = cursor.lastrowid
+    """, (user_id, form_type, status))
+    return cursor.lastrowid
 
+def insert_document(cursor, request_id, document_path):
     cursor.execute("""
         INSERT INTO documents (request_id, document_path)
         VALUES (%s, %s)
-    """, (request_id, pdf_filename))
+    """, (request_id, document_path))
 
-    conn.commit()
-    cursor.close()
-    conn.close()
+def submit_latex_document(form_type, latex_content, basename):
+    # Shared tail of every form submit handler: compile the rendered LaTeX and
+    # record requests/documents rows, either inline or on the background pool.
+    # basename only names the scratch files and the download.
+    user_row = current_user()
+    if not user_row:
+        return "User not found in DB", 404
 
-    return send_file(pdf_filename, as_attachment=True)
+    if wants_async_pdf():
+        return enqueue_pdf_job(user_row, form_type, latex_content, basename)
+
+    try:
+        document_key = build_document(latex_content, basename)
+    except PdfCompileError as e:
+        return f"An error occurred during PDF generation: {e}", 500
 
-@app.route("/download_pdf/<int:request_id>")
-def download_pdf(request_id):
     try:
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
+        request_id = insert_request(cursor, user_row["user_id"], form_type, 'submitted')
+        insert_document(cursor, request_id, document_key)
+        route_request(cursor, request_id)
+        conn.commit()
+        cursor.close()
+        conn.close()
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+
+    return send_file(document_store.path(document_key), as_attachment=True, download_name=f"{basename}.pdf")
+
+def enqueue_pdf_job(user_row, form_type, latex_content, basename):
+    start_sweeper("pdf-job-sweeper", PDF_JOB_SWEEP_INTERVAL, fail_stale_pdf_jobs)
+    if not pdf_workers.reserve():
+        return "Too many documents are being generated right now, please try again shortly.", 503
+    job_id = uuid.uuid4().hex
+
+    # The request row exists straight away (as 'pending') so the submission is never lost
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        request_id = insert_request(cursor, user_row["user_id"], form_type, 'pending')
         cursor.execute("""
-            SELECT document_path
-            FROM documents
-            WHERE request_id = %s
-        """, (request_id,))
-        row = cursor.fetchone()
+            INSERT INTO pdf_jobs (job_id, request_id, user_id, form_type, status)
+            VALUES (%s, %s, %s, %s, 'queued')
+        """, (job_id, request_id, user_row["user_id"], form_type))
+        conn.commit()
         cursor.close()
+    except mysql.connector.Error as err:
+        pdf_workers.cancel()
+        return f"Database error: {err}", 500
+
+    pdf_workers.start(run_pdf_job, job_id, request_id, latex_content, basename)
+
+    job = {
+        "job_id": job_id,
+        "request_id": request_id,
+        "status": "queued",
+        "status_url": url_for("pdf_job_status", job_id=job_id),
+        "download_url": url_for("pdf_job_download", job_id=job_id),
+    }
+    if wants_json():
+        return job, 202
+    return render_template("pdf_job.html", job=job), 202
+
+def mark_pdf_job(job_id, status, error=None, cursor=None):
+    sql = """
+        UPDATE pdf_jobs
+        SET status = %s,
+            error = %s,
+            started_at = IF(%s = 'running', CURRENT_TIMESTAMP, started_at),
+            finished_at = IF(%s IN ('done', 'failed'), CURRENT_TIMESTAMP, finished_at)
+        WHERE job_id = %s
+    """
+    statements = [(sql, (status, error, status, status, job_id))]
+    if status == "failed":
+        # No PDF will ever exist for the request, so it goes back to the submitter
+        statements.append(("""
+            UPDATE requests r
+            JOIN pdf_jobs j ON j.request_id = r.request_id
+            SET r.status = 'returned'
+            WHERE j.job_id = %s AND r.status = 'pending'
+        """, (job_id,)))
+    if cursor is not None:
+        for sql, params in statements:
+            cursor.execute(sql, params)
+        return
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        for sql, params in statements:
+            cursor.execute(sql, params)
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as err:
+        app.logger.error(f"Could not update PDF job {job_id}: {err}")
+    finally:
         conn.close()
 
-        if not row:
-            return f"No PDF found for request_id={request_id}", 404
+def run_pdf_job(job_id, request_id, latex_content, basename):
+    # Runs on a pdf_workers thread, outside any request
+    mark_pdf_job(job_id, "running")
+    try:
+        document_key = build_document(latex_content, basename)
+    except PdfCompileError as e:
+        app.logger.error(f"PDF job {job_id} failed: {e}")
+        mark_pdf_job(job_id, "failed", error=str(e)[:1000])
+        return False
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        insert_document(cursor, request_id, document_key)
+        cursor.execute("UPDATE requests SET status = 'submitted' WHERE request_id = %s", (request_id,))
+        route_request(cursor, request_id)
+        mark_pdf_job(job_id, "done", cursor=cursor)
+        conn.commit()
+        cursor.close()
+    except mysql.connector.Error as err:
+        app.logger.error(f"PDF job {job_id} could not be recorded: {err}")
+        conn.rollback()
+        mark_pdf_job(job_id, "failed", error=f"Database error: {err}")
+        return False
+    finally:
+        conn.close()
+    return True
+
+def fail_stale_pdf_jobs(stale_after=PDF_JOB_STALE_AFTER):
+    # Jobs live in one worker's memory; when that worker restarts its queued and
+    # running jobs are gone. Fail them (and return their requests) once they are
+    # older than any live job could be.
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE requests r
+            JOIN pdf_jobs j ON j.request_id = r.request_id
+            SET r.status = 'returned'
+            WHERE j.status IN ('queued', 'running') AND r.status = 'pending'
+              AND j.created_at < CURRENT_TIMESTAMP - INTERVAL %s SECOND
+        """, (stale_after,))
+        cursor.execute("""
+            UPDATE pdf_jobs
+            SET status = 'failed',
+                error = 'Abandoned: the worker running this job stopped',
+                finished_at = CURRENT_TIMESTAMP
+            WHERE status IN ('queued', 'running')
+              AND created_at < CURRENT_TIMESTAMP - INTERVAL %s SECOND
+        """, (stale_after,))
+        failed = cursor.rowcount
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+    if failed:
+        app.logger.warning(f"Failed {failed} abandoned PDF job(s)")
+    return failed
+
+@app.cli.command("sweep-pdf-jobs")
+@click.option("--stale-after", type=int, default=PDF_JOB_STALE_AFTER, show_default=True,
+              help="Fail queued or running jobs older than this many seconds.")
+def sweep_pdf_jobs_command(stale_after):
+    """Fail background PDF jobs abandoned by a worker that stopped."""
+    click.echo(f"Failed {fail_stale_pdf_jobs(stale_after)} abandoned PDF job(s)")
+
+def load_pdf_job(job_id):
+    # Only the submitter and admins may see a job
+    user = current_user()
+    if not user:
+        return None, ("You must be logged in", 403)
+
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT j.job_id, j.request_id, j.user_id, j.form_type, j.status, j.error,
+               j.created_at, j.finished_at, d.document_path
+        FROM pdf_jobs j
+        LEFT JOIN documents d ON d.request_id = j.request_id
+        WHERE j.job_id = %s
+    """, (job_id,))
+    job = cursor.fetchone()
+    cursor.close()
+
+    if not job:
+        return None, ("Job not found", 404)
+    if job["user_id"] != user["user_id"] and user["role_name"] != "admin":
+        return None, ("Job not found", 404)
+    return job, None
+
+class LegacyDocumentPath(Exception):
+    pass
+
+def stored_document_for(request_id):
+    # (document_path, form_type) of a request's latest document
+    try:
+        return stored_document(request_id)
+    except LegacyDocumentPath as legacy:
+        return legacy.args
+
+@lru_cache(maxsize=PDF_PATH_CACHE_SIZE)
+def stored_document(request_id):
+    # A request's document is written once and never replaced, so repeat views
+    # skip the query. Misses raise instead of returning, and so are not cached;
+    # neither are pre-store paths, which migrate-documents rewrites.
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute("""
+        SELECT d.document_path, r.form_type
+        FROM documents d
+        JOIN requests r ON r.request_id = d.request_id
+        WHERE d.request_id = %s
+        ORDER BY d.document_id DESC
+        LIMIT 1
+    """, (request_id,))
+    row = cursor.fetchone()
+    cursor.close()
+    if not row:
+        raise LookupError(request_id)
+    if not is_document_key(row["document_path"]):
+        raise LegacyDocumentPath(row["document_path"], row["form_type"])
+    return row["document_path"], row["form_type"]
+
+def resolve_document_path(document_path):
+    if is_document_key(document_path):
+        return document_store.path(document_path)
+    return legacy_document_file(document_path)
+
+def send_document(document_path, download_name, as_attachment=False):
+    # Documents are immutable. A stored one is validated by the SHA-256 in its
+    # key; a pre-store file by its identity. Browsers' PDF viewers also get byte ranges.
+    pdf_path = resolve_document_path(document_path)
+    st = os.stat(pdf_path)
+    match = DOCUMENT_KEY_RE.fullmatch(document_path)
+    etag = match.group(3) if match else f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+    if PDF_SENDFILE in ("x-sendfile", "x-accel"):
+        # The front web server streams the file (and serves ranges), the worker
+        # only answers with headers
+        rv = app.response_class(mimetype="application/pdf")
+        if PDF_SENDFILE == "x-accel":
+            rv.headers["X-Accel-Redirect"] = PDF_ACCEL_PREFIX.rstrip("/") + pdf_path
+        else:
+            rv.headers["X-Sendfile"] = pdf_path
+        rv.headers.set("Content-Disposition", "attachment" if as_attachment else "inline",
+                       filename=download_name)
+        rv.set_etag(etag)
+        rv.last_modified = st.st_mtime
+        rv = rv.make_conditional(request)
+        if rv.status_code == 304:
+            rv.headers.pop("X-Accel-Redirect", None)
+            rv.headers.pop("X-Sendfile", None)
+    else:
+        rv = send_file(pdf_path, as_attachment=as_attachment, download_name=download_name, etag=etag,
+                       last_modified=st.st_mtime, conditional=True)
+
+    # Documents may hold personal data, so only the browser cache may keep them
+    rv.cache_control.no_cache = None
+    rv.cache_control.public = None
+    rv.cache_control.private = True
+    rv.cache_control.max_age = PDF_MAX_AGE
+    rv.cache_control.immutable = True
+    rv.headers.pop("Expires", None)
+    return rv
+
+@app.route("/pdf-jobs/<job_id>")
+def pdf_job_status(job_id):
+    try:
+        job, error = load_pdf_job(job_id)
+    except mysql.connector.Error as err:
+        return {"error": f"Database error: {err}"}, 500
+    if error:
+        return {"error": error[0]}, error[1]
+
+    result = {
+        "job_id": job["job_id"],
+        "request_id": job["request_id"],
+        "form_type": job["form_type"],
+        "status": job["status"],
+        "error": job["error"],
+    }
+    if job["status"] == "done":
+        result["download_url"] = url_for("pdf_job_download", job_id=job_id)
+    return result
+
+@app.route("/pdf-jobs/<job_id>/download")
+def pdf_job_download(job_id):
+    try:
+        job, error = load_pdf_job(job_id)
+    except mysql.connector.Error as err:
+        return f"Database error: {err}", 500
+    if error:
+        return error
+    if job["status"] != "done" or not job["document_path"]:
+        return f"PDF is not ready yet (status: {job['status']})", 409
+
+    pdf_path = resolve_document_path(job["document_path"])
+    if not os.path.exists(pdf_path):
+        return f"PDF file not found on disk: {job['document_path']}", 404
+    return send_document(job["document_path"], f"{job['form_type']}_{job['request_id']}.pdf", as_attachment=True)
+
+@app.route("/admin/pdf-jobs")
+def admin_pdf_jobs():
+    user = current_user()
+    if not user or user["role_name"] != "admin":
+        return {"error": "You must be admin to view PDF jobs."}, 403
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT status, COUNT(*) AS n FROM pdf_jobs GROUP BY status")
+        counts = {row["status"]: row["n"] for row in cursor.fetchall()}
+        cursor.execute("""
+            SELECT j.job_id, j.request_id, u.email, j.form_type, j.error, j.created_at, j.finished_at
+            FROM pdf_jobs j
+            JOIN users u ON u.user_id = j.user_id
+            WHERE j.status = 'failed'
+            ORDER BY j.created_at DESC
+            LIMIT 50
+        """)
+        failures = cursor.fetchall()
+        cursor.close()
+    except mysql.connector.Error as err:
+        return {"error": f"Database error: {err}"}, 500
+
+    return {
+        # this worker's pool and cache; counts cover every worker
+        "worker": pdf_workers.stats(),
+        "cache": pdf_cache.stats() if pdf_cache else None,
+        "formats": latex_formats.stats() if latex_formats else None,
+        "counts": counts,
+        "recent_failures": failures,
+    }
+   
+@app.route('/petition')
+def petition():
+    return render_template('petition.html')
+
+@app.route('/PetitionSubmit', methods=['POST'])
+def submit():
+    user_info = session.get("user")
+    if not user_info:
+        return "You must be logged in", 403
 
-        pdf_path = row["document_path"]
-        if not os.path.exists(pdf_path):
-            return f"PDF file not found on disk: {pdf_path}", 404
+    # Gather form data
+    form_data = {
+        'fname': request.form.get('fname', ''),
+        'mname': request.form.get('mname', ''),
+        'lname': request.form.get('lname', ''),
+        'phone': request.form.get('phone', ''),
+        'myUH': request.form.get('myUH', ''),
+        'uhEmail': request.form.get('uhEmail', ''),
+        'program': request.form.get('program', ''),
+        'alias': request.form.get('alias', ''),
+        'purpose_of_petition': request.form.get('purpose_of_petition', ''),
+        'institution_name': request.form.get('institution_name', ''),
+        'city_state_zip': request.form.get('city_state_zip', ''),
+        'courses_transfer': request.form.get('courses_transfer', ''),
+        'hours_transferred': request.form.get('hours_transferred', ''),
+        'transfer_credits': request.form.get('transfer_credits', ''),
+        'explanation': request.form.get('explanation', '')
+    }
 
-        return send_file(pdf_path, as_attachment=False)
+    form_data['signature'] = user_signature_asset()
+    latex_content = render_latex("Petition.tex", **form_data)
 
+    # Generate a unique ID for the file
+    unique_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+    return submit_latex_document('petition', latex_content, f"petition_{unique_id}")
+
+@app.route("/download_pdf/<int:request_id>")
+def download_pdf(request_id):
+    try:
+        document_path, form_type = stored_document_for(request_id)
+    except LookupError:
+        return f"No PDF found for request_id={request_id}", 404
+    except Exception as e:
+        return f"Error retrieving PDF: {str(e)}", 500
+
+    try:
+        return send_document(document_path, f"{form_type}_{request_id}.pdf")
+    except FileNotFoundError:
+        return f"PDF file not found on disk: {document_path}", 404
     except Exception as e:
         return f"Error retrieving PDF: {str(e)}", 500
 
@@ -834,20 +4483,11 @@ def approve_request():
     admin_email = session["user"].get("email")
 
     # checks for admin
+    if get_role_name(admin_email) != "admin":
+        return "You must be admin to approve requests.", 403
+
     conn = get_db_connection()
     cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT r.role_name
-        FROM users u
-        JOIN roles r ON u.role_id = r.role_id
-        WHERE u.email = %s
-    """, (admin_email,))
-    role_check = cursor.fetchone()
-
-    if not role_check or role_check["role_name"] != "admin":
-        cursor.close()
-        conn.close()
-        return "You must be admin to approve requests.", 403
 
     request_id = request.form.get("request_id")
     if not request_id:
@@ -857,6 +4497,7 @@ def approve_request():
 
     # approves request
     cursor.execute("UPDATE requests SET status='approved' WHERE request_id=%s", (request_id,))
+    close_request_workflow(cursor, [request_id])
     
     conn.commit()
     cursor.close()
@@ -905,74 +4546,13 @@ def submit_withdraw():
         'date': request.form.get('date', '')
     }
 
-    # Load LaTeX template
-    with open("templates/withdraw_template.tex", "r") as f:
-        template = Template(f.read())
-
-    rendered_tex = template.render(**data)
+    data['signature'] = user_signature_asset()
+    rendered_tex = render_latex("withdraw_template.tex", **data)
 
     # Generate filenames
     unique_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    
-    # Create static/pdfs directory if it doesn't exist
-    pdf_dir = os.path.join(app.root_path, "static", "pdfs")
-    os.makedirs(pdf_dir, exist_ok=True)
-    
-    # Define paths
-    relative_path = os.path.join("static", "pdfs", f"withdraw_{unique_id}.pdf")
-    full_path = os.path.join(app.root_path, relative_path)
-    tex_filename = os.path.join(pdf_dir, f"withdraw_{unique_id}.tex")
-
-    # Write LaTeX file
-    with open(tex_filename, 'w') as f:
-        f.write(rendered_tex)
-
-    try:
-        # Run pdflatex in the same directory as the tex file
-        subprocess.run(['pdflatex', '-output-directory', pdf_dir, tex_filename], check=True)
-    except subprocess.CalledProcessError as e:
-        return f"LaTeX generation failed: {e}"
 
-    if not os.path.exists(full_path):
-        return "PDF generation failed.", 500
-
-    # Store in database
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get user_id
-        cursor.execute("SELECT user_id FROM users WHERE email=%s", (user_info["email"],))
-        user_row = cursor.fetchone()
-        if not user_row:
-            cursor.close()
-            conn.close()
-            return "User not found in DB", 404
-            
-        user_id = user_row["user_id"]
-        
-        # Create request
-        cursor.execute("""
-            INSERT INTO requests (user_id, form_type, status)
-            VALUES (%s, %s, %s)
-        """, (user_id, 'withdrawal', 'submitted'))
-        
-        request_id = cursor.lastrowid
-        
-        # Store document path
-        cursor.execute("""
-            INSERT INTO documents (request_id, document_path)
-            VALUES (%s, %s)
-        """, (request_id, relative_path))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-    except Exception as e:
-        return f"Database error: {str(e)}", 500
-
-    return send_file(full_path, as_attachment=True)
+    return submit_latex_document('withdrawal', rendered_tex, f"withdraw_{unique_id}")
 
 @app.route('/InterInstitutionalSubmit', methods=['POST'])
 def submit_inter_institutional():
@@ -982,69 +4562,20 @@ def submit_inter_institutional():
 
     # Gather form data dynamically
     form_data = {key: request.form.get(key, '') for key in request.form}
+    form_data['signature'] = user_signature_asset()
 
-    # Load the LaTeX template file from disk
-    template_path = os.path.join("templates", "LatexTemplates", "Inter_Institutional.tex")
+    # Render LaTeX content from the preloaded template
     try:
-        with open(template_path, 'r') as f:
-            latex_template = f.read()
-    except FileNotFoundError:
-        return f"LaTeX template not found at {template_path}", 500
-
-    # Render LaTeX content using Jinja2
-    from jinja2 import Template
-    latex_content = Template(latex_template).render(**form_data)
+        latex_content = render_latex("Inter_Institutional.tex", **form_data)
+    except jinja2.TemplateNotFound:
+        return "LaTeX template not found: Inter_Institutional.tex", 500
 
     # Create filenames using user email prefix
     user_prefix = user_info["email"].split('@')[0]
     unique_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    output_dir = os.path.join(os.environ.get("HOME", "/home"), "output")
-    os.makedirs(output_dir, exist_ok=True)
-
-    tex_filename = os.path.join(output_dir, f"{user_prefix}_interinstitutional_{unique_id}.tex")
-    pdf_filename = os.path.join(output_dir, f"{user_prefix}_interinstitutional_{unique_id}.pdf")
 
-    with open(tex_filename, 'w') as f:
-        f.write(latex_content)
-
-    # Generate PDF with pdflatex
-    try:
-        subprocess.run(['pdflatex', '-output-directory', output_dir, tex_filename], check=True)
-    except subprocess.CalledProcessError as e:
-        return f"An error occurred during PDF generation: {e}"
-
-    if not os.path.exists(pdf_filename):
-        return f"PDF generation failed: {pdf_filename} not found", 500
-
-    # Save metadata to DB
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("SELECT user_id FROM users WHERE email=%s", (user_info["email"],))
-    user_row = cursor.fetchone()
-    if not user_row:
-        cursor.close()
-        conn.close()
-        return "User not found in DB", 404
-
-    user_id = user_row["user_id"]
-
-    cursor.execute("""
-        INSERT INTO requests (user_id, form_type, status)
-        VALUES (%s, %s, %s)
-    """, (user_id, 'interinstitutional', 'submitted'))
-    request_id = cursor.lastrowid
-
-    cursor.execute("""
-        INSERT INTO documents (request_id, document_path)
-        VALUES (%s, %s)
-    """, (request_id, pdf_filename))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-    return send_file(pdf_filename, as_attachment=True)
+    return submit_latex_document('interinstitutional', latex_content,
+                                 f"{user_prefix}_interinstitutional_{unique_id}")
 
 @app.route('/UndergraduatePetitionSubmit', methods=['POST'])
 def submit_undergrad_petition():
@@ -1054,70 +4585,20 @@ def submit_undergrad_petition():
 
     # Collect all form fields dynamically
     form_data = {key: request.form.get(key, '') for key in request.form}
-
-    # Load LaTeX template
-    template_path = os.path.join("templates", "LatexTemplates", "UndergradForm.tex")
-    try:
-        with open(template_path, 'r') as f:
-            latex_template = f.read()
-    except FileNotFoundError:
-        return f"LaTeX template not found at {template_path}", 500
+    form_data['signature'] = user_signature_asset()
 
     # Render LaTeX with form data
-    from jinja2 import Template
-    latex_content = Template(latex_template).render(**form_data)
+    try:
+        latex_content = render_latex("UndergradPetition.tex", **form_data)
+    except jinja2.TemplateNotFound:
+        return "LaTeX template not found: UndergradPetition.tex", 500
 
     # Define output filenames
     user_prefix = user_info["email"].split('@')[0]
     unique_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    output_dir = os.path.join(os.environ.get("HOME", "/home"), "output")
-    os.makedirs(output_dir, exist_ok=True)
 
-    tex_filename = os.path.join(output_dir, f"{user_prefix}_undergradpetition_{unique_id}.tex")
-    pdf_filename = os.path.join(output_dir, f"{user_prefix}_undergradpetition_{unique_id}.pdf")
-
-    # Write .tex file
-    with open(tex_filename, 'w') as f:
-        f.write(latex_content)
-
-    # Compile LaTeX to PDF
-    try:
-        subprocess.run(['pdflatex', '-output-directory', output_dir, tex_filename], check=True)
-    except subprocess.CalledProcessError as e:
-        return f"An error occurred during PDF generation: {e}", 500
-
-    if not os.path.exists(pdf_filename):
-        return f"PDF generation failed: {pdf_filename} not found", 500
-
-    # Store in database
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("SELECT user_id FROM users WHERE email=%s", (user_info["email"],))
-    user_row = cursor.fetchone()
-    if not user_row:
-        cursor.close()
-        conn.close()
-        return "User not found in DB", 404
-
-    user_id = user_row["user_id"]
-
-    cursor.execute("""
-        INSERT INTO requests (user_id, form_type, status)
-        VALUES (%s, %s, %s)
-    """, (user_id, 'undergrad_petition', 'submitted'))
-    request_id = cursor.lastrowid
-
-    cursor.execute("""
-        INSERT INTO documents (request_id, document_path)
-        VALUES (%s, %s)
-    """, (request_id, pdf_filename))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-    return send_file(pdf_filename, as_attachment=True)
+    return submit_latex_document('undergrad_petition', latex_content,
+                                 f"{user_prefix}_undergradpetition_{unique_id}")
 
 @app.route("/get-user-role")
 def get_user_role():
@@ -1127,38 +4608,61 @@ def get_user_role():
     
     email = user_info.get("email")
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT r.role_name 
-            FROM users u 
-            JOIN roles r ON u.role_id = r.role_id 
-            WHERE u.email = %s
-        """, (email,))
-        result = cursor.fetchone()
-        cursor.close()
-        conn.close()
-
-        if not result:
+        role_name = get_role_name(email)
+        if not role_name:
             return {"role": "none"}
 
-        return {"role": result["role_name"]}
+        return {"role": role_name}
     except Exception:
         return {"role": "none"}
 
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 200))  # rows per fetchmany() while streaming
+STREAM_BUFFER_SIZE = int(os.getenv("STREAM_BUFFER_SIZE", 20))  # template chunks joined per write
+
+ReportRow = namedtuple("ReportRow", [
+    "report_id", "reporter_email", "reported_email", "category_name", "description",
+    "status", "created_at", "moderator_comments", "admin_comments",
+])
+
+def stream_rows(cursor, row_type, batch_size=STREAM_BATCH_SIZE):
+    # Rows of an unbuffered cursor as row_type tuples; at most one batch is in memory
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row_type._make(row)
+    finally:
+        cursor.close()
+
+def stream_page(template_name, **context):
+    # flask.stream_template, plus jinja output buffering so each write carries a
+    # batch of rows rather than a few bytes. Peak memory and time to first byte
+    # no longer depend on how many rows the page shows.
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+    rv = app.response_class(stream_with_context(stream), mimetype="text/html")
+    # Ask nginx (when in front) to pass chunks on as they are written
+    rv.headers["X-Accel-Buffering"] = "no"
+    return rv
+
 @app.route("/IdLookup", methods=["GET"])
 def id_lookup_page():
     return render_template("IdLookup.html", searched=False)
 
 @app.route("/lookup-reports", methods=["POST"])
+@query_budget(1)
 def lookup_reports():
     cougar_id = request.form.get("cougar_id")
     if not cougar_id:
         return render_template("IdLookup.html", reports=[], searched=True)
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        conn = get_read_connection()
+        # Unbuffered: rows stay on the server until the template asks for them
+        cursor = conn.cursor(buffered=False)
 
         cursor.execute("""
             SELECT r.report_id,
@@ -1177,15 +4681,13 @@ def lookup_reports():
             WHERE r.reporter_cougar_id = %s
             ORDER BY r.created_at DESC
         """, (cougar_id,))
-        
-        reports = cursor.fetchall()
-        cursor.close()
-        conn.close()
-
-        return render_template("IdLookup.html", reports=reports, searched=True)
     except Exception as e:
         return f"Error fetching reports: {str(e)}", 500
 
+    rv = stream_page("IdLookup.html", reports=stream_rows(cursor, ReportRow), searched=True)
+    rv.call_on_close(detach_db_connection(conn).release)
+    return rv
+
     
 @app.route("/moderator/handle_report", methods=["POST"])
 def handle_report_by_moderator():
@@ -1208,14 +4710,7 @@ def handle_report_by_moderator():
         cursor = conn.cursor(dictionary=True)
 
         # Ensure user is a moderator
-        cursor.execute("""
-            SELECT r.role_name
-            FROM users u
-            JOIN roles r ON u.role_id = r.role_id
-            WHERE u.email = %s
-        """, (moderator_email,))
-        role = cursor.fetchone()
-        if not role or role["role_name"] != "moderator":
+        if get_role_name(moderator_email) != "moderator":
             return "Access denied: moderators only", 403
 
         # Update report
@@ -1237,33 +4732,8 @@ def handle_report_by_moderator():
 
 @app.route("/ModPanel.html", methods=["GET"])
 def mod_panel():
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT r.report_id,
-                   reporter.email AS reporter_email,
-                   r.reporter_cougar_id,
-                   r.reported_user_id,
-                   rc.category_name,
-                   r.description,
-                   r.status,
-                   r.moderator_comments,
-                   r.created_at
-            FROM reports r
-            JOIN users reporter ON reporter.user_id = r.reporter_id
-            JOIN report_categories rc ON rc.category_id = r.category_id
-            ORDER BY r.created_at DESC
-        """)
-        reports = cursor.fetchall()
-
-        cursor.close()
-        conn.close()
-
-        return render_template("ModPanel.html", reports=reports)
-    except Exception as e:
-        return f"Error loading moderator panel: {str(e)}", 500
+    # The queue itself is loaded page by page from /api/moderator/reports
+    return render_template("ModPanel.html")
 
 
 # --- for local testing ---
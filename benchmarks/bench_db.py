@@ -0,0 +1,25 @@
+# Connection settings and seeded identities shared by seed.py and load_test.py.
+# Everything can be pointed elsewhere with BENCH_DB_* variables.
+import os
+
+BENCH_DB_ENV = {
+    "DB_HOST": os.getenv("BENCH_DB_HOST", "127.0.0.1"),
+    "DB_PORT": os.getenv("BENCH_DB_PORT", "3307"),
+    "DB_USER": os.getenv("BENCH_DB_USER", "root"),
+    "DB_PASS": os.getenv("BENCH_DB_PASS", "bench"),
+    # database_template.sql recreates this name, so it cannot be changed
+    "DB_NAME": "moosefactory_sql",
+}
+
+ADMIN_EMAIL = "admin@bench.uh.edu"
+MODERATOR_EMAIL = "moderator@bench.uh.edu"
+
+def student_email(i):
+    return f"student{i:05d}@bench.uh.edu"
+
+def student_cougar_id(i):
+    return f"{1000000 + i}"
+
+def use_bench_db():
+    # Must run before `import app`, which reads its settings at import time
+    os.environ.update(BENCH_DB_ENV)
@@ -0,0 +1,109 @@
+# Per-form pdflatex timings with and without the precompiled preamble formats.
+#
+#   python benchmarks/bench_latex.py            # 5 runs per form
+#   python benchmarks/bench_latex.py --runs 10 --form Inter_Institutional.tex
+#
+# Needs pdflatex on PATH (the Docker image has it). Nothing touches the database.
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as moose  # noqa: E402
+
+SAMPLE_DATA = {
+    "Petition.tex": {
+        "fname": "Jane", "mname": "Q", "lname": "Student", "phone": "713-555-0100",
+        "myUH": "1234567", "uhEmail": "jqstudent@uh.edu", "program": "Computer Science",
+        "alias": "", "purpose_of_petition": "Transfer credit", "institution_name": "Rice University",
+        "city_state_zip": "Houston, TX 77005", "courses_transfer": "COMP 140",
+        "hours_transferred": "3", "transfer_credits": "3", "explanation": "Course taken over the summer.",
+    },
+    "GraduatePetition.tex": {
+        "fname": "Jane", "mname": "Q", "lname": "Student", "myUH": "1234567",
+        "phone": "713-555-0100", "program": "ENGR", "career": "Graduate", "term": "Fall",
+        "year": "2025", "purpose_9": "yes", "explanation": "Transfer of one course.",
+    },
+    "withdraw_template.tex": {
+        "student_name": "Jane Student", "myuh_id": "1234567", "phone": "713-555-0100",
+        "email": "jqstudent@uh.edu", "program": "Computer Science", "career": "Undergraduate",
+        "term": "Spring", "year": "2025", "aid": "Yes", "housing": "Yes", "agree": "Yes",
+        "date": "2025-03-01",
+    },
+    "Inter_Institutional.tex": {
+        "fullname": "Jane Student", "gender": "F", "dob": "2000-01-01", "address": "4800 Calhoun Rd",
+        "city": "Houston", "state": "TX", "zipcode": "77004", "country": "USA",
+        "email": "jqstudent@uh.edu", "citizen_status": "Yes", "texas_resident": "Yes",
+    },
+    "UndergradPetition.tex": {
+        "last_name": "Student", "first_name": "Jane", "middle_name": "Q", "psid": "1234567",
+        "phone": "713-555-0100", "address": "4800 Calhoun Rd", "city": "Houston", "state": "TX",
+        "zip": "77004", "email": "jqstudent@uh.edu", "explanation1": "Adding a minor.",
+    },
+}
+
+def time_compiles(latex_content, runs, use_format):
+    timings = []
+    failures = 0
+    for i in range(runs):
+        workdir = tempfile.mkdtemp(prefix="bench_latex_")
+        started = time.perf_counter()
+        try:
+            if use_format:
+                moose.run_pdflatex(latex_content, workdir, f"run{i}")
+            else:
+                moose.run_pdflatex_once(latex_content, workdir, f"run{i}")
+            timings.append(time.perf_counter() - started)
+        except moose.PdfCompileError:
+            failures += 1
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return timings, failures
+
+def describe(timings):
+    if not timings:
+        return "      -"
+    return f"{statistics.median(timings) * 1000:7.0f}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-form pdflatex timings with and without precompiled formats")
+    parser.add_argument("--runs", type=int, default=5, help="compiles per form and mode")
+    parser.add_argument("--form", action="append", help="only benchmark these templates")
+    args = parser.parse_args()
+
+    if shutil.which("pdflatex") is None:
+        sys.exit("pdflatex not found on PATH")
+
+    # Keep benchmark formats away from the app's real format directory
+    format_dir = tempfile.mkdtemp(prefix="bench_formats_")
+    moose.latex_formats = moose.LatexFormats(format_dir)
+
+    forms = args.form or sorted(SAMPLE_DATA)
+    print(f"{'form':28} {'plain ms':>9} {'format ms':>9} {'speedup':>8} {'build ms':>9}  failures")
+    for form in forms:
+        latex_content = moose.render_latex(form, **SAMPLE_DATA.get(form, {}))
+        plain, plain_failed = time_compiles(latex_content, args.runs, use_format=False)
+
+        # The first format compile pays for building the format; report it separately
+        started = time.perf_counter()
+        fmt_name, _ = moose.latex_formats.format_for(latex_content)
+        build_ms = (time.perf_counter() - started) * 1000
+        fast, fast_failed = time_compiles(latex_content, args.runs, use_format=True)
+
+        speedup = "-"
+        if plain and fast and fmt_name:
+            speedup = f"{statistics.median(plain) / statistics.median(fast):.1f}x"
+        build = f"{build_ms:9.0f}" if fmt_name else "  no fmt"
+        print(f"{form:28} {describe(plain):>9} {describe(fast):>9} {speedup:>8} {build}  "
+              f"{plain_failed}/{fast_failed}")
+
+    print(moose.latex_formats.stats())
+    shutil.rmtree(format_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Compare two load_test.py result files, scenario by scenario.
+#
+#   python benchmarks/compare.py                      # the two most recent runs
+#   python benchmarks/compare.py BASE.json NEW.json
+import argparse
+import glob
+import json
+import os
+import sys
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+METRICS = [("rps", True), ("p50_ms", False), ("p90_ms", False), ("p99_ms", False)]
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def describe(path, result):
+    git = result.get("git", {})
+    dirty = " (dirty)" if git.get("dirty") else ""
+    label = f" [{result['label']}]" if result.get("label") else ""
+    return f"{os.path.basename(path)}: {git.get('commit', '')[:8]}{dirty} {git.get('subject', '')}{label}"
+
+def change(old, new, higher_is_better):
+    if not old:
+        return "     n/a"
+    pct = (new - old) / old * 100
+    better = pct > 0 if higher_is_better else pct < 0
+    marker = "+" if better and abs(pct) >= 5 else "-" if not better and abs(pct) >= 5 else " "
+    return f"{pct:+7.1f}%{marker}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two load test runs")
+    parser.add_argument("files", nargs="*", help="baseline and candidate result files")
+    args = parser.parse_args()
+
+    files = args.files
+    if not files:
+        files = sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")))[-2:]
+    if len(files) != 2:
+        sys.exit("need two result files (run load_test.py twice, or pass BASE.json NEW.json)")
+    base, new = load(files[0]), load(files[1])
+    print("base:", describe(files[0], base))
+    print("new: ", describe(files[1], new))
+    if base.get("config", {}).get("concurrency") != new.get("config", {}).get("concurrency"):
+        print("warning: runs used different concurrency; numbers are not directly comparable")
+
+    header = f"\n{'scenario':24}" + "".join(f" {name:>10} {'new':>9} {'change':>9}" for name, _ in METRICS)
+    print(header)
+    rows = [(name, base["scenarios"][name], new["scenarios"][name])
+            for name in base["scenarios"] if name in new["scenarios"]]
+    rows.append(("TOTAL", base["total"], new["total"]))
+    for name, old, cur in rows:
+        cells = "".join(f" {old[m]:>10.1f} {cur[m]:>9.1f} {change(old[m], cur[m], hib):>9}" for m, hib in METRICS)
+        errors = f"  errors {old['errors']} -> {cur['errors']}" if old["errors"] or cur["errors"] else ""
+        print(f"{name:24}{cells}{errors}")
+    print("(+/- marks changes of 5% or more for better/worse)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# Mixed-traffic load test. Boots app:app under gunicorn against the database
+# seeded by seed.py, drives weighted scenarios from concurrent clients carrying
+# synthetic Easy Auth principals, and writes the results to benchmarks/results/
+# so runs can be compared across commits with compare.py.
+#
+#   python benchmarks/load_test.py                          # 60s, 16 clients, 4 workers
+#   python benchmarks/load_test.py --duration 120 --concurrency 32 --workers 8
+#   python benchmarks/load_test.py --no-pdf                 # skip the pdflatex endpoints
+#   python benchmarks/load_test.py --url http://127.0.0.1:8000   # server already running
+#
+# The server runs with SERVER_TIMING=1, so every response reports its database,
+# pdflatex and total app time; the difference to the client-side latency is
+# queueing and network. With --url, start the server with SERVER_TIMING=1 too,
+# and export the server's OPS_TOKEN so the readiness probe can reach /health/db-pool.
+import argparse
+import base64
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from datetime import datetime
+
+import bench_db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+OPS_TOKEN = os.getenv("OPS_TOKEN", "bench")  # readiness probe credentials, passed to the server we boot
+SERVER_TIMING_RE = re.compile(r'(\w+);dur=([\d.]+)(?:;desc="(\d+) queries")?')
+
+def principal(email, name):
+    claims = [{"typ": "preferred_username", "val": email}, {"typ": "name", "val": name}]
+    return base64.b64encode(json.dumps({"claims": claims}).encode()).decode()
+
+class Load:
+    def __init__(self, students):
+        self.students = students
+
+    def student(self, rng):
+        i = rng.randrange(self.students)
+        return bench_db.student_email(i), i
+
+    # Each scenario returns (method, path, form fields or None, principal email)
+    def home(self, rng):
+        return "GET", "/", None, self.student(rng)[0]
+
+    def report_form(self, rng):
+        return "GET", "/report", None, self.student(rng)[0]
+
+    def user_search(self, rng):
+        return "GET", f"/users/search?q=student{rng.randrange(100):02d}", None, self.student(rng)[0]
+
+    def report_user(self, rng):
+        email, i = self.student(rng)
+        reported = bench_db.student_email((i + 1 + rng.randrange(self.students - 1)) % self.students)
+        return "POST", "/report-user", {
+            "reported_email": reported, "category_id": str(rng.randint(1, 6)),
+            "description": "Load test report",
+        }, email
+
+    def lookup_reports(self, rng):
+        email, i = self.student(rng)
+        return "POST", "/lookup-reports", {"cougar_id": bench_db.student_cougar_id(i)}, email
+
+    def admin_panel(self, rng):
+        return "GET", "/adminpanel.html", None, bench_db.ADMIN_EMAIL
+
+    def admin_users(self, rng):
+        return "GET", "/api/admin/users", None, bench_db.ADMIN_EMAIL
+
+    def admin_reports(self, rng):
+        return "GET", "/api/admin/reports?reports_status=submitted", None, bench_db.ADMIN_EMAIL
+
+    def mod_queue(self, rng):
+        return "GET", "/api/moderator/reports", None, bench_db.MODERATOR_EMAIL
+
+    def inbox(self, rng):
+        return "GET", "/api/inbox", None, bench_db.ADMIN_EMAIL
+
+    # PDF forms carry a nonce, so the compiled-PDF cache cannot answer them
+    def petition_pdf(self, rng):
+        email, i = self.student(rng)
+        return "POST", "/PetitionSubmit", {
+            "fname": "Load", "lname": "Tester", "myUH": bench_db.student_cougar_id(i), "uhEmail": email,
+            "program": "Computer Science", "purpose_of_petition": "Transfer credit",
+            "explanation": f"Benchmark run {rng.getrandbits(64):x}",
+        }, email
+
+    def withdraw_pdf(self, rng):
+        email, i = self.student(rng)
+        return "POST", "/WithdrawSubmit", {
+            "student_name": "Load Tester", "myuh_id": bench_db.student_cougar_id(i), "email": email,
+            "term": "Spring", "year": "2025", "agree": "on", "date": f"nonce {rng.getrandbits(64):x}",
+        }, email
+
+    def inter_institutional_pdf(self, rng):
+        email, _ = self.student(rng)
+        return "POST", "/InterInstitutionalSubmit", {
+            "fullname": "Load Tester", "email": email, "city": "Houston", "state": "TX",
+            "address": f"{rng.getrandbits(32)} Calhoun Rd",
+        }, email
+
+    def undergrad_petition_pdf(self, rng):
+        email, i = self.student(rng)
+        return "POST", "/UndergraduatePetitionSubmit", {
+            "last_name": "Tester", "first_name": "Load", "psid": bench_db.student_cougar_id(i), "email": email,
+            "explanation1": f"Benchmark run {rng.getrandbits(64):x}",
+        }, email
+
+# name -> relative weight
+SCENARIOS = {
+    "home": 20,
+    "report_form": 8,
+    "user_search": 12,
+    "report_user": 6,
+    "lookup_reports": 10,
+    "admin_panel": 3,
+    "admin_users": 6,
+    "admin_reports": 6,
+    "mod_queue": 5,
+    "inbox": 6,
+    "petition_pdf": 1,
+    "withdraw_pdf": 1,
+    "inter_institutional_pdf": 1,
+    "undergrad_petition_pdf": 1,
+}
+
+class ScenarioStats:
+    def __init__(self):
+        self.latencies = []
+        self.statuses = Counter()
+        self.bytes = 0
+        self.timed = 0
+        self.stages = Counter()  # summed milliseconds (and query counts) from Server-Timing
+
+    def record(self, elapsed, status, server_timing, size):
+        self.latencies.append(elapsed)
+        self.statuses[str(status)] += 1
+        self.bytes += size
+        if server_timing:
+            self.timed += 1
+            for name, duration, queries in SERVER_TIMING_RE.findall(server_timing):
+                self.stages[f"{name}_ms"] += float(duration)
+                if queries:
+                    self.stages["queries"] += int(queries)
+
+    def merge(self, other):
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.bytes += other.bytes
+        self.timed += other.timed
+        self.stages.update(other.stages)
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(stats, seconds):
+    latencies = sorted(stats.latencies)
+    errors = sum(n for status, n in stats.statuses.items() if not status[0] in "23")
+    summary = {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / seconds, 2),
+        "errors": errors,
+        "statuses": dict(stats.statuses),
+        "bytes": stats.bytes,
+    }
+    for pct in (50, 90, 95, 99):
+        summary[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 2)
+    summary["max_ms"] = round(latencies[-1] * 1000, 2) if latencies else 0.0
+    summary["mean_ms"] = round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0
+    if stats.timed:
+        # Per-request means of each server-side stage
+        summary["stages"] = {name: round(total / stats.timed, 2) for name, total in sorted(stats.stages.items())}
+    return summary
+
+def client(base, duration, warmup, seed, load, names, weights, timeout, out):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(base.hostname, base.port or 80, timeout=timeout)
+    per_scenario = {name: ScenarioStats() for name in names}
+    start = time.perf_counter()
+    measure_from = start + warmup
+    deadline = measure_from + duration
+    principals = {}
+    while True:
+        now = time.perf_counter()
+        if now >= deadline:
+            break
+        name = rng.choices(names, weights)[0]
+        method, path, form, email = getattr(load, name)(rng)
+        if email not in principals:
+            principals[email] = principal(email, "Load Tester")
+        headers = {"X-MS-CLIENT-PRINCIPAL": principals[email], "Accept-Encoding": "gzip"}
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        started = time.perf_counter()
+        size, server_timing = 0, None
+        try:
+            conn.request(method, path, body, headers)
+            response = conn.getresponse()
+            size = len(response.read())
+            status, server_timing = response.status, response.getheader("Server-Timing")
+        except (OSError, http.client.HTTPException) as err:
+            status = type(err).__name__
+            conn.close()
+        elapsed = time.perf_counter() - started
+        if started >= measure_from:
+            per_scenario[name].record(elapsed, status, server_timing, size)
+    conn.close()
+    out.append(per_scenario)
+
+def wait_until_ready(base, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            sys.exit(f"gunicorn exited with status {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection(base.hostname, base.port, timeout=2)
+            conn.request("GET", "/health/db-pool", headers={"Authorization": f"Bearer {OPS_TOKEN}"})
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    sys.exit(f"server at {base.geturl()} did not become ready within {timeout}s")
+
+def start_server(args, home):
+    env = dict(os.environ, **bench_db.BENCH_DB_ENV)
+    env.update({
+        "SERVER_TIMING": "1",
+        # PDFs, compiled-PDF cache and LaTeX formats go under a throwaway $HOME
+        "HOME": home,
+        "PDF_ASYNC": "0",
+        "FLASK_SECRET_KEY": "bench",
+        "OPS_TOKEN": OPS_TOKEN,
+    })
+    if shutil.which("gunicorn") is None and subprocess.run(
+            [sys.executable, "-c", "import gunicorn"], capture_output=True).returncode != 0:
+        sys.exit("gunicorn is not installed (pip install -r requirements.txt)")
+    cmd = [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{args.port}",
+           "-w", str(args.workers), "--threads", str(args.threads),
+           "--timeout", "120", "--log-level", "warning", "app:app"]
+    return subprocess.Popen(cmd, cwd=ROOT, env=env)
+
+def git_revision():
+    def git(*cmd):
+        result = subprocess.run(["git", *cmd], cwd=ROOT, capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "subject": git("log", "-1", "--format=%s"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+def print_report(result):
+    print(f"\n{'scenario':24} {'reqs':>6} {'rps':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'err':>5}"
+          f" {'app':>8} {'db':>7} {'q/req':>6} {'pdf':>8}")
+    rows = list(result["scenarios"].items()) + [("TOTAL", result["total"])]
+    for name, s in rows:
+        stages = s.get("stages", {})
+        print(f"{name:24} {s['requests']:>6} {s['rps']:>7.1f} {s['p50_ms']:>8.1f} {s['p90_ms']:>8.1f}"
+              f" {s['p99_ms']:>8.1f} {s['errors']:>5} {stages.get('app_ms', 0):>8.1f}"
+              f" {stages.get('db_ms', 0):>7.1f} {stages.get('queries', 0):>6.1f} {stages.get('pdf_ms', 0):>8.1f}")
+    print("(latencies in ms; app/db/pdf are server-side means per request)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-traffic load test against a seeded database")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="seconds of traffic before measuring")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="gunicorn threads per worker")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--url", help="target a running server instead of booting gunicorn")
+    parser.add_argument("--students", type=int, default=2000, help="must not exceed seed.py --users")
+    parser.add_argument("--no-pdf", action="store_true", help="leave out the pdflatex endpoints")
+    parser.add_argument("--only", action="append", help="run only these scenarios")
+    parser.add_argument("--timeout", type=float, default=120, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default="", help="free text stored with the results")
+    args = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    if args.no_pdf:
+        scenarios = {name: w for name, w in scenarios.items() if not name.endswith("_pdf")}
+    if args.only:
+        unknown = set(args.only) - set(scenarios)
+        if unknown:
+            sys.exit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = {name: scenarios[name] for name in args.only}
+    names, weights = list(scenarios), list(scenarios.values())
+
+    home = tempfile.mkdtemp(prefix="bench_home_")
+    proc = None
+    base = urllib.parse.urlsplit(args.url or f"http://127.0.0.1:{args.port}")
+    try:
+        if not args.url:
+            proc = start_server(args, home)
+        wait_until_ready(base, proc)
+
+        load = Load(args.students)
+        outputs = []
+        threads = [threading.Thread(target=client, args=(base, args.duration, args.warmup, args.seed + n, load,
+                                                         names, weights, args.timeout, outputs))
+                   for n in range(args.concurrency)]
+        print(f"{args.concurrency} clients, {args.warmup:g}s warmup + {args.duration:g}s against {base.geturl()}")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        shutil.rmtree(home, ignore_errors=True)
+
+    merged = {name: ScenarioStats() for name in names}
+    total = ScenarioStats()
+    for per_scenario in outputs:
+        for name, stats in per_scenario.items():
+            merged[name].merge(stats)
+            total.merge(stats)
+
+    result = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "label": args.label,
+        "git": git_revision(),
+        "config": {
+            "duration": args.duration, "warmup": args.warmup, "concurrency": args.concurrency,
+            "workers": None if args.url else args.workers, "threads": None if args.url else args.threads,
+            "url": args.url, "students": args.students, "scenarios": scenarios,
+        },
+        "scenarios": {name: summarize(stats, args.duration) for name, stats in merged.items()},
+        "total": summarize(total, args.duration),
+    }
+    print_report(result)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{(result['git']['commit'] or 'nogit')[:8]}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {os.path.relpath(path, ROOT)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# Recreates the benchmark database and fills it with synthetic but realistically
+# shaped data: students spread over departments, reports across a year, form
+# requests with documents, and a share of those routed through a workflow so
+# approver inboxes are populated.
+#
+#   docker compose -f benchmarks/docker-compose.yml up -d
+#   python benchmarks/seed.py                          # 2000 users, 20000 reports
+#   python benchmarks/seed.py --users 20000 --reports 200000 --requests 50000
+#
+# Wipes moosefactory_sql on the BENCH_DB_* server (127.0.0.1:3307 by default).
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import bench_db  # noqa: E402
+
+bench_db.use_bench_db()
+
+import app as moose  # noqa: E402
+
+FIRST_NAMES = ["Alex", "Jordan", "Taylor", "Morgan", "Casey", "Riley", "Avery", "Quinn",
+               "Jamie", "Drew", "Reese", "Rowan", "Sam", "Hayden", "Emerson", "Parker"]
+LAST_NAMES = ["Nguyen", "Garcia", "Smith", "Patel", "Johnson", "Kim", "Martinez", "Brown",
+              "Lee", "Lopez", "Wilson", "Chen", "Davis", "Hernandez", "Clark", "Lewis"]
+COLLEGES = {
+    "NSM": ["COSC", "MATH", "PHYS", "BIOL"],
+    "CULLEN": ["ECE", "MECE", "CIVE", "CHEE"],
+    "BAUER": ["ACCT", "FINA", "MARK", "DISC"],
+}
+FORM_TYPES = ["petition", "withdrawal", "interinstitutional", "undergrad_petition"]
+REPORT_STATUSES = ["submitted", "under_review", "approved_by_moderator",
+                   "dismissed_by_moderator", "resolved", "dismissed"]
+REQUEST_STATUSES = ["submitted", "submitted", "submitted", "approved", "returned", "pending"]
+BATCH = 1000
+
+def batched(rows, size=BATCH):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def insert_many(cursor, sql, rows):
+    for chunk in batched(rows):
+        cursor.executemany(sql, chunk)
+
+def seed(conn, args):
+    rng = random.Random(args.seed)
+    now = datetime.now()
+    cursor = conn.cursor(buffered=True)
+
+    moose.execute_sql_file(cursor, os.path.join(ROOT, "database_template.sql"))
+    moose.execute_sql_file(cursor, os.path.join(ROOT, "default_dataset.sql"))
+    conn.commit()
+    moose.run_migrations(conn)
+    cursor = conn.cursor(buffered=True)
+
+    # Departments under colleges under the university (unit 1 from default_dataset.sql)
+    departments = []
+    for college, codes in COLLEGES.items():
+        college_id = moose.insert_org_unit(cursor, 1, f"College {college}", college)
+        for code in codes:
+            departments.append(moose.insert_org_unit(cursor, college_id, f"Department of {code}", code))
+
+    users = [("Bench Admin", bench_db.ADMIN_EMAIL, 1, "0000001"),
+             ("Bench Moderator", bench_db.MODERATOR_EMAIL, 3, "0000002")]
+    for i in range(args.users):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        users.append((name, bench_db.student_email(i), 2, bench_db.student_cougar_id(i)))
+    insert_many(cursor, "INSERT INTO users (name, email, role_id, cougar_id) VALUES (%s, %s, %s, %s)", users)
+
+    cursor.execute("SELECT user_id, email, cougar_id FROM users WHERE role_id = 2 AND email LIKE %s ORDER BY user_id",
+                   ("student%@bench.uh.edu",))
+    students = cursor.fetchall()
+    cursor.execute("SELECT user_id FROM users WHERE email = %s", (bench_db.ADMIN_EMAIL,))
+    admin_id = cursor.fetchone()[0]
+
+    insert_many(cursor, """
+        INSERT INTO user_organizational_units (user_id, unit_id, role_in_unit, is_primary)
+        VALUES (%s, %s, 'student', TRUE)
+    """, [(user_id, rng.choice(departments)) for user_id, _, _ in students])
+
+    # One organization-level approver and one workflow per form type
+    cursor.execute("INSERT INTO approvers (user_id, unit_id, is_primary) VALUES (%s, NULL, TRUE)", (admin_id,))
+    for form_type in FORM_TYPES:
+        cursor.execute("""
+            INSERT INTO workflows (name, request_type, unit_id) VALUES (%s, %s, NULL)
+        """, (f"{form_type} review", form_type))
+        cursor.execute("""
+            INSERT INTO workflow_steps (workflow_id, step_order, approval_type) VALUES (%s, 1, 'unit')
+        """, (cursor.lastrowid,))
+
+    reports = []
+    for _ in range(args.reports):
+        reporter, reported = rng.sample(students, 2)
+        created_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        reports.append((reporter[0], reporter[2], reported[0], rng.randint(1, 6),
+                        "Synthetic report " + " ".join(rng.choices(LAST_NAMES, k=rng.randint(5, 40))),
+                        rng.choice(REPORT_STATUSES), created_at))
+    insert_many(cursor, """
+        INSERT INTO reports (reporter_id, reporter_cougar_id, reported_user_id, category_id,
+                             description, status, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, reports)
+
+    requests = []
+    for _ in range(args.requests):
+        submitted_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        requests.append((rng.choice(students)[0], rng.choice(FORM_TYPES), rng.choice(REQUEST_STATUSES),
+                         submitted_at))
+    insert_many(cursor, """
+        INSERT INTO requests (user_id, form_type, status, submitted_at) VALUES (%s, %s, %s, %s)
+    """, requests)
+    cursor.execute("""
+        INSERT INTO documents (request_id, document_path)
+        SELECT request_id, CONCAT('bench/request_', request_id, '.pdf') FROM requests
+    """)
+    conn.commit()
+
+    # Routing writes approvals and inbox rows one request at a time, so only a share
+    cursor = conn.cursor(dictionary=True, buffered=True)
+    cursor.execute("SELECT request_id FROM requests WHERE status = 'submitted' ORDER BY request_id LIMIT %s",
+                   (args.routed,))
+    for row in cursor.fetchall():
+        moose.route_request(cursor, row["request_id"])
+    conn.commit()
+    cursor.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Recreate and seed the benchmark database")
+    parser.add_argument("--users", type=int, default=2000, help="students to create")
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--routed", type=int, default=500, help="submitted requests to route to approvers")
+    parser.add_argument("--seed", type=int, default=4353, help="random seed, for repeatable data")
+    args = parser.parse_args()
+    if args.users < 2:
+        sys.exit("--users must be at least 2")
+
+    started = time.perf_counter()
+    conn = moose.db_pool.acquire()
+    try:
+        seed(conn, args)
+    finally:
+        conn.release()
+    print(f"Seeded {args.users} users, {args.reports} reports, {args.requests} requests "
+          f"({args.routed} routed) on {bench_db.BENCH_DB_ENV['DB_HOST']}:{bench_db.BENCH_DB_ENV['DB_PORT']} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
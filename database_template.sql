@@ -73,7 +73,7 @@ CREATE TABLE approvals (
 CREATE TABLE documents (
     document_id INT AUTO_INCREMENT PRIMARY KEY,
     request_id INT NOT NULL,  -- The request associated with this document
-    document_path VARCHAR(512) NOT NULL,  -- Path to the generated PDF file
+    document_path VARCHAR(512) NOT NULL,  -- Document store key of the generated PDF (docs/ab/cd/<sha256>.pdf)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (request_id) REFERENCES requests(request_id)
 );
@@ -0,0 +1,22 @@
+-- Background PDF compilation jobs (one per async form submission)
+CREATE TABLE IF NOT EXISTS pdf_jobs (
+    job_id CHAR(32) PRIMARY KEY,
+    request_id INT NOT NULL,
+    user_id INT NOT NULL,
+    form_type VARCHAR(256) NOT NULL,
+    status ENUM('queued', 'running', 'done', 'failed') DEFAULT 'queued',
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL,
+    FOREIGN KEY (request_id) REFERENCES requests(request_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+);
+
+-- Version stamps the app polls to invalidate its in-process caches across workers
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT IGNORE INTO cache_versions (name, version) VALUES ('users', 0);
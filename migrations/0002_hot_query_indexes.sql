@@ -0,0 +1,24 @@
+-- Secondary indexes for the queries the app runs on every page view.
+-- ALGORITHM=INPLACE, LOCK=NONE builds them online without blocking writes.
+-- documents.request_id needs nothing here: InnoDB already indexes it for its foreign key.
+
+-- lookup_reports: WHERE reporter_cougar_id = ? ORDER BY created_at DESC
+ALTER TABLE reports
+    ADD INDEX idx_reports_cougar_created (reporter_cougar_id, created_at),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- admin/moderator report lists: ORDER BY created_at DESC, report_id DESC (optionally by status)
+ALTER TABLE reports
+    ADD INDEX idx_reports_created (created_at, report_id),
+    ADD INDEX idx_reports_status_created (status, created_at, report_id),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- admin petition list: WHERE form_type = ? ORDER BY submitted_at DESC, request_id DESC
+ALTER TABLE requests
+    ADD INDEX idx_requests_form_submitted (form_type, submitted_at, request_id),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- report_form: WHERE status = 'active', admin user list filtered by status
+ALTER TABLE users
+    ADD INDEX idx_users_status_email (status, email),
+    ALGORITHM=INPLACE, LOCK=NONE
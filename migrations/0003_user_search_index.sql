@@ -0,0 +1,5 @@
+-- Typeahead search for the report form: WHERE status = 'active' AND name LIKE 'prefix%'.
+-- The email side is already served by idx_users_status_email.
+ALTER TABLE users
+    ADD INDEX idx_users_status_name (status, name),
+    ALGORITHM=INPLACE, LOCK=NONE
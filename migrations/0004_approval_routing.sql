@@ -0,0 +1,39 @@
+-- Closure table over organizational_units: one row per (ancestor, descendant) pair,
+-- including each unit paired with itself at depth 0. Routing reads ancestors from
+-- here instead of walking parent_id. insert_org_unit()/move_org_unit() keep it current.
+CREATE TABLE IF NOT EXISTS org_unit_closure (
+    ancestor_id INT NOT NULL,
+    descendant_id INT NOT NULL,
+    depth INT NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id),
+    KEY idx_org_unit_closure_descendant (descendant_id, depth),
+    FOREIGN KEY (ancestor_id) REFERENCES organizational_units(unit_id) ON DELETE CASCADE,
+    FOREIGN KEY (descendant_id) REFERENCES organizational_units(unit_id) ON DELETE CASCADE
+);
+
+-- Backfill from the units that already exist
+INSERT IGNORE INTO org_unit_closure (ancestor_id, descendant_id, depth)
+WITH RECURSIVE paths AS (
+    SELECT unit_id AS ancestor_id, unit_id AS descendant_id, 0 AS depth
+    FROM organizational_units
+    UNION ALL
+    SELECT p.ancestor_id, u.unit_id, p.depth + 1
+    FROM paths p
+    JOIN organizational_units u ON u.parent_id = p.descendant_id
+)
+SELECT ancestor_id, descendant_id, depth FROM paths;
+
+-- Which workflow step an approval row belongs to
+ALTER TABLE approvals
+    ADD COLUMN step_id INT NULL AFTER approver_id,
+    ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    ADD INDEX idx_approvals_request_step (request_id, step_id),
+    ADD FOREIGN KEY (step_id) REFERENCES workflow_steps(step_id) ON DELETE SET NULL;
+
+-- Routing lookups: workflows by form type, steps in order. approvers.unit_id and
+-- user_organizational_units.user_id are already indexed by their keys.
+ALTER TABLE workflows
+    ADD INDEX idx_workflows_type (request_type, is_active);
+
+ALTER TABLE workflow_steps
+    ADD INDEX idx_workflow_steps_order (workflow_id, step_order)
@@ -0,0 +1,10 @@
+-- Lets each worker's delegation index pick up rows changed since its last sync
+ALTER TABLE delegates
+    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_delegates_updated (updated_at);
+
+-- The expiry sweep: WHERE status = 'active' AND end_date < now
+ALTER TABLE delegates
+    ADD INDEX idx_delegates_status_end (status, end_date);
+
+INSERT IGNORE INTO cache_versions (name, version) VALUES ('delegates', 0)
@@ -0,0 +1,31 @@
+-- Scope an approval was routed in (matched against unit delegations) and who decided it
+ALTER TABLE approvals
+    ADD COLUMN unit_id INT NULL AFTER step_id,
+    ADD COLUMN decided_by INT NULL,
+    ADD FOREIGN KEY (unit_id) REFERENCES organizational_units(unit_id) ON DELETE SET NULL,
+    ADD FOREIGN KEY (decided_by) REFERENCES users(user_id) ON DELETE SET NULL;
+
+-- Materialized "my pending items": one row per user who may act on an approval of a
+-- request's current step, the assigned approver and any delegates. Delegated rows
+-- carry the delegation window, so they appear and lapse without being rewritten.
+CREATE TABLE IF NOT EXISTS approval_inbox (
+    inbox_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    approval_id INT NOT NULL,
+    request_id INT NOT NULL,
+    reason ENUM('assigned', 'delegated') NOT NULL DEFAULT 'assigned',
+    delegation_id INT NULL,
+    active_from TIMESTAMP NULL,
+    active_until TIMESTAMP NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_approval_inbox_user_approval (user_id, approval_id),
+    KEY idx_approval_inbox_user_created (user_id, created_at, inbox_id),
+    KEY idx_approval_inbox_request (request_id),
+    KEY idx_approval_inbox_approval (approval_id),
+    KEY idx_approval_inbox_delegation (delegation_id),
+    KEY idx_approval_inbox_until (active_until),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (approval_id) REFERENCES approvals(approval_id) ON DELETE CASCADE,
+    FOREIGN KEY (request_id) REFERENCES requests(request_id) ON DELETE CASCADE,
+    FOREIGN KEY (delegation_id) REFERENCES delegates(delegation_id) ON DELETE CASCADE
+)
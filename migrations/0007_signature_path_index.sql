@@ -0,0 +1,5 @@
+-- Signature garbage collection asks whether any user still points at a file:
+-- SELECT 1 FROM users WHERE signature_path = ? LIMIT 1, once per replaced upload.
+ALTER TABLE users
+    ADD INDEX idx_users_signature_path (signature_path),
+    ALGORITHM=INPLACE, LOCK=NONE
@@ -0,0 +1,6 @@
+-- Document store housekeeping reads documents by storage key:
+-- gc-documents lists every key (WHERE document_path LIKE 'docs/...'), and
+-- migrate-documents walks the rows whose path is not a key yet.
+ALTER TABLE documents
+    ADD INDEX idx_documents_path (document_path),
+    ALGORITHM=INPLACE, LOCK=NONE
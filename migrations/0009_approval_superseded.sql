@@ -0,0 +1,6 @@
+-- Approvals still pending when an admin approves or returns a request outside the
+-- workflow are marked 'superseded', so they no longer read as live decisions.
+-- Appending an ENUM value is an in-place, metadata-only change.
+ALTER TABLE approvals
+    MODIFY status ENUM('pending', 'approved', 'returned', 'superseded') DEFAULT 'pending',
+    ALGORITHM=INPLACE, LOCK=NONE
@@ -0,0 +1,203 @@
+// Admin panel sections. Each section is fetched from the JSON API the first time
+// it is opened, so the page itself costs one small query. The API answers 304 for
+// unchanged pages. URLs and the current filters come from panelConfig in the page.
+const { filterArgs, urls } = panelConfig;
+const sections = {
+  users: { url: panelConfig.sectionUrls.users, render: renderUser },
+  reports: { url: panelConfig.sectionUrls.reports, render: renderReport },
+  petitions: { url: panelConfig.sectionUrls.petitions, render: renderPetition }
+};
+
+function sectionUrl(name, after) {
+  const params = new URLSearchParams(filterArgs);
+  if (after) {
+    params.set('after', after);
+  }
+  return sections[name].url + '?' + params.toString();
+}
+
+function loadSection(name, more) {
+  const section = sections[name];
+  if (section.loading || (section.loaded && !more)) {
+    return;
+  }
+  section.loading = true;
+  const el = document.querySelector('[data-section="' + name + '"]');
+  const status = el.querySelector('.section-status');
+  const moreButton = el.querySelector('.load-more');
+  status.textContent = 'Loading...';
+
+  fetch(sectionUrl(name, more ? section.next : null), { headers: { 'Accept': 'application/json' } })
+    .then(response => response.json().then(body => {
+      if (!response.ok) {
+        throw new Error(body.error || response.statusText);
+      }
+      return body;
+    }))
+    .then(body => {
+      body.items.forEach(section.render);
+      section.loaded = true;
+      section.count = (section.count || 0) + body.items.length;
+      section.next = body.next_cursor;
+      moreButton.hidden = !body.next_cursor;
+      status.textContent = section.count ? '' : 'Nothing to show.';
+    })
+    .catch(err => {
+      status.textContent = 'Could not load this section: ' + err.message;
+    })
+    .finally(() => {
+      section.loading = false;
+    });
+}
+
+function cell(row, text) {
+  // cell(row) is an empty container, missing values show as a dash
+  const td = document.createElement('td');
+  if (arguments.length > 1) {
+    td.textContent = text === null || text === undefined || text === '' ? '—' : text;
+  }
+  row.appendChild(td);
+  return td;
+}
+
+function postForm(action, fields, label) {
+  const form = document.createElement('form');
+  form.action = action;
+  form.method = 'POST';
+  Object.entries(fields).forEach(([name, value]) => {
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = name;
+    input.value = value;
+    form.appendChild(input);
+  });
+  const button = document.createElement('button');
+  button.type = 'submit';
+  button.textContent = label;
+  form.appendChild(button);
+  return form;
+}
+
+function formatDate(value) {
+  return value ? value.replace('T', ' ') : value;
+}
+
+function renderUser(user) {
+  document.getElementById('userSelect').add(
+    new Option(user.username + ' (Current: ' + user.access_level + ')', user.username));
+  document.getElementById('toggleUserSelect').add(
+    new Option(user.username + ' (Status: ' + user.status + ')', user.username));
+
+  const card = document.createElement('div');
+  card.className = 'signature-card';
+  const heading = document.createElement('h3');
+  heading.textContent = user.username;
+  card.appendChild(heading);
+  if (user.signature_url) {
+    const container = document.createElement('div');
+    container.className = 'signature-container';
+    const img = document.createElement('img');
+    img.src = user.signature_url;
+    img.alt = 'Signature for ' + user.username;
+    img.className = 'signature-image';
+    img.loading = 'lazy';
+    const error = document.createElement('p');
+    error.className = 'error-message';
+    error.textContent = 'Error loading signature';
+    error.style.display = 'none';
+    img.onerror = () => {
+      img.style.display = 'none';
+      error.style.display = 'block';
+    };
+    container.append(img, error);
+    card.appendChild(container);
+  } else {
+    const none = document.createElement('p');
+    none.textContent = 'No signature uploaded';
+    card.appendChild(none);
+  }
+  document.getElementById('signatureGrid').appendChild(card);
+}
+
+function renderReport(rep) {
+  const open = rep.status !== 'resolved' && rep.status !== 'dismissed';
+  const row = document.createElement('tr');
+
+  const select = cell(row);
+  if (open) {
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.name = 'report_ids';
+    checkbox.value = rep.report_id;
+    checkbox.setAttribute('form', 'bulkReportsForm');
+    select.appendChild(checkbox);
+  }
+  cell(row, rep.report_id);
+  cell(row, rep.reporter_email);
+  cell(row, rep.reported_email);
+  cell(row, rep.category_name);
+  cell(row, rep.description).style.cssText = 'max-width:250px; word-break:break-word;';
+  cell(row, formatDate(rep.created_at));
+  cell(row, rep.status);
+  cell(row, rep.moderator_comments);
+
+  const comments = cell(row, rep.admin_comments);
+  const actions = open ? cell(row) : cell(row, '✔');
+  if (open) {
+    const form = postForm(urls.updateReport, { report_id: rep.report_id }, 'Save');
+    const textarea = document.createElement('textarea');
+    textarea.name = 'admin_comments';
+    textarea.rows = 2;
+    textarea.style.width = '100%';
+    textarea.placeholder = 'Add admin comment...';
+    textarea.required = true;
+    textarea.value = rep.admin_comments || '';
+    form.prepend(textarea);
+    comments.textContent = '';
+    comments.appendChild(form);
+
+    actions.className = 'actions-column';
+    const resolve = postForm(urls.updateReport, { report_id: rep.report_id, action: 'resolved' }, 'Resolve');
+    resolve.style.marginBottom = '5px';
+    actions.append(resolve,
+                   postForm(urls.updateReport, { report_id: rep.report_id, action: 'dismissed' }, 'Dismiss'));
+  }
+  document.getElementById('reportsBody').appendChild(row);
+}
+
+function renderPetition(p) {
+  const row = document.createElement('tr');
+  const select = cell(row);
+  const checkbox = document.createElement('input');
+  checkbox.type = 'checkbox';
+  checkbox.name = 'request_ids';
+  checkbox.value = p.request_id;
+  checkbox.setAttribute('form', 'bulkRequestsForm');
+  select.appendChild(checkbox);
+
+  cell(row, p.request_id);
+  cell(row, p.email);
+  cell(row, formatDate(p.submitted_at));
+  cell(row, p.req_status);
+
+  const actions = cell(row);
+  actions.className = 'actions-column';
+  if (p.pdf_url) {
+    const link = document.createElement('a');
+    link.href = p.pdf_url;
+    link.textContent = 'View PDF';
+    actions.appendChild(link);
+  }
+  actions.appendChild(postForm(urls.approveRequest, { request_id: p.request_id }, 'Approve'));
+  document.getElementById('petitionsBody').appendChild(row);
+}
+
+document.querySelectorAll('details[data-section]').forEach(el => {
+  const name = el.dataset.section;
+  el.addEventListener('toggle', () => {
+    if (el.open) {
+      loadSection(name);
+    }
+  });
+  el.querySelector('.load-more').addEventListener('click', () => loadSection(name, true));
+});
@@ -0,0 +1,119 @@
+// Moderator report queue. queueUrl and handleReportUrl are set by the page.
+let nextCursor = null;
+let loading = false;
+
+// Function to toggle the visibility of report details when clicking on a report summary
+function toggleDetails(id) {
+  const details = document.getElementById('details-' + id);
+  details.style.display = details.style.display === 'block' ? 'none' : 'block';
+}
+
+// Free-text search over the reports loaded so far; status filtering happens server-side
+function filterReports() {
+  const searchTerm = document.getElementById('searchInput').value.toLowerCase();
+  document.querySelectorAll('.report-summary').forEach(report => {
+    report.style.display = report.textContent.toLowerCase().includes(searchTerm) ? '' : 'none';
+  });
+}
+
+function reloadQueue() {
+  nextCursor = null;
+  document.getElementById('reportList').textContent = '';
+  loadQueue(false);
+}
+
+function loadQueue(more) {
+  if (loading) {
+    return;
+  }
+  loading = true;
+  const params = new URLSearchParams();
+  const status = document.getElementById('statusFilter').value;
+  if (status) {
+    params.set('reports_status', status);
+  }
+  if (more && nextCursor) {
+    params.set('after', nextCursor);
+  }
+  const queueStatus = document.getElementById('queueStatus');
+  queueStatus.textContent = 'Loading...';
+
+  fetch(queueUrl + '?' + params.toString(), { headers: { 'Accept': 'application/json' } })
+    .then(response => response.json().then(body => {
+      if (!response.ok) {
+        throw new Error(body.error || response.statusText);
+      }
+      return body;
+    }))
+    .then(body => {
+      if (body.counts) {
+        const counts = body.counts;
+        document.getElementById('statTotal').textContent =
+          Object.values(counts).reduce((a, b) => a + b, 0);
+        document.getElementById('statSubmitted').textContent = counts.submitted || 0;
+        document.getElementById('statUnderReview').textContent = counts.under_review || 0;
+      }
+      body.items.forEach(renderReport);
+      nextCursor = body.next_cursor;
+      document.getElementById('loadMore').hidden = !nextCursor;
+      queueStatus.textContent = document.querySelector('.report-summary') ? '' : 'No reports.';
+      filterReports();
+    })
+    .catch(err => {
+      queueStatus.textContent = 'Could not load reports: ' + err.message;
+    })
+    .finally(() => {
+      loading = false;
+    });
+}
+
+function infoLine(parent, label, value) {
+  const line = document.createElement('div');
+  line.className = 'info-line';
+  const strong = document.createElement('strong');
+  strong.textContent = label + ':';
+  line.append(strong, ' ' + (value === null ? '' : value));
+  parent.appendChild(line);
+}
+
+function renderReport(report) {
+  const id = report.report_id;
+  const list = document.getElementById('reportList');
+
+  // Clickable report summary that shows basic info
+  const summary = document.createElement('div');
+  summary.className = 'report-summary';
+  summary.textContent = 'Report #' + id + ' \u2014 ' + report.category_name + ' \u2014 Status: ' + report.status;
+  summary.onclick = () => toggleDetails(id);
+
+  // Expanded report details section that appears when summary is clicked
+  const details = document.createElement('div');
+  details.className = 'report-details';
+  details.id = 'details-' + id;
+  infoLine(details, 'Reporter Cougar ID', report.reporter_cougar_id);
+  infoLine(details, 'Reported User ID', report.reported_user_id);
+  infoLine(details, 'Category', report.category_name);
+  infoLine(details, 'Description', report.description);
+
+  // Form for moderator to take action on the report
+  const form = document.createElement('form');
+  form.action = handleReportUrl;
+  form.method = 'POST';
+  form.innerHTML = `
+    <input type="hidden" name="report_id">
+    <label for="action-${id}">Moderator Action:</label>
+    <select name="action" id="action-${id}" required>
+      <option value="">-- Select an Action --</option>
+      <option value="approved_by_moderator">Approve Report</option>
+      <option value="dismissed_by_moderator">Dismiss Report</option>
+    </select>
+    <label for="moderator_comments-${id}">Reason or Recommended Punishment:</label>
+    <textarea name="moderator_comments" id="moderator_comments-${id}" rows="4" required></textarea>
+    <input type="submit" value="Submit Decision">`;
+  form.elements.report_id.value = id;
+  details.appendChild(form);
+
+  list.append(summary, details);
+}
+
+loadQueue(false);
@@ -0,0 +1,95 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as moose
+
+
+class StubCursor:
+    # Answers every statement with the rows it was built with, or with whatever
+    # answer(cursor, sql, params) returns for it (None keeps the current rows)
+    def __init__(self, rows=(), answer=None):
+        self.rows = list(rows)
+        self.answer = answer
+        self.rowcount = -1
+        self.lastrowid = None
+        self.statements = []
+
+    def execute(self, operation, params=None, multi=False):
+        self.statements.append((" ".join(operation.split()), params))
+        if self.answer is not None:
+            rows = self.answer(self, operation, params or ())
+            if rows is not None:
+                self.rows = list(rows)
+
+    def executemany(self, operation, seq_params):
+        seq_params = list(seq_params)
+        self.statements.append((" ".join(operation.split()), seq_params))
+        self.rowcount = len(seq_params)
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchmany(self, size=1):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class StubConnection:
+    def __init__(self, rows=(), answer=None):
+        self.rows = rows
+        self.answer = answer
+        self.broken = False
+        self.closed = False
+
+    def cursor(self, **kwargs):
+        return StubCursor(self.rows, self.answer)
+
+    def ping(self, reconnect=False):
+        if self.broken or self.closed:
+            raise moose.mysql.connector.InterfaceError("Lost connection to MySQL server")
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        if self.broken:
+            raise moose.mysql.connector.InterfaceError("Lost connection to MySQL server")
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def stub_rows():
+    return []
+
+
+@pytest.fixture
+def stub_answer():
+    return None
+
+
+@pytest.fixture
+def stub_pool(monkeypatch, stub_rows, stub_answer):
+    # A fresh pool per test, so no connection (or answer) leaks between tests
+    pool = moose.ConnectionPool(lambda: StubConnection(stub_rows, stub_answer),
+                                size=2, max_overflow=1, timeout=0.05, recycle=0, pre_ping=True)
+    monkeypatch.setattr(moose, "db_pool", pool)
+    return pool
+
+
+@pytest.fixture
+def client(monkeypatch, stub_pool):
+    # The real pool and MeteredCursor, over connections that never leave the process
+    monkeypatch.setattr(moose.app, "testing", True)
+    return moose.app.test_client()
@@ -0,0 +1,53 @@
+import pytest
+
+import app as moose
+
+
+def test_overflow_then_timeout(stub_pool):
+    held = [stub_pool.acquire() for _ in range(3)]  # size 2 + overflow 1
+    assert stub_pool.stats()["checked_out"] == 3
+    assert stub_pool.stats()["overflow"] == 1
+    with pytest.raises(moose.mysql.connector.errors.PoolError):
+        stub_pool.acquire()
+    assert stub_pool.stats()["timeouts"] == 1
+
+    for conn in held:
+        conn.close()
+    stats = stub_pool.stats()
+    assert (stats["checked_out"], stats["idle"], stats["overflow_closed"]) == (0, 2, 1)
+
+
+def test_idle_connections_are_reused(stub_pool):
+    conn = stub_pool.acquire()
+    raw = conn._raw
+    conn.close()
+    assert stub_pool.acquire()._raw is raw
+    assert stub_pool.stats()["connects"] == 1
+
+
+def test_broken_connection_is_discarded_on_release(stub_pool):
+    conn = stub_pool.acquire()
+    raw = conn._raw
+    raw.broken = True
+    conn.close()
+    assert raw.closed
+    assert stub_pool.stats()["idle"] == 0 and stub_pool.stats()["checked_out"] == 0
+
+    replacement = stub_pool.acquire()
+    assert replacement._raw is not raw
+    assert stub_pool.stats()["connects"] == 2
+
+
+def test_idle_connection_failing_ping_is_replaced(stub_pool):
+    conn = stub_pool.acquire()
+    raw = conn._raw
+    conn.close()
+    raw.broken = True
+    assert stub_pool.acquire()._raw is not raw
+    assert raw.closed and stub_pool.stats()["ping_failures"] == 1
+
+
+def test_request_connection_goes_back_after_teardown(client, stub_pool):
+    assert client.get("/report").status_code == 200
+    stats = stub_pool.stats()
+    assert (stats["checkouts"], stats["checked_out"], stats["idle"]) == (1, 0, 1)
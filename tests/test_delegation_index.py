@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as moose
+
+T0 = datetime(2026, 3, 1, 9, 0)
+
+
+def delegation(delegation_id, start_days, end_days, status="active", approver_id=70, unit_id=1, delegate=20):
+    return {"delegation_id": delegation_id, "parent_approver_id": approver_id, "delegate_user_id": delegate,
+            "unit_id": unit_id, "start_date": T0 + timedelta(days=start_days),
+            "end_date": T0 + timedelta(days=end_days), "status": status}
+
+
+class DelegatesTable:
+    def __init__(self):
+        self.version = 1
+        self.rows = {}
+        self.changed = []
+        self.queries = []
+
+    def answer(self, cursor, sql, params):
+        if "FROM cache_versions" in sql:
+            return [{"version": self.version, "now": T0}]
+        if "status = 'active'" in sql:
+            self.queries.append("rebuild")
+            return [row for row in self.rows.values() if row["status"] == "active"]
+        if "updated_at >=" in sql:
+            self.queries.append("delta")
+            return self.changed
+        return []
+
+
+@pytest.fixture
+def delegates():
+    return DelegatesTable()
+
+
+@pytest.fixture
+def stub_answer(delegates):
+    return delegates.answer
+
+
+@pytest.fixture
+def index(monkeypatch, stub_pool):
+    index = moose.DelegationIndex(0, 3600)
+    monkeypatch.setattr(moose, "delegation_index", index)
+    monkeypatch.setattr(moose, "start_sweeper", lambda *args: None)
+    return index
+
+
+def test_delegation_acts_only_inside_its_window(index):
+    index.replace_all([delegation(7, 0, 3)], 1, T0)
+    assert index.acting_for(70, 1, T0 - timedelta(seconds=1)) is None
+    assert index.acting_for(70, 1, T0)["delegation_id"] == 7
+    assert index.acting_for(70, 1, T0 + timedelta(days=3))["delegate_user_id"] == 20
+    assert index.acting_for(70, 1, T0 + timedelta(days=3, seconds=1)) is None
+    # Other keys are not affected
+    assert index.acting_for(70, 2, T0 + timedelta(days=1)) is None
+    assert index.acting_for(71, 1, T0 + timedelta(days=1)) is None
+
+
+def test_latest_started_window_wins(index):
+    index.replace_all([delegation(7, 0, 10, delegate=20), delegation(8, 2, 4, delegate=21)], 1, T0)
+    assert index.acting_for(70, 1, T0 + timedelta(days=1))["delegation_id"] == 7
+    assert index.acting_for(70, 1, T0 + timedelta(days=3))["delegation_id"] == 8
+    # Once the later window ends, the earlier one still covers
+    assert index.acting_for(70, 1, T0 + timedelta(days=5))["delegation_id"] == 7
+
+
+def test_revoked_row_drops_out_on_apply(index):
+    index.replace_all([delegation(7, 0, 3), delegation(8, 0, 3, unit_id=2)], 1, T0)
+    index.apply([delegation(7, 0, 3, status="revoked")])
+    assert index.acting_for(70, 1, T0 + timedelta(days=1)) is None
+    assert index.acting_for(70, 2, T0 + timedelta(days=1))["delegation_id"] == 8
+    assert index.stats()["delegations"] == 1
+
+
+def test_stamp_bump_resyncs_the_index(index, delegates):
+    delegates.rows = {7: delegation(7, 0, 3), 8: delegation(8, 0, 3, unit_id=2)}
+    moose.sync_delegations()
+    assert delegates.queries == ["rebuild"]
+    assert index.acting_for(70, 1, T0)["delegation_id"] == 7
+
+    # Same stamp: nothing is read
+    moose.sync_delegations()
+    assert delegates.queries == ["rebuild"]
+
+    # Another worker revokes 7 and bumps the stamp: the changed rows are re-read
+    delegates.rows[7] = delegation(7, 0, 3, status="revoked")
+    delegates.changed = [delegates.rows[7]]
+    delegates.version += 1
+    moose.sync_delegations()
+    assert delegates.queries == ["rebuild", "delta"]
+    assert index.acting_for(70, 1, T0) is None
+    assert index.stats()["version"] == delegates.version
+
+    # Rows deleted outright (cascades) leave no updated_at behind; the periodic
+    # full reload catches them
+    del delegates.rows[8]
+    index.rebuild_interval = 0
+    moose.sync_delegations()
+    assert delegates.queries == ["rebuild", "delta", "rebuild"]
+    assert index.acting_for(70, 2, T0) is None
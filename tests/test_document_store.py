@@ -0,0 +1,80 @@
+import os
+import time
+
+import pytest
+from click.testing import CliRunner
+
+import app as moose
+
+DAY = 86400
+
+
+def write_pdf(path, body, size=1000):
+    path.write_bytes(b"%PDF-1.4\n" + body.encode() + b"x" * (size - 10 - len(body)) + b"\n")
+    return str(path)
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    store = moose.LocalDocumentStore(str(tmp_path / "documents"))
+    monkeypatch.setattr(moose, "document_store", store)
+    monkeypatch.setattr(moose, "PDF_SCRATCH_DIR", str(tmp_path / "scratch"))
+    monkeypatch.setattr(moose, "PDF_OUTPUT_DIR", str(tmp_path / "output"))
+    monkeypatch.setattr(moose.app, "root_path", str(tmp_path))
+    return store
+
+
+def put_aged(store, tmp_path, body, seconds):
+    key = store.put(write_pdf(tmp_path / f"{body}.pdf", body))
+    age(store.path(key), seconds)
+    age(os.path.join(store.puts_dir, moose.DOCUMENT_KEY_RE.fullmatch(key).group(3)), seconds)
+    return key
+
+
+@pytest.fixture
+def referenced():
+    return set()
+
+
+@pytest.fixture
+def stub_answer(referenced):
+    def answer(cursor, sql, params):
+        if "FROM documents" in sql:
+            return [(key,) for key in sorted(referenced)]
+        return []
+    return answer
+
+
+def test_gc_never_removes_a_referenced_key(store, stub_pool, referenced, tmp_path):
+    old_referenced = put_aged(store, tmp_path, "referenced", 30 * DAY)
+    old_orphan = put_aged(store, tmp_path, "orphan", 30 * DAY)
+    fresh_orphan = put_aged(store, tmp_path, "fresh", 60)
+    referenced.add(old_referenced)
+    partial = store.path(old_orphan) + ".0123.tmp"
+    open(partial, "wb").close()
+    age(partial, 30 * DAY)
+
+    result = CliRunner().invoke(moose.app.cli, ["gc-documents", "--grace", str(DAY)])
+    assert result.exit_code == 0, result.output
+    assert "1 documents" in result.output and "1 partial" in result.output
+
+    assert os.path.exists(store.path(old_referenced))
+    assert os.path.exists(store.path(fresh_orphan))
+    assert not os.path.exists(store.path(old_orphan))
+    assert not os.path.exists(partial)
+    assert stub_pool.stats()["checked_out"] == 0
+
+
+def test_gc_keeps_an_old_file_that_was_just_put_again(store, stub_pool, tmp_path):
+    # A second submission of the same PDF shares the stored file; its row may not
+    # have committed yet, so the fresh put marker keeps the file
+    key = put_aged(store, tmp_path, "shared", 30 * DAY)
+    assert store.put(write_pdf(tmp_path / "again.pdf", "shared")) == key
+    result = CliRunner().invoke(moose.app.cli, ["gc-documents", "--grace", str(DAY)])
+    assert result.exit_code == 0, result.output
+    assert os.path.exists(store.path(key))
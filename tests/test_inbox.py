@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import app as moose
+from conftest import StubCursor
+
+
+def approval(approval_id, approver_id, step_order, status="pending", unit_id=None, request_id=1):
+    return {"approval_id": approval_id, "request_id": request_id, "approver_id": approver_id,
+            "unit_id": unit_id, "status": status, "step_id": 100 + step_order, "step_order": step_order,
+            "min_approvals": 1, "is_required": 1}
+
+
+def workflow_db(approvals, approvers=(), closure=()):
+    def answer(cursor, sql, params):
+        if "FROM approvals a" in sql:
+            return [a for a in approvals if a["request_id"] == params[0]]
+        if "FROM approvers" in sql:
+            return [row for row in approvers if row["user_id"] in params]
+        if "FROM org_unit_closure" in sql:
+            return [{"ancestor_id": a, "descendant_id": d} for a, d in closure if d in params]
+        return []
+    return StubCursor(answer=answer)
+
+
+def inbox_inserts(cursor):
+    return [rows for sql, rows in cursor.statements if sql.startswith("INSERT IGNORE INTO approval_inbox")]
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = moose.DelegationIndex(5, 3600)
+    monkeypatch.setattr(moose, "delegation_index", index)
+    monkeypatch.setattr(moose, "sync_delegations", lambda: None)
+    return index
+
+
+def test_assigned_rows_for_the_current_step(index):
+    cursor = workflow_db([approval(1, 10, 1), approval(2, 11, 1), approval(3, 12, 2)])
+    assert moose.refresh_request_inbox(cursor, 1) == "pending"
+    assert cursor.statements[1] == ("DELETE FROM approval_inbox WHERE request_id = %s AND approval_id NOT IN (%s, %s)",
+                                    (1, 1, 2))
+    assert inbox_inserts(cursor) == [[(10, 1, 1, "assigned", None, None, None),
+                                      (11, 2, 1, "assigned", None, None, None)]]
+
+
+def test_delegated_rows_carry_the_delegation_window(index):
+    now = datetime.now()
+    start, end = now - timedelta(days=1), now + timedelta(days=2)
+    index.replace_all([
+        {"delegation_id": 7, "parent_approver_id": 70, "delegate_user_id": 20, "unit_id": 1,
+         "start_date": start, "end_date": end, "status": "active"},
+        # Ended already: not offered
+        {"delegation_id": 8, "parent_approver_id": 70, "delegate_user_id": 21, "unit_id": 1,
+         "start_date": now - timedelta(days=9), "end_date": now - timedelta(days=8), "status": "active"},
+    ], 1, now)
+    cursor = workflow_db([approval(1, 10, 1, unit_id=5)],
+                         approvers=[{"approver_id": 70, "user_id": 10}],
+                         closure=[(1, 5), (5, 5)])
+    moose.refresh_request_inbox(cursor, 1)
+    assert inbox_inserts(cursor) == [[(10, 1, 1, "assigned", None, None, None),
+                                      (20, 1, 1, "delegated", 7, start, end)]]
+
+
+def test_inbox_moves_to_the_next_step(index):
+    approvals = [approval(1, 10, 1), approval(2, 12, 2)]
+    cursor = workflow_db(approvals)
+    moose.refresh_request_inbox(cursor, 1)
+    assert inbox_inserts(cursor)[-1] == [(10, 1, 1, "assigned", None, None, None)]
+
+    approvals[0]["status"] = "approved"
+    assert moose.refresh_request_inbox(cursor, 1) == "pending"
+    assert ("DELETE FROM approval_inbox WHERE request_id = %s AND approval_id NOT IN (%s)", (1, 2)) in cursor.statements
+    assert inbox_inserts(cursor)[-1] == [(12, 2, 1, "assigned", None, None, None)]
+
+    approvals[1]["status"] = "approved"
+    assert moose.refresh_request_inbox(cursor, 1) == "approved"
+    assert cursor.statements[-1] == ("DELETE FROM approval_inbox WHERE request_id = %s", (1,))
+
+
+def test_returned_request_leaves_every_inbox(index):
+    cursor = workflow_db([approval(1, 10, 1, status="returned"), approval(2, 12, 2)])
+    assert moose.refresh_request_inbox(cursor, 1) == "returned"
+    assert cursor.statements[-1] == ("DELETE FROM approval_inbox WHERE request_id = %s", (1,))
+
+
+def test_active_window_is_checked_against_the_app_clock():
+    cursor = StubCursor()
+    before = datetime.now()
+    moose.fetch_inbox(cursor, 10, None, 25)
+    sql, params = cursor.statements[0]
+    assert "CURRENT_TIMESTAMP" not in sql
+    assert params[0] == 10 and params[1] == params[2] and params[1] >= before
@@ -0,0 +1,37 @@
+import shutil
+
+import pytest
+
+import app as moose
+
+GRADUATE_PETITION = {
+    "fname": "Jane", "mname": "Q", "lname": "O'Neil & Sons", "myUH": "1234567",
+    "phone": "713-555-0100", "program": "ENGR", "career": "Graduate", "term": "Fall",
+    "year": "2025", "purpose_9": "yes", "explanation": "Transfer of 100% of one course.",
+}
+
+
+def test_every_template_loads_through_latex_env():
+    names = moose.latex_env.list_templates(extensions=["tex"])
+    assert "GraduatePetition.tex" in names
+    for name in names:
+        moose.latex_env.get_template(name)
+
+
+def test_graduate_petition_renders_sample_values():
+    latex_content = moose.render_latex("GraduatePetition.tex", **GRADUATE_PETITION)
+    assert r"\VAR{" not in latex_content and r"\BLOCK{" not in latex_content
+    assert r"O'Neil \& Sons" in latex_content
+    assert r"100\% of one course" in latex_content
+    assert r"Transfer Credit \hfill [yes]" in latex_content
+    assert r"\includegraphics" not in latex_content
+
+    signed = moose.render_latex("GraduatePetition.tex", signature="sig-abc.png", **GRADUATE_PETITION)
+    assert r"\includegraphics[width=0.3\textwidth, height=2cm]{sig-abc.png}" in signed
+
+
+@pytest.mark.skipif(shutil.which("pdflatex") is None, reason="pdflatex not installed")
+def test_graduate_petition_compiles(tmp_path):
+    latex_content = moose.render_latex("GraduatePetition.tex", **GRADUATE_PETITION)
+    moose.run_pdflatex_once(latex_content, str(tmp_path), "graduate")
+    assert (tmp_path / "graduate.pdf").stat().st_size > 0
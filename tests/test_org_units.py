@@ -0,0 +1,96 @@
+import pytest
+
+import app as moose
+from conftest import StubCursor
+
+
+class OrgTree:
+    # organizational_units and org_unit_closure in memory. Each statement
+    # insert_org_unit/move_org_unit send is applied the way MySQL would.
+    def __init__(self):
+        self.parents = {}
+        self.closure = set()  # (ancestor_id, descendant_id, depth)
+
+    def subtree(self, unit_id):
+        return {d for a, d, _ in self.closure if a == unit_id}
+
+    def answer(self, cursor, sql, params):
+        sql = " ".join(sql.split())
+        if sql.startswith("INSERT INTO organizational_units"):
+            cursor.lastrowid = max(self.parents, default=0) + 1
+            self.parents[cursor.lastrowid] = params[0]
+        elif sql.startswith("INSERT INTO org_unit_closure") and "UNION ALL" in sql:
+            unit_id, parent_id = params[0], params[1]
+            self.closure |= {(a, unit_id, depth + 1) for a, d, depth in self.closure if d == parent_id}
+            self.closure.add((params[2], params[3], 0))
+        elif sql.startswith("SELECT 1 FROM org_unit_closure"):
+            return [(1,)] if any(a == params[0] and d == params[1] for a, d, _ in self.closure) else []
+        elif sql.startswith("UPDATE organizational_units SET parent_id"):
+            self.parents[params[1]] = params[0]
+        elif sql.startswith("DELETE c FROM org_unit_closure"):
+            inside = self.subtree(params[0])
+            self.closure = {(a, d, depth) for a, d, depth in self.closure if not (d in inside and a not in inside)}
+        elif sql.startswith("INSERT INTO org_unit_closure"):
+            unit_id, new_parent_id = params
+            self.closure |= {(sup_a, sub_d, sup_depth + sub_depth + 1)
+                             for sup_a, sup_d, sup_depth in self.closure if sup_d == new_parent_id
+                             for sub_a, sub_d, sub_depth in self.closure if sub_a == unit_id}
+        else:
+            raise AssertionError(f"unexpected statement: {sql}")
+        return []
+
+    def expected_closure(self):
+        # What rebuild-unit-closure would compute from parent_id alone
+        paths = set()
+        for unit_id in self.parents:
+            ancestor, depth = unit_id, 0
+            while ancestor is not None:
+                paths.add((ancestor, unit_id, depth))
+                ancestor, depth = self.parents[ancestor], depth + 1
+        return paths
+
+
+@pytest.fixture
+def tree():
+    # 1 University -> 2 College -> 3 Department -> 4 Program; 5 Other college
+    tree = OrgTree()
+    cursor = StubCursor(answer=tree.answer)
+    moose.insert_org_unit(cursor, None, "University", "UH")
+    moose.insert_org_unit(cursor, 1, "College", "COL")
+    moose.insert_org_unit(cursor, 2, "Department", "DEP")
+    moose.insert_org_unit(cursor, 3, "Program", "PRG")
+    moose.insert_org_unit(cursor, 1, "Other college", "OTH")
+    return tree, cursor
+
+
+def test_insert_under_a_parent(tree):
+    tree, cursor = tree
+    assert tree.parents == {1: None, 2: 1, 3: 2, 4: 3, 5: 1}
+    assert {(a, depth) for a, d, depth in tree.closure if d == 4} == {(4, 0), (3, 1), (2, 2), (1, 3)}
+    assert tree.closure == tree.expected_closure()
+
+
+def test_move_subtree_drops_old_ancestors_and_sets_new_depths(tree):
+    tree, cursor = tree
+    moose.move_org_unit(cursor, 3, 5)
+    assert tree.parents[3] == 5
+    assert not any(a == 2 and d in (3, 4) for a, d, _ in tree.closure)
+    assert {(a, depth) for a, d, depth in tree.closure if d == 4} == {(4, 0), (3, 1), (5, 2), (1, 3)}
+    assert tree.closure == tree.expected_closure()
+
+
+def test_move_to_top_level(tree):
+    tree, cursor = tree
+    moose.move_org_unit(cursor, 2, None)
+    assert {(a, depth) for a, d, depth in tree.closure if d == 4} == {(4, 0), (3, 1), (2, 2)}
+    assert tree.closure == tree.expected_closure()
+
+
+def test_refuses_to_move_a_unit_under_its_descendant(tree):
+    tree, cursor = tree
+    before = set(tree.closure)
+    with pytest.raises(ValueError):
+        moose.move_org_unit(cursor, 2, 4)
+    with pytest.raises(ValueError):
+        moose.move_org_unit(cursor, 2, 2)
+    assert tree.closure == before and tree.parents[2] == 1
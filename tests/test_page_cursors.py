@@ -0,0 +1,62 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+import app as moose
+
+
+def admin(email="admin@uh.edu"):
+    return {"user_id": 1, "email": email, "name": "Admin", "role_id": 1, "role_name": "admin",
+            "status": "active", "cougar_id": "1234567", "signature_path": None}
+
+
+@pytest.fixture
+def admin_client(client, monkeypatch):
+    monkeypatch.setattr(moose, "lookup_user", lambda email, name=None: admin(email))
+    claims = {"claims": [{"typ": "preferred_username", "val": "admin@uh.edu"}]}
+    client.environ_base["HTTP_X_MS_CLIENT_PRINCIPAL"] = base64.b64encode(json.dumps(claims).encode()).decode()
+    return client
+
+
+def test_cursor_round_trip():
+    submitted_at = datetime(2026, 3, 1, 9, 30, 15)
+    token = moose.encode_cursor(submitted_at, 4711)
+    assert moose.decode_cursor(token, 2) == [str(submitted_at), 4711]
+    assert moose.decode_cursor(moose.encode_cursor("a@uh.edu"), 1) == ["a@uh.edu"]
+    assert moose.decode_cursor("", 2) is None and moose.decode_cursor(None, 2) is None
+
+
+@pytest.mark.parametrize("token", [
+    "garbage",
+    "%%%.???",
+    "é.é",
+    # Right signature, wrong number of keys
+    moose.encode_cursor("a@uh.edu"),
+    # Keys that are not scalars
+    moose.encode_cursor({"x": 1}, [2]),
+])
+def test_bad_cursor_is_rejected(token):
+    with pytest.raises(moose.InvalidCursor):
+        moose.decode_cursor(token, 2)
+
+
+def test_tampered_cursor_is_rejected():
+    payload, signature = moose.encode_cursor("2026-03-01 09:30:15", 4711).split(".")
+    forged = base64.urlsafe_b64encode(json.dumps(["2026-03-01 09:30:15", 1]).encode()).decode().rstrip("=")
+    with pytest.raises(moose.InvalidCursor):
+        moose.decode_cursor(f"{forged}.{signature}", 2)
+
+
+@pytest.mark.parametrize("path", ["/api/admin/reports", "/api/admin/users", "/api/inbox"])
+def test_bad_cursor_is_a_400_not_a_500(admin_client, path):
+    rv = admin_client.get(path, query_string={"after": "not-a-cursor"})
+    assert rv.status_code == 400
+    assert "cursor" in rv.get_json()["error"]
+
+
+def test_issued_cursor_is_accepted(admin_client):
+    after = moose.encode_cursor("b@uh.edu")
+    rv = admin_client.get("/api/admin/users", query_string={"after": after})
+    assert rv.status_code == 200
@@ -0,0 +1,51 @@
+import os
+import time
+
+import app as moose
+
+
+def write_pdf(path, body, size=1000):
+    path.write_bytes(b"%PDF-1.4\n" + body.encode() + b"x" * (size - 10 - len(body)) + b"\n")
+    return str(path)
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_cache_eviction_keeps_the_most_recently_used(tmp_path):
+    cache = moose.PdfCache(str(tmp_path / "cache"), max_bytes=3000)
+    keys = ["a" * 64, "b" * 64, "c" * 64]
+    for n, key in enumerate(keys):
+        cache.store(key, write_pdf(tmp_path / f"{n}.pdf", key))
+        age(cache._path(key), 300 - n)  # a is the oldest, then b, then c
+
+    # Reading a makes it the most recently used
+    assert cache.fetch("a" * 64, str(tmp_path / "out.pdf"))
+    assert (tmp_path / "out.pdf").read_bytes() == (tmp_path / "0.pdf").read_bytes()
+
+    cache.store("d" * 64, write_pdf(tmp_path / "3.pdf", "d"))
+    remaining = sorted(name[0] for name in os.listdir(tmp_path / "cache"))
+    assert remaining == ["a", "c", "d"]
+    assert cache.stats()["evictions"] == 1 and cache.stats()["bytes"] == 3000
+
+
+def test_cache_limit_holds_across_workers(tmp_path):
+    # Two workers share the directory; each one's own total alone stays under the limit
+    directory = str(tmp_path / "cache")
+    first, second = moose.PdfCache(directory, 3000), moose.PdfCache(directory, 3000)
+    first.store("a" * 64, write_pdf(tmp_path / "a.pdf", "a"))
+    first.store("b" * 64, write_pdf(tmp_path / "b.pdf", "b"))
+    age(first._path("a" * 64), 300)
+    age(first._path("b" * 64), 200)
+    second.store("c" * 64, write_pdf(tmp_path / "c.pdf", "c"))
+    second.store("d" * 64, write_pdf(tmp_path / "d.pdf", "d"))
+    assert sorted(name[0] for name in os.listdir(directory)) == ["b", "c", "d"]
+
+
+def test_fetched_copy_is_not_the_cache_entry(tmp_path):
+    cache = moose.PdfCache(str(tmp_path / "cache"), max_bytes=10000)
+    cache.store("a" * 64, write_pdf(tmp_path / "a.pdf", "a"))
+    cache.fetch("a" * 64, str(tmp_path / "out.pdf"))
+    assert os.stat(tmp_path / "out.pdf").st_ino != os.stat(cache._path("a" * 64)).st_ino
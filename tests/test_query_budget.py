@@ -0,0 +1,30 @@
+import pytest
+
+import app as moose
+
+
+@pytest.fixture
+def stub_rows():
+    return [{"category_id": 1, "category_name": "Harassment"}]
+
+
+def test_view_within_budget_passes(client):
+    assert moose.report_form.query_budget == 1
+    rv = client.get("/report")
+    assert rv.status_code == 200
+    assert b"Harassment" in rv.data
+
+
+def test_one_extra_statement_exceeds_budget(client, monkeypatch):
+    # e.g. the template growing a lookup of its own
+    render_template = moose.render_template
+
+    def render_with_extra_query(*args, **kwargs):
+        cursor = moose.get_read_connection().cursor()
+        cursor.execute("SELECT COUNT(*) FROM reports")
+        cursor.close()
+        return render_template(*args, **kwargs)
+
+    monkeypatch.setattr(moose, "render_template", render_with_extra_query)
+    with pytest.raises(moose.QueryBudgetExceeded, match="ran 2 queries, budget is 1"):
+        client.get("/report")
@@ -0,0 +1,62 @@
+import pytest
+
+import app as moose
+
+
+def user(email, role_name="basicuser"):
+    return {"user_id": 1, "email": email, "role_name": role_name, "status": "active"}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(moose.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = moose.UserCache(10, 30, 5)
+    cache.put("a@uh.edu", user("a@uh.edu"))
+    clock[0] += 29
+    assert cache.get("a@uh.edu")["email"] == "a@uh.edu"
+    clock[0] += 2
+    assert cache.get("a@uh.edu") is None
+    assert cache.stats()["expired"] == 1 and cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = moose.UserCache(2, 30, 5)
+    cache.put("a@uh.edu", user("a@uh.edu"))
+    cache.put("b@uh.edu", user("b@uh.edu"))
+    cache.get("a@uh.edu")
+    cache.put("c@uh.edu", user("c@uh.edu"))
+    assert cache.get("b@uh.edu") is None
+    assert cache.get("a@uh.edu") and cache.get("c@uh.edu")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_stamp_change_drops_every_entry(clock):
+    cache = moose.UserCache(10, 30, 5)
+    cache.apply_version(1)
+    cache.put("a@uh.edu", user("a@uh.edu"))
+    cache.apply_version(1)
+    assert cache.get("a@uh.edu")
+    cache.apply_version(2)
+    assert cache.get("a@uh.edu") is None
+    assert cache.stats()["version_resets"] == 1
+
+
+def test_entries_are_returned_as_copies(clock):
+    cache = moose.UserCache(10, 30, 5)
+    cache.put("a@uh.edu", user("a@uh.edu"))
+    cache.get("a@uh.edu")["role_name"] = "admin"
+    assert cache.get("a@uh.edu")["role_name"] == "basicuser"
+
+
+def test_email_case_does_not_split_a_user(clock):
+    cache = moose.UserCache(10, 30, 5)
+    cache.put("Jane.Doe@UH.edu", user("jane.doe@uh.edu"))
+    assert cache.get("jane.doe@uh.edu")
+    cache.invalidate("JANE.DOE@uh.edu")
+    assert cache.get("Jane.Doe@UH.edu") is None
+    assert cache.stats()["invalidations"] == 1
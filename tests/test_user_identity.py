@@ -0,0 +1,49 @@
+import app as moose
+from conftest import StubConnection, StubCursor
+
+
+class UsersTable:
+    # Fills new rows the way the schema would: defaults from the columns, role from roles
+    def __init__(self, default_role=("student", 3)):
+        self.default_role = default_role
+        self.rows = {}
+
+    def answer(self, cursor, sql, params):
+        if sql.lstrip().startswith("INSERT IGNORE INTO users"):
+            email, name = params
+            cursor.rowcount = 0 if email in self.rows else 1
+            if cursor.rowcount:
+                cursor.lastrowid = len(self.rows) + 1
+                self.rows[email] = {
+                    "user_id": cursor.lastrowid, "email": email, "name": name,
+                    "role_id": self.default_role[1], "role_name": self.default_role[0],
+                    "status": "pending", "cougar_id": None, "signature_path": None,
+                }
+            return []
+        if "FROM users u" in sql:
+            row = self.rows.get(params[0])
+            return [dict(row)] if row else []
+        raise AssertionError(f"unexpected statement: {sql}")
+
+
+def test_new_user_identity_is_read_back_from_the_database():
+    users = UsersTable()
+    cursor = StubCursor(answer=users.answer)
+    user = moose.load_user_identity(StubConnection(), cursor, "new@uh.edu", "New User")
+    assert user == users.rows["new@uh.edu"]
+    assert (user["role_name"], user["role_id"], user["status"]) == ("student", 3, "pending")
+    assert len(cursor.statements) == 3
+
+
+def test_returning_user_is_one_select():
+    users = UsersTable()
+    moose.load_user_identity(StubConnection(), StubCursor(answer=users.answer), "a@uh.edu", "A")
+    cursor = StubCursor(answer=users.answer)
+    assert moose.load_user_identity(StubConnection(), cursor, "a@uh.edu", "A")["user_id"] == 1
+    assert len(cursor.statements) == 1
+
+
+def test_unknown_user_without_a_name_is_not_created():
+    users = UsersTable()
+    assert moose.load_user_identity(StubConnection(), StubCursor(answer=users.answer), "x@uh.edu") is None
+    assert users.rows == {}